@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from backends import DuckDBBackend, SqlBackend
+    from binning import Bins
+    from cube import OrderCube
+    from timeseries import OrderSeries
+
+    Backend = SqlBackend | DuckDBBackend
+
+# Every analysis of the app as a plain function returning a DataFrame, for
+# the dashboard and for batch jobs alike. Importing this module loads
+# nothing heavy: pandas, the backends (SQLAlchemy, the drivers), the cube and
+# the binning are imported on first call, and nothing touches the database
+# until an analysis runs. Plotly and Streamlit are never imported.
+#
+# An analysis answers from the cube when given one, under its filters and
+# month ranges (as the dashboard does), and otherwise from the backend's SQL
+# for the topic, rollup tables included. Without a backend, one is made on
+# first use from OFD_BACKEND (backends.make_backend).
+
+# --------------------------------------------------
+# SOURCES
+# --------------------------------------------------
+
+Default_backends = {}
+Default_lock = threading.Lock()
+
+def default_backend(name: str | None = None) -> Backend:
+    # One backend per name for the process, made on first use. DuckDB holds
+    # no data until it is given a CSV, so it reads the dashboard's
+    # (OFD_DATA_PATH).
+    from backends import Backend_name, Data_path, DuckDBBackend, make_backend
+    name = name or Backend_name
+    with Default_lock:
+        if name not in Default_backends:
+            backend = make_backend(name)
+            if isinstance(backend, DuckDBBackend) and backend.path is None:
+                if not os.path.exists(Data_path):
+                    raise FileNotFoundError(f"DuckDB reads the orders CSV, but there is none at {Data_path}: "
+                                            "set OFD_DATA_PATH (or pass --csv)")
+                backend.load(Data_path)
+            Default_backends[name] = backend
+        return Default_backends[name]
+
+def order_cube(backend: Backend | None = None, read_sql=None) -> OrderCube:
+    # The in-memory order cube, for filtered analyses; read_sql(query, params)
+    # in place of the backend's, e.g. through a query cache
+    from cube import build_cube
+    backend = backend or default_backend()
+    return build_cube(read_sql or backend.read_sql, backend.topic_query)
+
+def order_series(backend: Backend | None = None) -> OrderSeries:
+    # The dense daily series of the order measures, for trends
+    from timeseries import build_series
+    return build_series((backend or default_backend()).read_sql)
+
+def topic_frame(topic: str, backend: Backend | None = None, cube: OrderCube | None = None,
+                filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # An analysis topic's answer (topics.Topic_queries); filters and ranges
+    # need a cube
+    if cube is not None:
+        return cube.topic(topic, filters, ranges)
+    if filters or ranges:
+        raise ValueError(f"{topic!r} with filters or ranges needs a cube (analytics.order_cube)")
+    backend = backend or default_backend()
+    return backend.read_sql(backend.topic_query(topic))
+
+def column_groups(column: str, bins: Bins | None, backend: Backend | None = None, cube: OrderCube | None = None,
+                  filters: dict | None = None, ranges: dict | None = None):
+    # (bins, bucket aggregates) of a binnable column (binning.Bin_columns), by
+    # the database (under the cube's filters when given one); without bins,
+    # binning.Default_bins equal-width ones over the column's range
+    from binning import bin_query, cube_groups, default_bins, query_groups
+    if cube is None and (filters or ranges):
+        raise ValueError(f"{column!r} with filters or ranges needs a cube (analytics.order_cube)")
+    source = cube if cube is not None else backend or default_backend()
+    if bins is None:
+        bins = default_bins(source, column)
+    if cube is not None:
+        return bins, cube_groups(cube, column, bins, filters, ranges)
+    return bins, query_groups(source.read_sql(bin_query(column, bins)), bins)
+
+def binned_frame(topic: str, bins: Bins | None = None, backend: Backend | None = None, cube: OrderCube | None = None,
+                 filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # A binned topic's answer (binning.Binned_topics), one row per bin with
+    # orders
+    from binning import Binned_topics, binned_topic
+    bins, groups = column_groups(Binned_topics[topic][0], bins, backend, cube, filters, ranges)
+    return binned_topic(topic, groups, bins)
+
+def binned_column(column: str, bins: Bins | None = None, backend: Backend | None = None,
+                  cube: OrderCube | None = None, filters: dict | None = None,
+                  ranges: dict | None = None) -> pd.DataFrame:
+    # Orders, cancellations, revenue, order value, delivery time and margin
+    # per bin of any binnable column (binning.Bin_columns), e.g. Order_Value
+    # or Customer_Age
+    from binning import binned_column as column_summary
+    bins, groups = column_groups(column, bins, backend, cube, filters, ranges)
+    return column_summary(column, groups, bins)
+
+# --------------------------------------------------
+# CUSTOMERS AND ORDERS
+# --------------------------------------------------
+
+def top_spenders(backend: Backend | None = None, cube: OrderCube | None = None,
+                 filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Top-spending customers", backend, cube, filters, ranges)
+
+def age_group_orders(backend: Backend | None = None, cube: OrderCube | None = None,
+                     filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Age Group vs Order value", backend, cube, filters, ranges)
+
+def weekday_patterns(backend: Backend | None = None, cube: OrderCube | None = None,
+                     filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Weekend vs Weekday Order patterns", backend, cube, filters, ranges)
+
+# --------------------------------------------------
+# REVENUE AND PROFIT
+# --------------------------------------------------
+
+def monthly_trends(backend: Backend | None = None, cube: OrderCube | None = None,
+                   filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Monthly revenue trends", backend, cube, filters, ranges)
+
+def revenue_year_over_year(first: int, last: int, backend: Backend | None = None) -> pd.DataFrame:
+    # Months first..last (YYYYMM) with the revenue of the same month a year
+    # earlier, reading only those months (partitions.py)
+    from partitions import year_over_year
+    backend = backend or default_backend()
+    return year_over_year(backend.read_sql(*backend.yoy_query(first, last)), first, last)
+
+def kpi_trend(metric: str = "Revenue", breakdown: str | None = None, period: str = "D", window: int | None = None,
+              yoy: bool = False, backend: Backend | None = None, series: OrderSeries | None = None,
+              filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # A metric (timeseries.Metrics) per day, rolling window of days or
+    # period (D, W, M, Q, Y), in total or per City, Cuisine_Type or
+    # Payment_Mode, optionally against the year before
+    series = series or order_series(backend)
+    return series.trend(metric, breakdown, filters, ranges, period, window, yoy)
+
+def daily_kpis(backend: Backend | None = None, series: OrderSeries | None = None,
+               filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # Every metric of every day, days without orders included
+    from timeseries import Metrics
+    series = series or order_series(backend)
+    frames = [series.trend(metric, None, filters, ranges) for metric in Metrics]
+    return frames[0].join([frame.drop(columns="Date") for frame in frames[1:]])
+
+def discount_impact(bins: Bins | None = None, backend: Backend | None = None, cube: OrderCube | None = None,
+                    filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # Per bin of Discount_Applied: binning.Default_bins equal-width ones
+    # unless given bins (there are thousands of distinct discounts)
+    return binned_frame("Impact of discounts on profit", bins, backend, cube, filters, ranges)
+
+def city_cuisine_revenue(backend: Backend | None = None, cube: OrderCube | None = None,
+                         filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("High-revenue cities and cuisines", backend, cube, filters, ranges)
+
+# --------------------------------------------------
+# DELIVERY
+# --------------------------------------------------
+
+def delivery_time_by_city(backend: Backend | None = None, cube: OrderCube | None = None,
+                          filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Average delivery time by city", backend, cube, filters, ranges)
+
+def distance_delays(bins: Bins | None = None, backend: Backend | None = None, cube: OrderCube | None = None,
+                    filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    # Per standard distance range, or per bin of Distance_km
+    if bins is None:
+        return topic_frame("Distance vs delivery delay analysis", backend, cube, filters, ranges)
+    return binned_frame("Distance vs delivery delay analysis", bins, backend, cube, filters, ranges)
+
+def rating_vs_delivery_time(backend: Backend | None = None, cube: OrderCube | None = None,
+                            filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Delivery rating vs delivery time", backend, cube, filters, ranges)
+
+# --------------------------------------------------
+# RESTAURANTS
+# --------------------------------------------------
+
+def top_rated_restaurants(backend: Backend | None = None, cube: OrderCube | None = None,
+                          filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Top-rated restaurants", backend, cube, filters, ranges)
+
+def restaurant_cancellations(backend: Backend | None = None, cube: OrderCube | None = None,
+                             filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Cancellation rate by restaurant", backend, cube, filters, ranges)
+
+def cuisine_performance(backend: Backend | None = None, cube: OrderCube | None = None,
+                        filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Cuisine-wise performance", backend, cube, filters, ranges)
+
+# --------------------------------------------------
+# OPERATIONS
+# --------------------------------------------------
+
+def peak_hours(backend: Backend | None = None, cube: OrderCube | None = None,
+               filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Peak hour demand analysis", backend, cube, filters, ranges)
+
+def payment_modes(backend: Backend | None = None, cube: OrderCube | None = None,
+                  filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Payment mode preferences", backend, cube, filters, ranges)
+
+def cancellation_reasons(backend: Backend | None = None, cube: OrderCube | None = None,
+                         filters: dict | None = None, ranges: dict | None = None) -> pd.DataFrame:
+    return topic_frame("Cancellation reason analysis", backend, cube, filters, ranges)
+
+# --------------------------------------------------
+# ENTITY PROFILES
+# --------------------------------------------------
+
+# From the profile tables kept at ingest (profiles.py), so only backends
+# with rollup tables have them
+
+def entity_profile(entity: str, key, backend: Backend | None = None) -> pd.DataFrame:
+    # One customer, restaurant or partner's profile (no row if unknown)
+    from profiles import profile_query, profile_view
+    return profile_view((backend or default_backend()).read_sql(*profile_query(entity, key)), entity)
+
+def entity_leaderboard(entity: str, leaderboard: str, k: int = 10, backend: Backend | None = None) -> pd.DataFrame:
+    # The top k profiles of an entity by one of its leaderboards
+    # (profiles.Entities)
+    from profiles import leaderboard_query, profile_view
+    return profile_view((backend or default_backend()).read_sql(*leaderboard_query(entity, leaderboard, k)), entity)
+
+# --------------------------------------------------
+# CATALOGUE
+# --------------------------------------------------
+
+# The analyses by name, grouped as the dashboard's pages
+Analysis_groups = {
+    "customers": {"top_spenders": top_spenders,
+                  "age_group_orders": age_group_orders,
+                  "weekday_patterns": weekday_patterns,
+                  "order_value_bins": functools.partial(binned_column, "Order_Value"),
+                  "customer_age_bins": functools.partial(binned_column, "Customer_Age")},
+    "revenue": {"monthly_trends": monthly_trends,
+                "daily_kpis": daily_kpis,
+                "discount_impact": discount_impact,
+                "city_cuisine_revenue": city_cuisine_revenue},
+    "delivery": {"delivery_time_by_city": delivery_time_by_city,
+                 "distance_delays": distance_delays,
+                 "rating_vs_delivery_time": rating_vs_delivery_time,
+                 "delivery_time_bins": functools.partial(binned_column, "Delivery_Time_Min")},
+    "restaurants": {"top_rated_restaurants": top_rated_restaurants,
+                    "restaurant_cancellations": restaurant_cancellations,
+                    "cuisine_performance": cuisine_performance},
+    "operations": {"peak_hours": peak_hours,
+                   "payment_modes": payment_modes,
+                   "cancellation_reasons": cancellation_reasons},
+}
+
+Analyses = {name: analysis for group in Analysis_groups.values() for name, analysis in group.items()}
+
+def selected_analyses(names):
+    # Analysis and group names -> {analysis name: function}, in order
+    selected = {}
+    for name in names:
+        if name in Analysis_groups:
+            selected.update(Analysis_groups[name])
+        elif name in Analyses:
+            selected[name] = Analyses[name]
+        else:
+            raise ValueError(f"unknown analysis {name!r}, expected one of {', '.join([*Analysis_groups, *Analyses])}")
+    return selected
+
+def run_batch(names, out_dir, backend=None):
+    # Runs the analyses and writes each answer to out_dir/<name>.parquet;
+    # returns {name: path}
+    os.makedirs(out_dir, exist_ok=True)
+    backend = backend or default_backend()
+    written = {}
+    for name, analysis in selected_analyses(names).items():
+        start = time.perf_counter()
+        frame = analysis(backend=backend)
+        path = os.path.join(out_dir, f"{name}.parquet")
+        frame.to_parquet(path, index=False)
+        written[name] = path
+        print(f"{name:<26} {len(frame):>8,} rows {time.perf_counter() - start:8.3f}s  {path}")
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run analyses without the dashboard and write each answer to Parquet")
+    parser.add_argument("analyses", nargs="*", help=f"analysis or group names ({', '.join(Analysis_groups)}); "
+                                                    "all of them by default")
+    parser.add_argument("--backend", choices=["mysql", "sqlite", "duckdb"], help="defaults to OFD_BACKEND")
+    parser.add_argument("--out", default="reports", help="directory of the Parquet files")
+    parser.add_argument("--csv", help="load (or update from) this orders CSV before running")
+    parser.add_argument("--list", action="store_true", help="list the analyses and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for group, analyses in Analysis_groups.items():
+            print(f"{group}: {', '.join(analyses)}")
+        raise SystemExit
+    if args.csv:
+        from backends import Backend_name, make_backend
+        backend = make_backend(args.backend or Backend_name)
+        backend.load(args.csv)
+    else:
+        try:
+            backend = default_backend(args.backend)
+        except FileNotFoundError as error:
+            raise SystemExit(str(error))
+    run_batch(args.analyses or list(Analysis_groups), args.out, backend)
@@ -0,0 +1,168 @@
+import os
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from bulk_load import Decimal_places
+from database import bootstrap, data_version, sqlite_engine
+from dialects import translate
+from dtypes import compact
+from incremental import ensure_sources, incremental_ingest, record_sources
+from partitions import ensure_partitions, yoy_query
+from profiler import profiler
+from profiles import ensure_profiles
+from rollups import ensure_rollups, topic_query
+from sketches import ensure_sketches
+from snapshot import Snapshot_dir, ingest_snapshot, snapshot_path
+
+# "mysql" (default), "sqlite" or "duckdb"
+Backend_name = os.environ.get("OFD_BACKEND", "mysql")
+Sqlite_path = os.environ.get("OFD_SQLITE_PATH", "Online_Food_Delivery.db")
+# The orders CSV the dashboard ingests, and DuckDB reads when run headless
+Data_path = os.environ.get("OFD_DATA_PATH", r"D:\PROJECTS\Capstone_Project_2\Online-Food-Delivery-Analysis\ONINE_FOOD_DELIVERY_ANALYSIS.csv")
+
+# A backend runs the app's MySQL queries on one engine: read_sql translates
+# them to its dialect (results in the compact types of dtypes.py),
+# topic_query picks the SQL for an analysis topic, yoy_query the (SQL,
+# params) of the year-over-year monthly trend of a range of months
+# (partitions.py) and load makes sure the cleaned orders are there to query.
+
+# --------------------------------------------------
+# SQL DATABASES (MYSQL, SQLITE)
+# --------------------------------------------------
+
+class SqlBackend:
+
+    def __init__(self, db_engine, rollups=True, snapshot_dir=Snapshot_dir):
+        self.db_engine = db_engine
+        self.name = db_engine.dialect.name
+        self.rollups = rollups
+        self.snapshot_dir = snapshot_dir
+
+    def read_sql(self, query, params=None):
+        # pd.read_sql's steps, one profiler phase each
+        with profiler.phase("connect"):
+            conn = self.db_engine.connect()
+        with conn:
+            with profiler.phase("execute"):
+                result = conn.execute(text(translate(query, self.name)), params)
+            with profiler.phase("fetch") as span:
+                rows = result.fetchall()
+                span.count(rows=len(rows))
+            with profiler.phase("frame") as span:
+                frame = compact(pd.DataFrame.from_records(rows, columns=list(result.keys()), coerce_float=True))
+                span.count(frame=frame)
+            return frame
+
+    def topic_query(self, topic):
+        return topic_query(topic, self.rollups)
+
+    def yoy_query(self, first, last):
+        # The month rollup, or an Order_Date range scan on its index
+        return yoy_query("rollups" if self.rollups else "table", first, last)
+
+    def data_version(self):
+        if not inspect(self.db_engine).has_table("data_version"):
+            return None
+        return data_version(self.db_engine)
+
+    def load(self, csv_path):
+        # Adds the new and changed orders of csv_path; True if there were any.
+        # An empty database is filled in bulk from the snapshot instead.
+        with self.db_engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM Food_Order_Details")).scalar()
+        if not count:
+            ingest_snapshot(csv_path, self.db_engine, snapshot_dir=self.snapshot_dir, rollups=self.rollups)
+            record_sources(csv_path, self.db_engine)
+            return True
+        if self.rollups:
+            # Summarize data inserted before the rollup tables, the sketches
+            # or the entity profiles existed
+            ensure_rollups(self.db_engine)
+            ensure_sketches(self.db_engine)
+            ensure_profiles(self.db_engine)
+        ensure_sources(csv_path, self.db_engine)
+        return incremental_ingest(csv_path, self.db_engine, rollups=self.rollups) > 0
+
+# --------------------------------------------------
+# DUCKDB OVER THE SNAPSHOT
+# --------------------------------------------------
+
+class DuckDBBackend:
+    # Embedded columnar engine scanning the year-month Parquet partitions of
+    # the cleaned snapshot. Nothing is inserted: the snapshot is the data, so
+    # there are no rollup tables either, and full-table topics are answered
+    # directly.
+    name = "duckdb"
+    rollups = False
+
+    def __init__(self, snapshot_dir=Snapshot_dir):
+        import duckdb
+
+        self.connection = duckdb.connect()
+        self.snapshot_dir = snapshot_dir
+        self.path = None
+
+    def read_sql(self, query, params=None):
+        # A cursor is a separate connection to the same in-memory database,
+        # so sessions on different threads can query concurrently
+        with profiler.phase("connect"):
+            cursor = self.connection.cursor()
+        try:
+            with profiler.phase("execute"):
+                cursor.execute(translate(query, self.name), params or {})
+            # DuckDB fetches straight into a DataFrame
+            with profiler.phase("fetch") as span:
+                frame = cursor.df()
+                span.count(rows=len(frame))
+            with profiler.phase("frame") as span:
+                frame = compact(frame)
+                span.count(frame=frame)
+            return frame
+        finally:
+            cursor.close()
+
+    def topic_query(self, topic):
+        return topic_query(topic, self.rollups)
+
+    def yoy_query(self, first, last):
+        # Only the partitions of the months asked for are scanned
+        return yoy_query("partitions", first, last)
+
+    def data_version(self):
+        # Changes whenever the CSV or the cleaning code produce a new snapshot
+        return self.path
+
+    def load(self, csv_path):
+        # Builds the snapshot if needed and points Food_Order_Details at it;
+        # True if the CSV had to be cleaned
+        cleaned = not os.path.exists(snapshot_path(csv_path, self.snapshot_dir))
+        path = ensure_partitions(csv_path, self.snapshot_dir)
+        if path != self.path:
+            # Same column types as the MySQL table, so DECIMAL sums, 0/1 peak
+            # hours and DATE values compare equal across backends. A filter on
+            # Year_Month skips the other partitions' files; Food_Order_Details
+            # has the table's columns only.
+            casts = [f"CAST({column} AS DECIMAL(10,2)) AS {column}" for column in Decimal_places]
+            casts += ["CAST(Order_Date AS DATE) AS Order_Date", "CAST(Peak_Hour AS TINYINT) AS Peak_Hour"]
+            escaped = os.path.join(path, "*", "*.parquet").replace("'", "''")
+            self.connection.execute(f"CREATE OR REPLACE VIEW Food_Order_Partitions AS "
+                                    f"SELECT * REPLACE ({', '.join(casts)}) "
+                                    f"FROM read_parquet('{escaped}', hive_partitioning = true)")
+            self.connection.execute("CREATE OR REPLACE VIEW Food_Order_Details AS "
+                                    "SELECT * EXCLUDE (Year_Month) FROM Food_Order_Partitions")
+            self.path = path
+        return cleaned
+
+# --------------------------------------------------
+# FACTORY
+# --------------------------------------------------
+
+def make_backend(name=Backend_name):
+    if name == "mysql":
+        return SqlBackend(bootstrap())
+    if name == "sqlite":
+        return SqlBackend(sqlite_engine(Sqlite_path))
+    if name == "duckdb":
+        return DuckDBBackend()
+    raise ValueError(f"unknown backend {name!r}, expected mysql, sqlite or duckdb")
@@ -0,0 +1,100 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import DuckDBBackend, SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from database import bootstrap, sqlite_engine
+from topics import Topic_queries
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def best_time(backend, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = backend.read_sql(query)
+        timings.append(time.perf_counter() - start)
+    return frame, min(timings)
+
+def canonical(frame):
+    # Columns by position with the numeric types each engine returns unified,
+    # rows sorted by all columns (the group keys come first)
+    columns = {}
+    for position, (_, column) in enumerate(frame.items()):
+        numeric = pd.to_numeric(column, errors="coerce")
+        if numeric.notna().sum() == column.notna().sum():
+            columns[position] = numeric.astype("float64")
+        else:
+            columns[position] = column.astype(str)
+    return pd.DataFrame(columns).sort_values(list(columns), ignore_index=True)
+
+def same_answer(frame, reference):
+    frame, reference = canonical(frame), canonical(reference)
+    if frame.shape != reference.shape:
+        return False
+    for position in frame.columns:
+        if frame[position].dtype.kind == "f" and reference[position].dtype.kind == "f":
+            if not np.allclose(frame[position], reference[position], rtol=1e-9, atol=1e-6, equal_nan=True):
+                return False
+        elif not frame[position].astype(str).equals(reference[position].astype(str)):
+            return False
+    return True
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def run(rows, workdir, repeat, mysql_url):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    snapshot_dir = os.path.join(workdir, f"snapshots_{rows}")
+
+    # Full-table answers on every engine; SQLite also with its rollup tables
+    sqlite = sqlite_engine(os.path.join(workdir, f"orders_{rows}.db"))
+    backends = {"sqlite": SqlBackend(sqlite, rollups=False, snapshot_dir=snapshot_dir),
+                "sqlite+rollups": SqlBackend(sqlite, snapshot_dir=snapshot_dir),
+                "duckdb": DuckDBBackend(snapshot_dir)}
+    if mysql_url:
+        mysql = bootstrap(mysql_url, f"ofd_bench_{rows}")
+        backends["mysql"] = SqlBackend(mysql, rollups=False, snapshot_dir=snapshot_dir)
+        backends["mysql+rollups"] = SqlBackend(mysql, snapshot_dir=snapshot_dir)
+
+    # One load per database (the snapshot is built by the first one)
+    load_times = {}
+    for name in ["sqlite+rollups", "duckdb", "mysql+rollups"]:
+        if name in backends:
+            start = time.perf_counter()
+            backends[name].load(csv_path)
+            load_times[name.split("+")[0]] = time.perf_counter() - start
+
+    report = []
+    for topic in Topic_queries:
+        row = {"topic": topic}
+        answers = {}
+        for name, backend in backends.items():
+            answers[name], seconds = best_time(backend, backend.topic_query(topic), repeat)
+            row[f"{name}_ms"] = seconds * 1000
+        row["same_answer"] = all(same_answer(answer, answers["sqlite"]) for answer in answers.values())
+        report.append(row)
+    report = pd.DataFrame(report)
+
+    print(f"\n{rows:,} orders | load: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in load_times.items()))
+    print(report.round(2).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-topic latency of the analysis queries on each backend")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mysql-url", help="e.g. mysql+mysqlconnector://root:pw@localhost; adds a MySQL column")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir, args.repeat, args.mysql_url)
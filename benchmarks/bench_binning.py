@@ -0,0 +1,93 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import DuckDBBackend, SqlBackend
+from benchmarks.bench_backends import same_answer
+from benchmarks.bench_cleaning import make_raw_orders
+from binning import (Bin_columns, Distance_ranges, bin_query, binned_topic, column_range, count_bins, cube_groups,
+                     quantile_bins, query_groups, value_weights, width_bins)
+from cube import build_cube
+from database import sqlite_engine
+from rollups import Measures
+from topics import Topic_queries
+
+# The bins every column is summarized with
+Bin_modes = ["count", "quantile", "width"]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def make_bins(cube, column, mode, bins):
+    decimals = Bin_columns[column]
+    low, high = column_range(cube, column)
+    if mode == "count":
+        return count_bins(low, high, bins, decimals)
+    if mode == "quantile":
+        return quantile_bins(*value_weights(cube, column), bins, decimals)
+    return width_bins(low, high, max(10.0 ** -decimals, round((high - low) / bins, decimals)), decimals)
+
+def raw_query(column):
+    # What the pages did: one group per distinct value
+    return f"SELECT {column}, COUNT(*) AS order_count FROM Food_Order_Details GROUP BY {column}"
+
+def same_groups(actual, expected):
+    names = ["order_count", "cancelled_count", *[f"{kind}_{measure}" for measure in Measures for kind in ("cnt", "sum")]]
+    return all(np.array_equal(np.asarray(actual[name]), np.asarray(expected[name])) for name in names)
+
+def run(rows, bins, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    snapshot_dir = os.path.join(workdir, "snapshots")
+    sqlite = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), snapshot_dir=snapshot_dir)
+    sqlite.load(csv_path)
+    duckdb = DuckDBBackend(snapshot_dir)
+    duckdb.load(csv_path)
+    cube = build_cube(sqlite.read_sql)
+    duckdb_cube = build_cube(duckdb.read_sql)
+    # A sidebar selection, binned under the cube's filters by both databases
+    filters = {"City": list(cube.values["City"][:2])}
+    print(f"{rows:>10,} orders, {bins} bins")
+
+    report = []
+    for column in Bin_columns:
+        raw, raw_time = timed(sqlite.read_sql, raw_query(column))
+        for mode in Bin_modes:
+            chosen = make_bins(cube, column, mode, bins)
+            query = bin_query(column, chosen)
+            from_sqlite, sqlite_time = timed(sqlite.read_sql, query)
+            from_duckdb, duckdb_time = timed(duckdb.read_sql, query)
+            filtered, filtered_time = timed(cube_groups, cube, column, chosen, filters)
+            expected = query_groups(from_sqlite, chosen)
+            report.append({"column": column, "bins": mode, "raw_rows": len(raw), "binned_rows": len(from_sqlite),
+                           "raw_sqlite_ms": raw_time * 1000, "sqlite_ms": sqlite_time * 1000,
+                           "duckdb_ms": duckdb_time * 1000, "filtered_ms": filtered_time * 1000,
+                           "same": same_groups(query_groups(from_duckdb, chosen), expected)
+                                   and same_groups(filtered, cube_groups(duckdb_cube, column, chosen, filters))})
+    report = pd.DataFrame(report)
+    print(report.to_string(index=False, float_format="{:9.2f}".format))
+
+    # The standard distance ranges give the distance topic's answer
+    topic = "Distance vs delivery delay analysis"
+    binned = binned_topic(topic, cube_groups(cube, "Distance_km", Distance_ranges), Distance_ranges)
+    expected = sqlite.read_sql(Topic_queries[topic])
+    matches = same_answer(binned[["Distance_range", "total_orders", "Avg_delivery_time"]], expected)
+    print(f"{'':>10} standard distance ranges vs the distance topic's SQL: {'same answer' if matches else 'DIFFERENT'}")
+    if not (report["same"].all() and matches):
+        raise SystemExit("the binned aggregates disagree")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bucket aggregates in SQL (SQLite, DuckDB), unfiltered and filtered, vs grouping by raw values")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--bins", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.bins, workdir)
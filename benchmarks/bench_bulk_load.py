@@ -0,0 +1,27 @@
+import argparse
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+
+from benchmarks.bench_cleaning import make_raw_orders
+from bulk_load import throughput_report, Strategies
+from cleaning import Food_Delivery_Cleaning
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rows/sec of each Food_Order_Details bulk-load strategy")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--url", help="SQLAlchemy URL to load into (default: a temporary SQLite file)")
+    parser.add_argument("--strategies", nargs="+", choices=list(Strategies))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[500, 5_000])
+    args = parser.parse_args()
+
+    food_df = Food_Delivery_Cleaning(make_raw_orders(args.rows))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.url or f"sqlite:///{os.path.join(workdir, 'bulk_load.db')}"
+        db_engine = create_engine(url, connect_args={"allow_local_infile": True} if url.startswith("mysql") else {})
+        report = throughput_report(food_df, db_engine, strategies=args.strategies,
+                                   batch_sizes=args.batch_sizes)
+        db_engine.dispose()
+    print(report.to_string(index=False))
@@ -0,0 +1,90 @@
+import argparse
+import time
+
+import pandas as pd
+import numpy as np
+
+from cleaning import Food_Delivery_Cleaning
+from synthetic import make_raw_orders
+
+# --------------------------------------------------
+# ORIGINAL (ROW-WISE) CLEANING, KEPT AS THE REFERENCE
+# --------------------------------------------------
+
+def legacy_cleaning(food_df):
+    food_df.dropna(subset="Order_Date",inplace=True)
+    Replace_value = {"City":"Hyderabad",
+                     "Cuisine_Type":"Indian",
+                     "Payment_Mode" : "Card",
+                     "Customer_Gender" : "Other",
+                     "Peak_Hour":"False",
+                     "Order_Time" :"0:00",
+                     "Area" : "South",
+                     "Delivery_Rating" : food_df['Delivery_Rating'].median(),
+                     "Discount_Applied" : food_df['Discount_Applied'].median()}
+    for key, value in Replace_value.items():
+        food_df[key] = food_df[key].fillna(value)
+
+    Q1 = np.percentile(food_df['Discount_Applied'],25)
+    Q3 = np.percentile(food_df['Discount_Applied'],75)
+    IQR = Q3 - Q1
+    upper_bound = Q3 + (1.5*IQR)
+    lower_bound = Q1 - (1.5*IQR)
+    food_df['Discount_Applied'] = food_df['Discount_Applied'].clip(lower_bound, upper_bound)
+
+    food_df['Customer_Age']=food_df.groupby(["Customer_Gender","Area"])['Customer_Age'].transform(lambda x: x.fillna(x.median()))
+    food_df['Order_Value']=food_df.groupby(["City","Area","Cuisine_Type"])['Order_Value'].transform(lambda x: x.fillna(x.median()))
+    food_df['Final_Amount'] = food_df['Order_Value'] - food_df['Discount_Applied']
+    food_df.loc[(food_df["Order_Status"] == "Delivered") &
+                (food_df["Cancellation_Reason"].isnull()),
+                "Cancellation_Reason"
+                ] = "No Cancellation"
+    food_df.loc[(food_df["Order_Status"] == "Cancelled") &
+                (food_df["Cancellation_Reason"].isnull()),
+                "Cancellation_Reason"
+                ] = "Not Mentioned"
+    food_df["Delivery_Time_Min"] = food_df.groupby("Delivery_Rating")['Delivery_Time_Min'].transform(lambda x: x.fillna(x.median()))
+    food_df['Distance_km'] = food_df.groupby(['Delivery_Time_Min','Delivery_Rating'])['Distance_km'].transform(lambda x: x.fillna(x.median()))
+    food_df[["Customer_Age","Delivery_Time_Min","Delivery_Rating"]]=food_df[["Customer_Age","Delivery_Time_Min","Delivery_Rating"]].astype("int")
+    food_df['Order_Date']=pd.to_datetime(food_df['Order_Date'])
+    food_df['Peak_Hour'] = food_df['Peak_Hour'].astype("bool")
+    food_df['Order_Time'] = pd.to_datetime(food_df['Order_Time']).dt.time
+
+    food_df["Customer_Age_group"] = food_df['Customer_Age'].apply(lambda x : "Youth" if x>15 and x<24 else "Adults")
+    food_df["Delivery_Performance"] = food_df["Delivery_Rating"].apply(lambda x: "Good"
+                                                                       if x >= 4 else "Moderate"
+                                                                       if x >= 2 else "Worst")
+    food_df['Profit_Margin_Percent'] = food_df['Profit_Margin']*100
+    food_df['Peak_Hour_Indicator'] = food_df['Peak_Hour'].apply(lambda x : "High" if x==True else "Low")
+    food_df['Order_day_name'] = food_df['Order_Date'].dt.day_name()
+    return food_df
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def run(rows, check=True):
+    raw = make_raw_orders(rows)
+
+    start = time.perf_counter()
+    old = legacy_cleaning(raw.copy())
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = Food_Delivery_Cleaning(raw.copy())
+    new_time = time.perf_counter() - start
+
+    if check:
+        pd.testing.assert_frame_equal(old, new, check_exact=True)
+
+    print(f"{rows:>10,} rows | legacy {old_time:8.2f}s | vectorized {new_time:8.2f}s | "
+          f"speedup {old_time / new_time:5.1f}x | identical: {'yes' if check else 'not checked'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the row-wise and vectorized Food_Delivery_Cleaning")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--no-check", action="store_true", help="skip the output equality check")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, check=not args.no_check)
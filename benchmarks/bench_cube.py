@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import SqlBackend
+from benchmarks.bench_backends import same_answer
+from benchmarks.bench_cleaning import make_raw_orders
+from cube import Cube_topics, Filtered_queries, build_cube
+from database import sqlite_engine
+from topics import Topic_queries
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def random_filters(cube, rng):
+    # A sidebar selection: a few cities and cuisines and a range of months
+    months = cube.values["Order_Month"]
+    low, high = sorted(rng.choice(len(months), 2, replace=False))
+    filters = {"City": list(rng.choice(cube.values["City"], 2, replace=False)),
+               "Cuisine_Type": list(rng.choice(cube.values["Cuisine_Type"], 3, replace=False))}
+    return filters, {"Order_Month": (months[low], months[high])}
+
+def filtered_backend(orders, filters, ranges, workdir):
+    # The selected orders alone in a database of their own, to check the
+    # filtered cube answers against the SQL topics
+    months = pd.to_datetime(orders["Order_Date"])
+    months = months.dt.year * 100 + months.dt.month
+    keep = np.ones(len(orders), dtype=bool)
+    for dim, values in filters.items():
+        keep &= orders[dim].isin(values).to_numpy()
+    low, high = ranges["Order_Month"]
+    keep &= ((months >= low) & (months <= high)).to_numpy()
+    os.makedirs(workdir, exist_ok=True)
+    db_engine = sqlite_engine(os.path.join(workdir, "filtered.db"))
+    orders[keep].to_sql("Food_Order_Details", db_engine, if_exists="append", index=False)
+    return SqlBackend(db_engine, rollups=False), int(keep.sum())
+
+def run(rows, filtered_runs, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), rollups=False,
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(csv_path)
+
+    cube, build_time = timed(build_cube, backend.read_sql, backend.topic_query)
+    print(f"{rows:>10,} orders | cube built in {build_time:5.2f}s: {cube.cells:,} cells, "
+          f"{cube.nbytes / 2**20:6.1f} MB")
+
+    # The cuboid topics, and those the database answers under the filters
+    topics = [*Cube_topics, *Filtered_queries]
+    report = []
+    for topic in topics:
+        expected, sql_time = timed(backend.read_sql, Topic_queries[topic])
+        # The first query of a topic reads its cuboid from the database
+        answer, first_time = timed(cube.topic, topic)
+        _, cube_time = timed(cube.topic, topic)
+        report.append({"topic": topic, "sql_ms": sql_time * 1000, "first_ms": first_time * 1000,
+                       "cube_ms": cube_time * 1000, "same_answer": same_answer(answer, expected)})
+    report = pd.DataFrame(report)
+    print(report.to_string(index=False, float_format="{:9.2f}".format))
+    print(f"{'':>10} every cuboid: {cube.cells:,} cells, {cube.nbytes / 2**20:6.1f} MB")
+
+    rng = np.random.default_rng(3)
+    orders = pd.read_sql("SELECT * FROM Food_Order_Details", backend.db_engine)
+    for run_number in range(filtered_runs):
+        filters, ranges = random_filters(cube, rng)
+        reference, selected = filtered_backend(orders, filters, ranges, os.path.join(workdir, str(run_number)))
+        first, timings, matches = [], [], True
+        for topic in topics:
+            answer, first_time = timed(cube.topic, topic, filters, ranges)
+            _, cube_time = timed(cube.topic, topic, filters, ranges)
+            first.append(first_time * 1000)
+            timings.append(cube_time * 1000)
+            matches &= same_answer(answer, reference.read_sql(Topic_queries[topic]))
+        print(f"{'':>10} {', '.join(map(str, filters['City']))} | {', '.join(map(str, filters['Cuisine_Type']))} | "
+              f"months {ranges['Order_Month'][0]}-{ranges['Order_Month'][1]}: {selected:,} orders | all topics "
+              f"{sum(first):6.1f} ms first, {sum(timings):6.1f} ms after (slowest {max(timings):5.1f} ms) | "
+              f"same answers: {'yes' if matches else 'NO'}")
+        report.loc[len(report)] = ["filtered", 0, sum(first), sum(timings), matches]
+    if not report["same_answer"].all():
+        raise SystemExit("the cube disagrees with the SQL topics")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Topic answers from the in-memory cube vs SQL, unfiltered and filtered")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--filtered-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.filtered_runs, workdir)
@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from benchmarks.bench_cleaning import make_raw_orders
+from bulk_load import Decimal_places, round_half_up
+from cleaning import Food_Delivery_Cleaning
+from database import sqlite_engine
+from dtypes import Date_columns, compact, memory_report
+from ingest import load_chunks
+
+# Aggregations typical of the analysis pages
+Aggregations = [("City", "Final_Amount", "sum"),
+                (["Cuisine_Type","Order_Status"], "Order_Value", "mean"),
+                ("Delivery_Rating", "Delivery_Time_Min", "mean"),
+                (["City","Cancellation_Reason"], "Order_Id", "count")]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def aggregation_time(food_df, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for keys, column, function in Aggregations:
+            food_df.groupby(keys, observed=True)[column].agg(function)
+    return (time.perf_counter() - start) / repeat
+
+def check_values(loaded, compacted):
+    # Same rows and values, DECIMAL columns as the database stores them
+    for column in loaded.columns:
+        expected, actual = loaded[column], compacted[column]
+        if column in Decimal_places:
+            expected = round_half_up(pd.to_numeric(expected), Decimal_places[column])
+            actual = round_half_up(actual.astype("float64"), Decimal_places[column])
+            same = np.array_equal(actual, expected, equal_nan=True)
+        else:
+            if column in Date_columns:
+                expected = pd.to_datetime(expected)
+            same = (expected.astype(object) == actual.astype(object)).all()
+        if not same:
+            raise AssertionError(f"{column} changed")
+
+def report(name, loaded, show_columns):
+    compacted, compact_time = timed(compact, loaded)
+    check_values(loaded, compacted)
+    table = memory_report(loaded)
+    total = table.loc["Total"]
+    print(f"{'':>10} {name:<13} | {total['loaded_bytes'] / 2**20:8.1f} MB -> {total['compact_bytes'] / 2**20:7.1f} MB "
+          f"({total['ratio']:4.1f}x) in {compact_time:5.2f}s | aggregations {aggregation_time(loaded) * 1000:7.1f} ms -> "
+          f"{aggregation_time(compacted) * 1000:7.1f} ms | values unchanged: yes")
+    if show_columns:
+        print(table.to_string(formatters={"loaded_bytes": "{:,.0f}".format, "compact_bytes": "{:,.0f}".format,
+                                          "ratio": "{:.1f}x".format}))
+
+def run(rows, workdir, show_columns):
+    cleaned = Food_Delivery_Cleaning(make_raw_orders(rows))
+    db_engine = sqlite_engine(os.path.join(workdir, f"orders_{rows}.db"))
+    load_chunks([cleaned], db_engine, "Food_Order_Details", rollups=False)
+    with db_engine.connect() as conn:
+        stored = pd.read_sql(text("SELECT * FROM Food_Order_Details"), conn)
+    db_engine.dispose()
+
+    print(f"{rows:>10,} rows")
+    report("cleaned", cleaned, show_columns)
+    report("pd.read_sql", stored, show_columns)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and aggregation speed of the order frame as loaded vs in the compact dtypes")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--columns", action="store_true", help="print the per-column memory report")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir, args.columns)
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.tools
+
+from backends import SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from cube import build_cube
+from database import sqlite_engine
+from figure_cache import FigureCache, Pixel_budget, downsample
+
+# The app's heavier charts, built as its pages build them
+def restaurant_bars(df):
+    fig = px.bar(data_frame=df,x="Restaurant_Name",y="cancellation_percent",color="Restaurant_Name",
+                 title="Restaurant Name Vs Cancelled Orders")
+    fig.update_layout(title_x=0.35,title_font=dict(size=30),width=500,height=550)
+    return fig
+
+def city_histogram(df):
+    fig = px.histogram(data_frame=df,x="City",y="Total_Revenue",color="City",title="🌆City Vs Total Revenue")
+    fig.update_layout(title_x=0.3,title_font=dict(size=30),width=700,height=550)
+    return fig
+
+def cuisine_pie(df):
+    fig = px.pie(data_frame=df,names="Cuisine_Type",values="Total_Revenue",title="Cuisine Vs Total Revenue 💵")
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+def reason_sunburst(df):
+    fig = px.sunburst(df,path=["City", "Cancellation_Reason"],values="count",title="⛔Cancellation Reason Analysis by City")
+    fig.update_layout(width=1200,height=800)
+    return fig
+
+def order_value_line(df):
+    # One point per order: the series LTTB is for
+    return px.line(data_frame=df,x="Order_Date",y="Order_Value",title="Order value over time")
+
+Charts = [("Cancellation rate by restaurant", restaurant_bars),
+          ("High-revenue cities and cuisines", city_histogram),
+          ("High-revenue cities and cuisines", cuisine_pie),
+          ("Cancellation reason analysis", reason_sunburst),
+          ("Order values", order_value_line)]
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def rendered(fig):
+    # What st.plotly_chart sends to the browser
+    return plotly.io.to_json(plotly.tools.return_figure_from_figure_or_data(fig, True), validate=False)
+
+def points_of(fig):
+    # Longest series of a figure: y of bars and lines, values of pies and sunbursts
+    return max(len(trace["y"] if "y" in trace else trace["values"]) for trace in fig.data)
+
+def run(rows, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")),
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(csv_path)
+    cube = build_cube(backend.read_sql)
+    orders = backend.read_sql("SELECT Order_Date, Order_Value FROM Food_Order_Details ORDER BY Order_Date, Order_Id")
+    cache = FigureCache()
+    print(f"{rows:>10,} orders")
+
+    report = []
+    for topic, build in Charts:
+        df = orders if topic == "Order values" else cube.topic(topic)
+        spec, uncached_time = timed(lambda: rendered(build(df)))
+        _, miss_time = timed(lambda: rendered(cache.figure(topic, build, df)))
+        cached, hit_time = timed(lambda: rendered(cache.figure(topic, build, df)))
+        # The cached figure is the built one, with a line longer than the
+        # budget cut to its LTTB points (first and last order kept)
+        built = build(df)
+        points = points_of(built)
+        downsampled = downsample(built)
+        kept = points_of(downsampled)
+        same = json.loads(cached) == json.loads(rendered(downsampled)) and kept == min(points, Pixel_budget)
+        report.append({"chart": build.__name__, "rows": len(df), "points": points, "kept": kept,
+                       "uncached_ms": uncached_time * 1000,
+                       "first_view_ms": miss_time * 1000, "cached_ms": hit_time * 1000,
+                       "payload_kb": len(spec) / 2**10, "cached_kb": len(cached) / 2**10,
+                       "same": same})
+    report = pd.DataFrame(report)
+    print(report.to_string(index=False, float_format="{:9.1f}".format))
+    stats = cache.stats()
+    print(f"{'':>10} {stats['entries']} cached figures, {stats['size_bytes'] / 2**20:.1f} MB, "
+          f"{stats['hits']} hits saved {stats['saved_seconds']:.2f} s")
+    if not report["same"].all():
+        raise SystemExit("a cached figure differs from the one built")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Building and serializing the app's figures vs the figure cache, with LTTB downsampling")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir)
@@ -0,0 +1,113 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from backends import SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from cleaning import Food_Delivery_Cleaning, Raw_dtypes
+from database import sqlite_engine
+from incremental import incremental_ingest, running_statistics
+from ingest import collect_statistics
+from rollups import verify_rollups
+
+# --------------------------------------------------
+# DAILY FILE
+# --------------------------------------------------
+
+def make_daily_file(base, new_rows, changed_rows, seed=11):
+    # A day's export: new orders, corrected copies of existing ones and a few
+    # unchanged repeats
+    rng = np.random.default_rng(seed)
+    new = make_raw_orders(new_rows, seed)
+    new["Order_Id"] = [f"ORD{len(base) + position}" for position in range(new_rows)]
+    picked = base.iloc[rng.choice(len(base), changed_rows * 2, replace=False)].copy()
+    changed, unchanged = picked.iloc[:changed_rows].copy(), picked.iloc[changed_rows:]
+    changed["Order_Value"] = np.round(rng.uniform(100, 2000, changed_rows), 2)
+    changed["Delivery_Rating"] = rng.integers(1, 6, changed_rows).astype("float64")
+    return pd.concat([new, changed, unchanged], ignore_index=True)
+
+def current_orders(base, daily):
+    # What a full reload of everything received so far would see
+    kept = base[~base["Order_Id"].isin(daily["Order_Id"])]
+    return pd.concat([kept, daily], ignore_index=True)
+
+# --------------------------------------------------
+# CHECKS
+# --------------------------------------------------
+
+def same_statistics(actual, expected):
+    for name, value in expected.items():
+        if name.endswith("_first"):
+            continue
+        if isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(actual[name], value, check_exact=True, check_names=False)
+        elif actual[name] != value:
+            raise AssertionError(f"{name}: {actual[name]} != {value}")
+
+def check_cleaned_rows(db_engine, current_path, order_ids):
+    # The upserted rows are cleaned exactly as a full reload would clean them
+    current = pd.read_csv(current_path, dtype=Raw_dtypes)
+    expected = Food_Delivery_Cleaning(current, collect_statistics(current_path))
+    expected = expected[expected["Order_Id"].isin(order_ids)].set_index("Order_Id").sort_index()
+    query = text("SELECT * FROM Food_Order_Details WHERE Order_Id IN :ids").bindparams(bindparam("ids", expanding=True))
+    with db_engine.connect() as conn:
+        stored = pd.read_sql(query, conn, params={"ids": list(order_ids)}).set_index("Order_Id").sort_index()
+    for column in ["Customer_Age","Order_Value","Discount_Applied","Final_Amount","Delivery_Time_Min",
+                   "Distance_km","Delivery_Rating"]:
+        if not np.allclose(stored[column].astype("float64"), expected[column].astype("float64"), atol=0.005):
+            raise AssertionError(f"{column} differs from a full reload")
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def run(rows, daily_rows, workdir):
+    base = make_raw_orders(rows)
+    base_path = os.path.join(workdir, f"orders_{rows}.csv")
+    base.to_csv(base_path, index=False)
+    db_engine = sqlite_engine(os.path.join(workdir, f"orders_{rows}.db"))
+    backend = SqlBackend(db_engine, snapshot_dir=os.path.join(workdir, "snapshots"))
+
+    start = time.perf_counter()
+    backend.load(base_path)
+    full_time = time.perf_counter() - start
+
+    daily = make_daily_file(base, daily_rows, daily_rows // 5)
+    daily_path = os.path.join(workdir, f"daily_{rows}.csv")
+    daily.to_csv(daily_path, index=False)
+
+    start = time.perf_counter()
+    upserted = incremental_ingest(daily_path, db_engine)
+    daily_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    repeated = incremental_ingest(daily_path, db_engine)
+    repeat_time = time.perf_counter() - start
+
+    current_path = os.path.join(workdir, f"current_{rows}.csv")
+    current_orders(base, daily).to_csv(current_path, index=False)
+    same_statistics(running_statistics(db_engine), collect_statistics(current_path))
+    changed = daily["Order_Id"].iloc[:daily_rows + daily_rows // 5]
+    check_cleaned_rows(db_engine, current_path, set(changed))
+    rollups_match = verify_rollups(db_engine)["matches"].all()
+
+    print(f"{rows:>10,} orders | full load {full_time:6.2f}s | daily file of {len(daily):,} rows: "
+          f"{upserted:,} upserted in {daily_time:5.2f}s, repeat {repeated} in {repeat_time:5.2f}s | "
+          f"statistics and cleaned rows match a full reload | rollups match: {'yes' if rollups_match else 'NO'}")
+    if not rollups_match:
+        raise SystemExit("rollups differ from Food_Order_Details after the upsert")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental ingest of a daily file against a loaded history")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--daily-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.daily_rows, workdir)
@@ -0,0 +1,41 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from backends import SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from database import bootstrap, sqlite_engine
+from index_advisor import app_queries, index_report, index_statements, propose_indexes
+
+def run(rows, workdir, url, rollups, repeat):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    if url:
+        db_engine = bootstrap(url, f"ofd_index_bench_{rows}")
+    else:
+        db_engine = sqlite_engine(os.path.join(workdir, f"orders_{rows}.db"))
+    SqlBackend(db_engine, snapshot_dir=os.path.join(workdir, "snapshots")).load(csv_path)
+
+    queries = app_queries(rollups)
+    indexes = propose_indexes(queries)
+    print(f"\n{rows:,} orders on {db_engine.dialect.name}, proposed indexes:")
+    print("\n".join(index_statements(indexes)))
+
+    report = index_report(db_engine, indexes, queries, repeat)
+    with pd.option_context("display.max_colwidth", 90, "display.width", 250):
+        print(report.round(2).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index proposal for the app's queries with EXPLAIN and before/after timings")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--url", help="MySQL server URL; defaults to a temporary SQLite database")
+    parser.add_argument("--all-topics", action="store_true",
+                        help="every topic on Food_Order_Details, as a backend without rollup tables runs them")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir, args.url, not args.all_topics, args.repeat)
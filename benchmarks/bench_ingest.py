@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from benchmarks.bench_cleaning import make_raw_orders
+from bulk_load import bulk_load
+from cleaning import Food_Delivery_Cleaning, Raw_dtypes
+from ingest import stream_ingest, Chunk_size
+
+# --------------------------------------------------
+# INGEST MODES
+# --------------------------------------------------
+
+def full_ingest(csv_path, db_engine):
+    food_df = Food_Delivery_Cleaning(pd.read_csv(csv_path, dtype=Raw_dtypes))
+    return bulk_load(food_df, db_engine)
+
+def measure(ingest, csv_path, db_path, **kwargs):
+    db_engine = create_engine(f"sqlite:///{db_path}")
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = ingest(csv_path, db_engine, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return db_engine, rows, elapsed, peak
+
+def read_back(db_engine):
+    return pd.read_sql("SELECT * FROM Food_Order_Details ORDER BY Order_Id", db_engine)
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def run(rows, chunksize, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    size_mb = os.path.getsize(csv_path) / 2**20
+
+    full_engine, full_rows, full_time, full_peak = measure(
+        full_ingest, csv_path, os.path.join(workdir, f"full_{rows}.db"))
+    stream_engine, stream_rows, stream_time, stream_peak = measure(
+        stream_ingest, csv_path, os.path.join(workdir, f"stream_{rows}.db"), chunksize=chunksize, rollups=False)
+
+    pd.testing.assert_frame_equal(read_back(full_engine), read_back(stream_engine), check_exact=True)
+
+    print(f"{rows:>10,} rows ({size_mb:7.1f} MB csv) | "
+          f"full {full_time:7.2f}s peak {full_peak / 2**20:8.1f} MB | "
+          f"stream {stream_time:7.2f}s peak {stream_peak / 2**20:8.1f} MB | identical tables: yes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of full vs chunked streaming ingest into SQLite")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunksize", type=int, default=Chunk_size)
+    args = parser.parse_args()
+
+    # Peak is measured with tracemalloc (Python and NumPy allocations),
+    # which works the same on every platform.
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.chunksize, workdir)
@@ -0,0 +1,96 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+import plotly.express as px
+
+from backends import SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from database import sqlite_engine
+from page_runner import PageRunner
+from pagination import count_query, page_query
+from topics import Topic_queries
+
+# The app's analysis pages, three topics each in Topic_queries order; every
+# page also shows a table view (row count and first page)
+Pages = [list(Topic_queries)[start:start + 3] for start in range(0, len(Topic_queries), 3)]
+
+Table_columns = ["Order_Id", "City", "Order_Date", "Final_Amount"]
+
+def with_latency(read_sql, latency):
+    # A database over the network: every query waits a round trip longer
+    def delayed(query, params=None):
+        time.sleep(latency)
+        return read_sql(query, params)
+    return delayed
+
+def build_figure(df):
+    return px.bar(data_frame=df, x=df.columns[0], y=df.columns[-1], color=df.columns[0])
+
+def page_work(backend, topics):
+    # (query, builds a figure) pairs of one page
+    work = [(count_query("Food_Order_Details"), False),
+            (page_query("Food_Order_Details", Table_columns, limit=150), False)]
+    return work + [(backend.topic_query(topic), True) for topic in topics]
+
+def sequential(read_sql, work):
+    # One step at a time, as the pages ran before; also the slowest single step
+    frames, slowest = [], 0
+    start = time.perf_counter()
+    for query, figure in work:
+        step = time.perf_counter()
+        frame = read_sql(query)
+        if figure:
+            build_figure(frame)
+        frames.append(frame)
+        slowest = max(slowest, time.perf_counter() - step)
+    return frames, time.perf_counter() - start, slowest
+
+def concurrent(runner, work):
+    start = time.perf_counter()
+    # Every query started at once; each figure built on the pool as soon as
+    # its frame is in, while later queries still run
+    futures = [runner.query(query) for query, _ in work]
+    figures = [runner.submit(build_figure, future.result()) for future, (_, figure) in zip(futures, work) if figure]
+    frames = [future.result() for future in futures]
+    for figure in figures:
+        figure.result()
+    return frames, time.perf_counter() - start
+
+def run(rows, latencies, workers, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    # Full-table topics, so each page has real query work
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), rollups=False,
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(csv_path)
+    build_figure(backend.read_sql(backend.topic_query(Pages[0][0])))  # imports and templates warmed up
+
+    print(f"{rows:>10,} orders, {os.cpu_count()} cores")
+    for latency in latencies:
+        read_sql = with_latency(backend.read_sql, latency)
+        runner = PageRunner(read_sql, workers)
+        for number, topics in enumerate(Pages, 1):
+            work = page_work(backend, topics)
+            expected, serial_time, slowest = sequential(read_sql, work)
+            frames, concurrent_time = concurrent(runner, work)
+            for frame, reference in zip(frames, expected):
+                pd.testing.assert_frame_equal(frame, reference)
+            print(f"{'':>10} latency {latency * 1000:4.0f} ms | page {number}: {len(work)} queries, {len(topics)} figures | "
+                  f"sequential {serial_time * 1000:7.1f} ms | concurrent {concurrent_time * 1000:7.1f} ms "
+                  f"({serial_time / concurrent_time:4.2f}x) | slowest step {slowest * 1000:7.1f} ms | same frames: yes")
+        runner.pool.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A page's queries and figures one at a time vs on the page runner")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--latency", type=float, nargs="+", default=[0, 0.05],
+                        help="seconds added to every query, standing in for a network round trip")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.latency, args.workers, workdir)
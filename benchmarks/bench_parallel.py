@@ -0,0 +1,49 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_cleaning import make_raw_orders
+from cleaning import Food_Delivery_Cleaning, Raw_dtypes
+from ingest import cleaned_chunks, collect_statistics
+from parallel import parallel_cleaned_chunks, parallel_cleaning
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(rows, workers, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    raw = pd.read_csv(csv_path, dtype=Raw_dtypes)
+
+    serial, serial_time = timed(Food_Delivery_Cleaning, raw.copy())
+    serial_chunks, chunks_time = timed(lambda: pd.concat(list(cleaned_chunks(csv_path)), ignore_index=True))
+    print(f"{rows:>10,} rows | serial: in memory {serial_time:6.2f}s, chunked csv {chunks_time:6.2f}s")
+
+    for count in workers:
+        cleaned, clean_time = timed(parallel_cleaning, raw.copy(), count)
+        pd.testing.assert_frame_equal(cleaned, serial, check_exact=True)
+        chunked, chunked_time = timed(lambda: pd.concat(list(parallel_cleaned_chunks(csv_path, workers=count)),
+                                                        ignore_index=True))
+        pd.testing.assert_frame_equal(chunked, serial_chunks, check_exact=True)
+        print(f"{'':>10} {count:>2} workers | in memory {clean_time:6.2f}s ({serial_time / clean_time:4.2f}x), "
+              f"chunked csv {chunked_time:6.2f}s ({chunks_time / chunked_time:4.2f}x) | identical: yes")
+
+    # The counted statistics match the serial pass over the same file
+    stats = collect_statistics(csv_path)
+    pd.testing.assert_frame_equal(parallel_cleaning(raw.copy(), max(workers), stats), serial, check_exact=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial vs process-pool cleaning, checking the outputs are identical")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.workers, workdir)
@@ -0,0 +1,108 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from backends import DuckDBBackend, SqlBackend
+from benchmarks.bench_backends import same_answer
+from benchmarks.bench_cleaning import make_raw_orders
+from database import sqlite_engine
+from partitions import ensure_partitions, month_partitions, read_partitions, year_over_year, yoy_query
+from snapshot import ensure_parquet, ensure_snapshot, read_snapshot
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def best_time(function, *args, repeat=3):
+    result, best = timed(function, *args)
+    for _ in range(repeat - 1):
+        best = min(best, timed(function, *args)[1])
+    return result, best
+
+def size_of(paths):
+    return sum(os.path.getsize(file) for path in paths for file in glob.glob(os.path.join(path, "*.parquet")))
+
+def full_scan_month(snapshot, month):
+    # Without partitions: every order read, then the month kept
+    orders = read_snapshot(snapshot)
+    dates = pd.to_datetime(orders["Order_Date"])
+    return orders[dates.dt.year * 100 + dates.dt.month == month]
+
+def sorted_orders(frame):
+    return frame.sort_values("Order_Id", ignore_index=True)
+
+def run(rows, month, years, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    snapshot_dir = os.path.join(workdir, "snapshots")
+    snapshot = ensure_snapshot(csv_path, snapshot_dir)
+    root, build_time = timed(ensure_partitions, csv_path, snapshot_dir)
+    partitions = month_partitions(root)
+    print(f"{rows:>10,} orders | {len(partitions)} year-month partitions written in {build_time:5.2f}s "
+          f"({size_of(partitions) / 2**20:6.1f} MB)")
+
+    # One month into pandas
+    pruned, pruned_time = best_time(read_partitions, root, month, month)
+    scanned, scan_time = best_time(full_scan_month, snapshot, month)
+    same = len(pruned) == len(scanned) and (sorted_orders(pruned)["Order_Id"].astype(str)
+                                            == sorted_orders(scanned)["Order_Id"].astype(str)).all()
+    print(f"{'':>10} month {month}, pandas | {len(pruned):,} orders from {len(month_partitions(root, month, month))} "
+          f"partition ({size_of(month_partitions(root, month, month)) / 2**10:7.1f} KB) in {pruned_time * 1000:7.1f} ms | "
+          f"whole snapshot {scan_time * 1000:7.1f} ms | same orders: {'yes' if same else 'NO'}")
+    if not same:
+        raise SystemExit("the partition disagrees with the snapshot")
+
+    # One month on DuckDB: the partition alone vs the unpartitioned Parquet
+    duckdb = DuckDBBackend(snapshot_dir)
+    duckdb.load(csv_path)
+    escaped = ensure_parquet(csv_path, snapshot_dir).replace("'", "''")
+    month_query = ("SELECT COUNT(*) AS orders, SUM(Final_Amount) AS revenue FROM Food_Order_Partitions "
+                   "WHERE Year_Month = :month")
+    file_query = (f"SELECT COUNT(*) AS orders, SUM(CAST(Final_Amount AS DECIMAL(10,2))) AS revenue "
+                  f"FROM read_parquet('{escaped}') WHERE YEAR(Order_Date) * 100 + MONTH(Order_Date) = :month")
+    partition_answer, partition_time = best_time(duckdb.read_sql, month_query, {"month": month})
+    file_answer, file_time = best_time(duckdb.read_sql, file_query, {"month": month})
+    same = same_answer(partition_answer, file_answer)
+    print(f"{'':>10} month {month}, DuckDB | partition {partition_time * 1000:7.1f} ms | single Parquet file "
+          f"{file_time * 1000:7.1f} ms | same answer: {'yes' if same else 'NO'}")
+    if not same:
+        raise SystemExit("the partition disagrees with the Parquet file")
+
+    # Year over year of the last `years` years on every source
+    last = int(os.path.basename(partitions[-1]).split("=")[1])
+    first = last - 100 * (years - 1) - last % 100 + 1
+    sqlite = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), snapshot_dir=snapshot_dir)
+    sqlite.load(csv_path)
+    sources = {"sqlite rollups": sqlite.read_sql,
+               "sqlite Order_Date index": sqlite.read_sql,
+               "duckdb partitions": duckdb.read_sql}
+    queries = {"sqlite rollups": yoy_query("rollups", first, last),
+               "sqlite Order_Date index": yoy_query("table", first, last),
+               "duckdb partitions": duckdb.yoy_query(first, last)}
+    reference = None
+    for name, read_sql in sources.items():
+        answer, query_time = best_time(read_sql, *queries[name])
+        trend = year_over_year(answer, first, last)
+        if reference is None:
+            reference = trend
+        same = same_answer(trend, reference)
+        print(f"{'':>10} year over year {first}-{last}, {name:<24} | {len(trend):3d} months in "
+              f"{query_time * 1000:7.1f} ms | same trend: {'yes' if same else 'NO'}")
+        if not same:
+            raise SystemExit(f"{name} disagrees")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Year-month partitions: one month and year-over-year trends vs full scans")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--month", type=int, default=201907, help="YYYYMM of the single-month queries")
+    parser.add_argument("--years", type=int, default=3, help="years of the year-over-year view")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.month, args.years, workdir)
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from backends import DuckDBBackend, SqlBackend
+from cube import build_cube
+from database import sqlite_engine
+from snapshot import ensure_snapshot, open_snapshot
+from synthetic import Customer_skew, Restaurant_skew, write_orders
+from topics import Topic_queries
+
+# One chart per topic, as the app draws it
+Topic_charts = {
+    "Top-spending customers": lambda df: px.histogram(df, x="Customer_ID", y="Total_spent", color="Customer_ID"),
+    "Age Group vs Order value": lambda df: px.pie(df, values="Total_orders", names="Customer_Age_group"),
+    "Weekend vs Weekday Order patterns": lambda df: px.bar(df, x="Order_Day", y="Total_orders", color="Order_day_name"),
+    "Monthly revenue trends": lambda df: px.area(df, x="Month", y="Total_revenue", markers="circle"),
+    "Impact of discounts on profit": lambda df: px.line(df, x="Discount_Applied", y="Avg_profit_margin_percent", markers="circle"),
+    "High-revenue cities and cuisines": lambda df: px.histogram(df, x="City", y="Total_Revenue", color="City"),
+    "Average delivery time by city": lambda df: px.bar(df, x="Avg_delivery_time", y="City", color="City"),
+    "Distance vs delivery delay analysis": lambda df: px.bar(df, x="Distance_range", y="Avg_delivery_time", color="Distance_range"),
+    "Delivery rating vs delivery time": lambda df: px.area(df, x="Delivery_Rating", y="Avg_delivery_time"),
+    "Top-rated restaurants": lambda df: px.bar(df.head(10), x="Restaurant_Name", y="Avg_rating", color="Restaurant_Name"),
+    "Cancellation rate by restaurant": lambda df: px.bar(df.head(10), x="Restaurant_Name", y="cancellation_percent",
+                                                         color="Restaurant_Name"),
+    "Cuisine-wise performance": lambda df: px.bar(df, x="Cuisine_Type", y="Avg_profit_percent", color="Cuisine_Type"),
+    "Peak hour demand analysis": lambda df: px.bar(df, x="Peak_Hour", y="total_orders", color="Peak_Hour"),
+    "Payment mode preferences": lambda df: px.pie(df, values="total_orders", names="Payment_Mode"),
+    "Cancellation reason analysis": lambda df: px.sunburst(df, path=["City", "Cancellation_Reason"], values="count"),
+}
+
+# --------------------------------------------------
+# STAGES
+# --------------------------------------------------
+
+class Stages:
+    # Times each stage and, with memory on, its peak of traced allocations
+    # (tracemalloc, Python and NumPy) above what was held when it started.
+    # Tracing slows Python-heavy stages, so runs compare like with like only
+    # with the same setting.
+
+    def __init__(self, rows, memory=True):
+        self.rows = rows
+        self.memory = memory
+        self.results = []
+
+    def run(self, stage, function, *args):
+        if self.memory:
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+        peak = (tracemalloc.get_traced_memory()[1] - held) / 2**20 if self.memory else None
+        output = len(result) if hasattr(result, "__len__") and not isinstance(result, str) else None
+        self.results.append({"rows": self.rows, "stage": stage, "seconds": round(seconds, 4),
+                             "peak_mb": None if peak is None else round(peak, 2), "output_rows": output})
+        print(f"{'':>10} {stage:<52} {seconds:9.3f}s" + (f" {peak:9.1f} MB" if self.memory else ""))
+        return result
+
+def serialized(build, frame):
+    return pio.to_json(build(frame), validate=False)
+
+def run(rows, backend_name, seed, memory, workdir):
+    print(f"{rows:>10,} orders")
+    stages = Stages(rows, memory)
+    csv_path = stages.run("generate", write_orders, os.path.join(workdir, f"orders_{rows}.csv"), rows, seed)
+    snapshot_dir = os.path.join(workdir, "snapshots")
+    snapshot = stages.run("clean", ensure_snapshot, csv_path, snapshot_dir)
+    if backend_name == "duckdb":
+        backend = DuckDBBackend(snapshot_dir)
+    else:
+        backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), snapshot_dir=snapshot_dir)
+    stages.run("load", backend.load, csv_path)
+    stages.run("cube", build_cube, backend.read_sql, backend.topic_query)
+    for topic in Topic_queries:
+        frame = stages.run(f"query: {topic}", backend.read_sql, backend.topic_query(topic))
+        stages.run(f"figure: {topic}", serialized, Topic_charts[topic], frame)
+
+    loaded = int(backend.read_sql("SELECT COUNT(*) AS orders FROM Food_Order_Details")["orders"].iloc[0])
+    cleaned = open_snapshot(snapshot).num_rows
+    if loaded != cleaned:
+        raise SystemExit(f"{loaded:,} orders loaded from {cleaned:,} cleaned")
+    return stages.results
+
+# --------------------------------------------------
+# REPORT
+# --------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_report(path, results, args):
+    # One stage per line, keys sorted, so two reports diff line by line
+    meta = {"commit": git_commit(), "python": platform.python_version(), "pandas": pd.__version__,
+            "numpy": np.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "backend": args.backend, "seed": args.seed, "customer_skew": Customer_skew,
+            "restaurant_skew": Restaurant_skew, "tracemalloc": not args.no_memory}
+    lines = [json.dumps(result, sort_keys=True) for result in results]
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('{"meta": ' + json.dumps(meta, sort_keys=True) + ',\n"stages": [\n' + ",\n".join(lines) + "\n]}\n")
+
+def compare(old_path, results):
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)
+    merged = pd.DataFrame(old["stages"]).merge(pd.DataFrame(results), on=["rows", "stage"], how="outer",
+                                              suffixes=("_old", "_new"), sort=False)
+    merged = merged.astype({"seconds_old": float, "seconds_new": float, "peak_mb_old": float, "peak_mb_new": float})
+    merged["time_change_%"] = ((merged["seconds_new"] / merged["seconds_old"] - 1) * 100).round(1)
+    merged["memory_change_%"] = ((merged["peak_mb_new"] / merged["peak_mb_old"] - 1) * 100).round(1)
+    print(f"compared with {old_path} (commit {old['meta'].get('commit')})")
+    print(merged[["rows", "stage", "seconds_old", "seconds_new", "time_change_%",
+                  "peak_mb_old", "peak_mb_new", "memory_change_%"]].to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="The whole pipeline on seeded synthetic orders at several scales: "
+                                                 "generate, clean, load, build the cube, then every topic's query and figure")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-memory", action="store_true", help="time the stages without tracemalloc")
+    parser.add_argument("--report", default="pipeline_report.json", help="where to write this run's report")
+    parser.add_argument("--compare", help="an earlier report to compare this run with")
+    args = parser.parse_args()
+
+    if not args.no_memory:
+        tracemalloc.start()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            results += run(rows, args.backend, args.seed, not args.no_memory, workdir)
+    write_report(args.report, results, args)
+    print(f"report written to {args.report}")
+    if args.compare:
+        compare(args.compare, results)
@@ -0,0 +1,83 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from backends import SqlBackend
+from benchmarks.bench_cleaning import make_raw_orders
+from database import sqlite_engine
+from dialects import translate
+from dtypes import compact
+from profiler import profiler
+from topics import Topic_queries
+
+def read_sql_unprofiled(backend, query):
+    # SqlBackend.read_sql as it was before the profiler's phases
+    with backend.db_engine.connect() as conn:
+        return compact(pd.read_sql(text(translate(query, backend.name)), conn))
+
+def disabled_phase_ns(spans=1_000_000):
+    # Cost of one phase while profiling is off
+    profiler.enabled = False
+    start = time.perf_counter()
+    for _ in range(spans):
+        with profiler.phase("execute") as span:
+            span.count(rows=1)
+    return (time.perf_counter() - start) / spans * 1e9
+
+def run(rows, repeat, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")), rollups=False,
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(csv_path)
+    queries = list(Topic_queries.values())
+    print(f"{rows:>10,} orders, {len(queries)} topic queries, best of {repeat} rounds")
+
+    # The phases do not change a frame
+    profiler.enabled = False
+    same = all(backend.read_sql(query).equals(read_sql_unprofiled(backend, query)) for query in queries)
+
+    def all_topics(read_sql):
+        # One view per topic; start_run is a no-op while profiling is off
+        for topic, query in Topic_queries.items():
+            profiler.start_run(topic)
+            read_sql(query)
+
+    # Rounds interleave the variants, so drifting machine load hits each alike
+    variants = {"pd.read_sql": lambda query: read_sql_unprofiled(backend, query),
+                "profiler off": backend.read_sql,
+                "profiler on": backend.read_sql}
+    best = dict.fromkeys(variants, float("inf"))
+    profiler.clear()
+    for _ in range(repeat):
+        for name, read_sql in variants.items():
+            profiler.enabled = name == "profiler on"
+            start = time.perf_counter()
+            all_topics(read_sql)
+            best[name] = min(best[name], time.perf_counter() - start)
+    baseline = best["pd.read_sql"]
+    print(f"{'':>10} " + " | ".join(f"{name} {seconds * 1000:8.1f} ms ({(seconds / baseline - 1) * 100:+5.1f}%)"
+                                    for name, seconds in best.items()) + f" | same frames: {'yes' if same else 'NO'}")
+
+    # Where each topic's time goes
+    summary = profiler.summary()
+    summary = summary[summary["views"] > 0].pivot(index="topic", columns="phase", values="p50_ms")
+    print(summary.to_string(float_format="{:8.2f}".format))
+    profiler.enabled = False
+    if not same:
+        raise SystemExit("the profiled read_sql returns different frames")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead of the phase profiler on read_sql, and each topic's phase breakdown")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"a phase with profiling off costs {disabled_phase_ns():.0f} ns")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.repeat, workdir)
@@ -0,0 +1,143 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from backends import SqlBackend
+from benchmarks.bench_incremental import make_daily_file
+from database import sqlite_engine
+from incremental import incremental_ingest
+from profiles import (Entities, Profile_tables, Ratings, cuisine_query, favourite_cuisines, leaderboard_query,
+                      orders_query, profile_query, rebuild_profiles)
+from synthetic import make_orders
+from topics import Topic_queries
+
+# --------------------------------------------------
+# PROFILES FROM THE TABLE
+# --------------------------------------------------
+
+# The same profiles grouped by SQL over every order
+Expected_queries = {
+    "profile_customer": """
+        SELECT Customer_ID, COUNT(*) AS order_count,
+        SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count,
+        SUM(Order_Value) AS sum_Order_Value, SUM(Final_Amount) AS sum_Final_Amount,
+        MIN(Order_Date) AS first_order, MAX(Order_Date) AS last_order
+        FROM Food_Order_Details GROUP BY Customer_ID
+        """,
+    "profile_customer_cuisine": """
+        SELECT Customer_ID, Cuisine_Type, COUNT(*) AS order_count
+        FROM Food_Order_Details GROUP BY Customer_ID, Cuisine_Type
+        """,
+    "profile_restaurant": """
+        SELECT Restaurant_Name, COUNT(*) AS order_count,
+        SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count,
+        COUNT(Restaurant_Rating) AS cnt_Restaurant_Rating, SUM(Restaurant_Rating) AS sum_Restaurant_Rating,
+        SUM(Final_Amount) AS sum_Final_Amount
+        FROM Food_Order_Details GROUP BY Restaurant_Name
+        """,
+    "profile_partner": f"""
+        SELECT Delivery_Partner_ID, COUNT(*) AS order_count,
+        SUM(CASE WHEN Order_Status = 'Cancelled' THEN 0 ELSE 1 END) AS delivered_count,
+        COUNT(Delivery_Time_Min) AS cnt_Delivery_Time_Min, SUM(Delivery_Time_Min) AS sum_Delivery_Time_Min,
+        {', '.join(f"SUM(CASE WHEN Delivery_Rating = {rating} THEN 1 ELSE 0 END) AS rating_{rating}" for rating in Ratings)}
+        FROM Food_Order_Details GROUP BY Delivery_Partner_ID
+        """,
+}
+
+def check_profiles(db_engine):
+    # Every stored profile equals the SQL grouping; sums compared in the
+    # stored integer units
+    with db_engine.connect() as conn:
+        for table, (keys, sums) in Profile_tables.items():
+            expected = pd.read_sql(text(Expected_queries[table]), conn).set_index(keys).sort_index()
+            stored = pd.read_sql(text(f"SELECT * FROM {table}"), conn).set_index(keys).sort_index()
+            if not expected.index.equals(stored.index):
+                raise SystemExit(f"{table}: {len(stored):,} entities stored, {len(expected):,} in the orders")
+            for column in sums:
+                scale = 100 if column in ("sum_Order_Value", "sum_Final_Amount", "sum_Restaurant_Rating") else 1
+                values = np.rint(expected[column].astype("float64").to_numpy() * scale).astype(np.int64)
+                if not np.array_equal(values, stored[column].to_numpy(dtype=np.int64)):
+                    raise SystemExit(f"{table}.{column} differs from the orders")
+            if table == "profile_customer":
+                for column in ["first_order", "last_order"]:
+                    if not pd.to_datetime(expected[column]).equals(pd.to_datetime(stored[column])):
+                        raise SystemExit(f"{table}.{column} differs from the orders")
+                cuisines = pd.read_sql(text(Expected_queries["profile_customer_cuisine"]), conn)
+                favourites = favourite_cuisines(cuisines).reindex(stored.index)
+                if not (favourites["favourite_cuisine"].equals(stored["favourite_cuisine"])
+                        and favourites["favourite_orders"].astype("int64").equals(stored["favourite_orders"].astype("int64"))):
+                    raise SystemExit("favourite cuisines differ from the orders")
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def milliseconds(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def run(rows, daily_rows, lookups, workdir):
+    base = make_orders(rows)
+    base_path = os.path.join(workdir, f"orders_{rows}.csv")
+    base.to_csv(base_path, index=False)
+    db_engine = sqlite_engine(os.path.join(workdir, f"orders_{rows}.db"))
+    backend = SqlBackend(db_engine, snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(base_path)
+    check_profiles(db_engine)
+
+    start = time.perf_counter()
+    rebuild_profiles(db_engine)
+    rebuild_time = time.perf_counter() - start
+    check_profiles(db_engine)
+
+    daily = make_daily_file(base, daily_rows, daily_rows // 5)
+    daily_path = os.path.join(workdir, f"daily_{rows}.csv")
+    daily.to_csv(daily_path, index=False)
+    start = time.perf_counter()
+    upserted = incremental_ingest(daily_path, db_engine)
+    daily_time = time.perf_counter() - start
+    check_profiles(db_engine)
+
+    print(f"{rows:>10,} orders | rebuild {rebuild_time:6.2f}s | daily file: {upserted:,} orders upserted with "
+          f"profiles in {daily_time:5.2f}s | profiles match the orders after load, rebuild and upsert")
+
+    # One entity: its profile row vs grouping its orders (on their index) and
+    # vs grouping every order; the top 10 from the leaderboard index vs the
+    # full-table topic
+    rng = np.random.default_rng(3)
+    with db_engine.connect() as conn:
+        for entity, (table, key, leaderboards) in Entities.items():
+            keys = pd.read_sql(text(f"SELECT {key} FROM {table}"), conn)[key].to_numpy()
+            picked = iter(rng.choice(keys, 10**6))
+            grouped = Expected_queries[table].replace("GROUP BY", f"WHERE {key} = :key GROUP BY")
+            profile = milliseconds(lambda: backend.read_sql(*profile_query(entity, next(picked))), lookups)
+            indexed = milliseconds(lambda: backend.read_sql(grouped, {"key": next(picked)}), lookups)
+            full = milliseconds(lambda: backend.read_sql(Expected_queries[table]), 3)
+            leaderboard = milliseconds(lambda: backend.read_sql(*leaderboard_query(entity, next(iter(leaderboards)))),
+                                       lookups)
+            detail = milliseconds(lambda: backend.read_sql(*orders_query(entity, next(picked))), lookups)
+            print(f"{'':>10} {entity:<10} {len(keys):>8,} profiles | lookup {profile:6.2f} ms vs its orders grouped "
+                  f"{indexed:7.2f} ms vs all orders grouped {full:8.1f} ms | top 10 {leaderboard:6.2f} ms | "
+                  f"latest orders {detail:6.2f} ms")
+    spenders = milliseconds(lambda: backend.read_sql(Topic_queries["Top-spending customers"]), 3)
+    cuisines = milliseconds(lambda: backend.read_sql(*cuisine_query(next(iter(keys)))), lookups)
+    print(f"{'':>10} top spenders topic over every order {spenders:8.1f} ms | a customer's cuisines {cuisines:6.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entity profiles: checked against grouping every order after a load, "
+                                                 "a rebuild and an incremental upsert, then lookup and leaderboard latency")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--daily-rows", type=int, default=2_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.daily_rows, args.lookups, workdir)
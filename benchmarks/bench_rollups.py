@@ -0,0 +1,64 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from benchmarks.bench_cleaning import make_raw_orders
+from database import sqlite_engine
+from dialects import translate
+from ingest import stream_ingest
+from rollups import Rollup_queries, rebuild_rollups, verify_rollups
+from topics import Topic_queries
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def best_time(db_engine, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with db_engine.connect() as conn:
+            pd.read_sql(text(translate(query, conn.dialect.name)), conn)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def run(rows, workdir, repeat):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    db_engine = sqlite_engine(os.path.join(workdir, f"rollups_{rows}.db"))
+
+    start = time.perf_counter()
+    stream_ingest(csv_path, db_engine)
+    ingest_time = time.perf_counter() - start
+
+    # Maintained at ingest and rebuilt from the table must both match
+    report = verify_rollups(db_engine)
+    rebuild_rollups(db_engine)
+    rebuilt = verify_rollups(db_engine)
+    report["matches"] &= rebuilt["matches"]
+    report["raw_ms"] = [best_time(db_engine, Topic_queries[topic], repeat) * 1000 for topic in report["topic"]]
+    report["rollup_ms"] = [best_time(db_engine, Rollup_queries[topic][0], repeat) * 1000 for topic in report["topic"]]
+    report["speedup"] = report["raw_ms"] / report["rollup_ms"]
+
+    print(f"\n{rows:,} orders, ingest with rollups {ingest_time:.2f}s")
+    print(report.round(2).to_string(index=False))
+    if not report["matches"].all():
+        raise SystemExit("rollup answers differ from the raw-table answers")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify the rollup tables against Food_Order_Details and time both")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir, args.repeat)
@@ -0,0 +1,181 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import SqlBackend
+from cleaning import Food_Delivery_Cleaning
+from benchmarks.bench_cleaning import make_raw_orders
+from benchmarks.bench_incremental import make_daily_file
+from database import sqlite_engine
+from sketches import (HyperLogLog, Sketches, Spend_scale, TopK, approximate_topic, distinct_customers, load_sketches,
+                      order_months, order_spend)
+from topics import Topic_queries
+
+# Exact answers the sketches are checked against
+Exact_queries = {
+    "spend": "SELECT Customer_ID, SUM(Order_Value) AS Total_spent FROM Food_Order_Details GROUP BY Customer_ID",
+    "City": "SELECT City, COUNT(DISTINCT Customer_ID) AS Distinct_customers FROM Food_Order_Details "
+            "WHERE City IS NOT NULL GROUP BY City",
+}
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def skewed_orders(rows, skew, seed=7):
+    # Synthetic orders; with skew > 1, customers and restaurants drawn from a
+    # Zipf law (a few very frequent ones), as in real order logs
+    raw = make_raw_orders(rows, seed)
+    if skew > 1:
+        rng = np.random.default_rng(seed)
+        raw["Customer_ID"] = np.char.add("CUST", (rng.zipf(skew, rows) % 200_000).astype(str))
+        restaurants = (rng.zipf(skew, rows) % 500).astype(str)
+        raw["Restaurant_ID"] = np.char.add("R", restaurants)
+        raw["Restaurant_Name"] = np.char.add("Restaurant_", restaurants)
+    return raw
+
+# The bounds every sketch answer must respect, shared by the benchmark and the
+# deterministic check
+
+def spend_bounded(approximate, truth):
+    # Spent_at_least <= exact total <= Total_spent, to the cent
+    return bool(np.all((approximate["Spent_at_least"] <= truth + 0.005) & (truth <= approximate["Total_spent"] + 0.005)))
+
+def cancellations_bounded(approximate, truth):
+    # Cancelled_at_least <= exact cancellations <= cancelled_orders, and
+    # total_orders never below the exact count
+    cancelled = truth["cancelled_orders"].to_numpy()
+    return bool(np.all((approximate["Cancelled_at_least"].to_numpy() <= cancelled)
+                       & (cancelled <= approximate["cancelled_orders"].to_numpy())
+                       & (approximate["total_orders"].to_numpy() >= truth["total_orders"].to_numpy())))
+
+def distinct_relative(estimate, exact, by):
+    merged = estimate.merge(exact, on=by, suffixes=("", "_exact"))
+    relative = np.abs(merged["Distinct_customers"] - merged["Distinct_customers_exact"]) / merged["Distinct_customers_exact"]
+    return relative, len(merged) == len(exact)
+
+def check_spenders(backend, sketches):
+    # Every reported total brackets the exact one; recall of the exact top 10
+    exact = backend.read_sql(Exact_queries["spend"]).set_index("Customer_ID")["Total_spent"].astype("float64")
+    approximate, fast_time = timed(approximate_topic, sketches, "Top-spending customers")
+    expected, sql_time = timed(backend.read_sql, Topic_queries["Top-spending customers"])
+    truth = exact.reindex(approximate["Customer_ID"]).fillna(0).to_numpy()
+    bounded = spend_bounded(approximate, truth)
+    recall = len(set(approximate["Customer_ID"]) & set(expected["Customer_ID"].astype(str))) / len(expected)
+    relative = float(np.max(np.abs(approximate["Total_spent"] - truth) / truth))
+    spenders = sketches.get("top_spenders", TopK)
+    total = exact.sum() * 100
+    within = spenders.decrement <= total / (spenders.capacity + 1)
+    return {"leaderboard": "top spenders", "sql_ms": sql_time * 1000, "fast_ms": fast_time * 1000,
+            "recall": recall, "max_rel_error": relative, "bounds_hold": bounded and within}
+
+def check_restaurants(backend, sketches):
+    # Counts within their bounds; overlap with the exact 10 with the most
+    # cancellations, which is what the sketch ranks
+    exact = backend.read_sql(Topic_queries["Cancellation rate by restaurant"])
+    exact["Restaurant_Name"] = exact["Restaurant_Name"].astype(str)
+    approximate, fast_time = timed(approximate_topic, sketches, "Cancellation rate by restaurant")
+    expected, sql_time = timed(backend.read_sql, Topic_queries["Cancellation rate by restaurant"])
+    truth = exact.set_index("Restaurant_Name").reindex(approximate["Restaurant_Name"])
+    bounded = cancellations_bounded(approximate, truth)
+    top = exact.sort_values(["cancelled_orders", "Restaurant_Name"], ascending=[False, True]).head(10)
+    recall = len(set(approximate["Restaurant_Name"]) & set(top["Restaurant_Name"])) / len(top)
+    relative = float(np.max(np.abs(approximate["cancelled_orders"].to_numpy()
+                                   - truth["cancelled_orders"].astype("float64").to_numpy())
+                            / truth["cancelled_orders"].astype("float64").to_numpy()))
+    return {"leaderboard": "restaurant cancellations", "sql_ms": sql_time * 1000, "fast_ms": fast_time * 1000,
+            "recall": recall, "max_rel_error": relative, "bounds_hold": bounded}
+
+def check_distinct(backend, sketches, by):
+    # Distinct customers within 4 standard errors (1 in 15,000 per group)
+    if by == "City":
+        exact = backend.read_sql(Exact_queries["City"])
+        exact["City"] = exact["City"].astype(str)
+    else:
+        orders = backend.read_sql("SELECT Customer_ID, Order_Date FROM Food_Order_Details")
+        exact = (orders.groupby(order_months(orders["Order_Date"]).astype("int64").to_numpy())["Customer_ID"].nunique()
+                 .rename_axis("Month").reset_index(name="Distinct_customers"))
+    estimate, fast_time = timed(distinct_customers, sketches, by)
+    relative, complete = distinct_relative(estimate, exact, by)
+    return {"leaderboard": f"distinct customers by {by.lower()}", "sql_ms": np.nan, "fast_ms": fast_time * 1000,
+            "recall": len(relative) / len(exact), "max_rel_error": float(relative.max()),
+            "bounds_hold": bool((relative <= 4 * HyperLogLog().standard_error()).all()) and complete}
+
+def report(backend, label):
+    sketches = load_sketches(backend.db_engine)
+    checks = pd.DataFrame([check_spenders(backend, sketches), check_restaurants(backend, sketches),
+                           check_distinct(backend, sketches, "City"), check_distinct(backend, sketches, "Month")])
+    print(f"{'':>10} {label}")
+    print(checks.to_string(index=False, float_format="{:9.4f}".format))
+    return bool(checks["bounds_hold"].all())
+
+def run(rows, skew, daily_rows, workdir):
+    base = skewed_orders(rows, skew)
+    csv_path = os.path.join(workdir, f"orders_{rows}_{skew}.csv")
+    base.to_csv(csv_path, index=False)
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}_{skew}.db")),
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    _, load_time = timed(backend.load, csv_path)
+    print(f"{rows:>10,} orders, skew {skew} | loaded with rollups and sketches in {load_time:5.2f}s")
+    holds = report(backend, "after the full load")
+
+    # New and corrected orders: the replaced ones leave the sketches
+    daily = make_daily_file(base, daily_rows, daily_rows // 2)
+    daily_path = os.path.join(workdir, f"daily_{rows}_{skew}.csv")
+    pd.concat([base[~base["Order_Id"].isin(daily["Order_Id"])], daily], ignore_index=True).to_csv(daily_path, index=False)
+    backend.load(daily_path)
+    holds &= report(backend, f"after an incremental ingest of {daily_rows:,} new and {daily_rows // 2:,} corrected orders")
+    if not holds:
+        raise SystemExit("a sketch answer is outside its error bound")
+
+def check_bounds(rows=60_000, skew=1.3, chunksize=10_000, seed=11):
+    # Deterministic and without a database: the sketches of a fixed synthetic
+    # frame, added a chunk at a time, against pandas' exact group-bys. More
+    # customers and restaurants than the counters hold, so the bounds are
+    # exercised rather than exact; distinct counts within 3 standard errors.
+    orders = Food_Delivery_Cleaning(skewed_orders(rows, skew, seed)).reset_index(drop=True)
+    sketches = Sketches()
+    for start in range(0, len(orders), chunksize):
+        sketches.add(orders.iloc[start:start + chunksize])
+    assert orders["Customer_ID"].nunique() > sketches.get("top_spenders", TopK).capacity
+
+    spend = pd.Series(order_spend(orders), index=orders.index).groupby(orders["Customer_ID"]).sum() / Spend_scale
+    spenders = approximate_topic(sketches, "Top-spending customers")
+    assert spend_bounded(spenders, spend.reindex(spenders["Customer_ID"]).fillna(0).to_numpy()), spenders
+
+    restaurants = (orders.assign(cancelled_orders=orders["Order_Status"] == "Cancelled")
+                   .groupby("Restaurant_Name", observed=True)
+                   .agg(total_orders=("Order_Id", "size"), cancelled_orders=("cancelled_orders", "sum")))
+    cancellations = approximate_topic(sketches, "Cancellation rate by restaurant")
+    assert cancellations_bounded(cancellations, restaurants.reindex(cancellations["Restaurant_Name"]).fillna(0)), cancellations
+
+    limit = 3 * HyperLogLog().standard_error()
+    for by, groups in [("City", orders["City"].astype(str)), ("Month", order_months(orders["Order_Date"]))]:
+        exact = orders["Customer_ID"].groupby(groups.to_numpy()).nunique().rename_axis(by).reset_index(name="Distinct_customers")
+        relative, complete = distinct_relative(distinct_customers(sketches, by), exact, by)
+        assert complete and (relative <= limit).all(), (by, relative.max(), limit)
+    print(f"{len(orders):>10,} orders, skew {skew} | every sketch answer within its bounds")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fast approximate leaderboards and distinct counts vs the exact SQL")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--skew", type=float, nargs="+", default=[0, 1.3],
+                        help="Zipf exponent of customers and restaurants; 0 keeps them uniform")
+    parser.add_argument("--daily-rows", type=int, default=2_000)
+    parser.add_argument("--check", action="store_true",
+                        help="only the small deterministic bounds check on a fixed synthetic frame (no database)")
+    args = parser.parse_args()
+
+    if args.check:
+        check_bounds()
+        raise SystemExit
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            for skew in args.skew:
+                run(rows, skew, args.daily_rows, workdir)
@@ -0,0 +1,44 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_cleaning import make_raw_orders
+from cleaning import Food_Delivery_Cleaning, Raw_dtypes
+from snapshot import ensure_snapshot, read_snapshot
+
+# Columns a typical analysis topic reads
+Topic_columns = ["City","Cuisine_Type","Final_Amount"]
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(rows, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_raw_orders(rows).to_csv(csv_path, index=False)
+    snapshot_dir = os.path.join(workdir, "snapshots")
+
+    cleaned, clean_time = timed(lambda: Food_Delivery_Cleaning(pd.read_csv(csv_path, dtype=Raw_dtypes)))
+    path, build_time = timed(ensure_snapshot, csv_path, snapshot_dir)
+    _, key_time = timed(ensure_snapshot, csv_path, snapshot_dir)
+    snapshot, read_time = timed(read_snapshot, path)
+    _, columns_time = timed(read_snapshot, path, Topic_columns)
+
+    pd.testing.assert_frame_equal(snapshot, cleaned.reset_index(drop=True), check_exact=True)
+
+    print(f"{rows:>10,} rows | read+clean csv {clean_time:6.2f}s | build snapshot {build_time:6.2f}s "
+          f"({os.path.getsize(path) / 2**20:6.1f} MB) | warm start: key {key_time:5.2f}s + "
+          f"all columns {read_time:5.2f}s, {len(Topic_columns)} columns {columns_time:5.3f}s | identical: yes")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold (clean the CSV) vs warm (memory-mapped snapshot) load of the cleaned dataset")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, workdir)
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from backends import SqlBackend
+from database import sqlite_engine
+from synthetic import write_orders
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose presence after a page's first run shows what it paid for
+Heavy = ["pandas", "numpy", "pyarrow", "sqlalchemy", "plotly.express", "backends"]
+
+# Import cost of the app's dependencies and of its own modules
+Modules = ["streamlit", "pandas", "numpy", "pyarrow.parquet", "sqlalchemy", "mysql.connector", "plotly.express",
+           "plotly.graph_objects", "lazy", "profiler", "query_cache", "page_runner", "pagination", "figure_cache",
+           "analytics", "backends", "cube", "binning", "partitions", "sketches", "snapshot"]
+
+# What Main.py imported up front before the lazy imports
+Eager_imports = ["pandas", "plotly.express", "numpy", "mysql.connector", "streamlit", "plotly.graph_objects",
+                 "backends", "binning", "cube", "figure_cache", "query_cache", "page_runner", "profiler",
+                 "partitions", "pagination", "sketches", "snapshot"]
+
+# (page, topic selected after its first run or None)
+Pages = [("Analysis", None),
+         ("Diagnostics", None),
+         ("home", None),
+         ("Customer & Order Analysis", "Top-spending customers"),
+         ("Revenue & Profit Analysis", "Monthly revenue trends")]
+
+# --------------------------------------------------
+# PROBES (EACH IN A FRESH INTERPRETER)
+# --------------------------------------------------
+
+Import_probe = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+print(json.dumps({{"seconds": time.perf_counter() - start, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+Render_probe = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({main!r}, default_timeout=600)
+app.session_state.page = {page!r}
+app.run()
+first = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+chart = None
+if {topic!r} is not None and not app.exception:
+    app.selectbox[0].select({topic!r}).run()
+    chart = time.perf_counter() - start
+print(json.dumps({{"first_render": first, "first_chart": chart, "loaded": loaded,
+                  "errors": [str(error.value) for error in app.exception]}}))
+"""
+
+def probe(code, env=None):
+    done = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=Root, env=env,
+                          capture_output=True, text=True)
+    if done.returncode:
+        raise SystemExit(done.stderr)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+def best(code, repeat, key, env=None):
+    # The fastest of repeat fresh processes (the least disturbed by the
+    # machine's other work)
+    return min((probe(code, env) for _ in range(repeat)), key=lambda result: result[key])
+
+def import_costs(repeat):
+    print(f"import cost, fresh interpreter, best of {repeat}")
+    for module in Modules + [Eager_imports]:
+        modules = module if isinstance(module, list) else [module]
+        result = best(Import_probe.format(imports="\n".join(f"import {name}" for name in modules), heavy=Heavy),
+                      repeat, "seconds")
+        name = "Main.py's former eager imports" if isinstance(module, list) else module
+        print(f"{'':>10} {name:<32} {result['seconds'] * 1000:8.0f} ms   loads {', '.join(result['loaded']) or '-'}")
+
+def first_renders(rows, repeat, workdir):
+    # A database the app only has to check: the CSV at OFD_DATA_PATH is
+    # already ingested
+    csv_path = write_orders(os.path.join(workdir, f"orders_{rows}.csv"), rows)
+    db_path = os.path.join(workdir, f"orders_{rows}.db")
+    snapshot_dir = os.path.join(workdir, "snapshots")
+    SqlBackend(sqlite_engine(db_path), snapshot_dir=snapshot_dir).load(csv_path)
+    env = dict(os.environ, OFD_BACKEND="sqlite", OFD_SQLITE_PATH=db_path, OFD_SNAPSHOT_DIR=snapshot_dir,
+               OFD_DATA_PATH=csv_path)
+
+    print(f"{rows:>10,} orders, process start to first render, best of {repeat}")
+    for page, topic in Pages:
+        result = best(Render_probe.format(main=os.path.join(Root, "Main.py"), page=page, topic=topic, heavy=Heavy),
+                      repeat, "first_render", env)
+        if result["errors"]:
+            raise SystemExit(f"{page}: {result['errors']}")
+        chart = f"{result['first_chart']:7.2f}s" if result["first_chart"] is not None else f"{'-':>8}"
+        print(f"{'':>10} {page:<28} first render {result['first_render']:6.2f}s | with {topic or 'no topic'}: {chart}"
+              f" | loads {', '.join(result['loaded']) or '-'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start of the dashboard: import cost per module and, per page, "
+                                                 "the time from process start to the first render")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import_costs(args.repeat)
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            first_renders(rows, args.repeat, workdir)
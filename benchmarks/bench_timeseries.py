@@ -0,0 +1,143 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import SqlBackend
+from database import sqlite_engine
+from partitions import year_over_year
+from synthetic import make_orders
+from timeseries import build_series
+
+# --------------------------------------------------
+# THE SAME TRENDS IN SQL
+# --------------------------------------------------
+
+# Rolling windows with SQL window functions over the days that have orders
+# (a RANGE frame on the day number, so missing days count as empty)
+Rolling_query = """
+    WITH daily AS (
+        SELECT Order_Date, {dim},
+        SUM(Final_Amount) AS revenue,
+        SUM(Delivery_Time_Min) AS minutes,
+        COUNT(Delivery_Time_Min) AS deliveries
+        FROM Food_Order_Details
+        GROUP BY Order_Date, {dim})
+    SELECT Order_Date, {dim},
+    SUM(revenue) OVER w AS Revenue,
+    SUM(minutes) OVER w * 1.0 / SUM(deliveries) OVER w AS Avg_delivery_time
+    FROM daily
+    WINDOW w AS (PARTITION BY {dim} ORDER BY julianday(Order_Date) RANGE BETWEEN {preceding} PRECEDING AND CURRENT ROW)
+    """
+
+Monthly_query = """
+    SELECT strftime('%Y-%m-01', Order_Date) AS Date, Cuisine_Type,
+    COUNT(*) AS Orders,
+    SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS Cancellations,
+    SUM(Final_Amount * Profit_Margin) AS Profit
+    FROM Food_Order_Details
+    GROUP BY strftime('%Y-%m-01', Order_Date), Cuisine_Type
+    """
+
+def check(name, expected, answer, keys, columns, places):
+    # expected's rows (the SQL's) against the same keys of the series' answer
+    merged = expected.merge(answer, on=keys, how="left", suffixes=("", "_series"))
+    for column in columns:
+        difference = np.abs(merged[column].astype("float64") - merged[f"{column}_series"].astype("float64"))
+        if not (difference <= 0.5 * 10.0 ** -places).all():
+            raise SystemExit(f"{name}: {column} differs from the SQL by up to {difference.max()}")
+
+def dated(frame):
+    return frame.assign(Date=pd.to_datetime(frame["Date"]))
+
+# --------------------------------------------------
+# BENCHMARK
+# --------------------------------------------------
+
+def milliseconds(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        answer = function()
+    return (time.perf_counter() - start) / repeat * 1000, answer
+
+def run(rows, repeat, workdir):
+    csv_path = os.path.join(workdir, f"orders_{rows}.csv")
+    make_orders(rows).to_csv(csv_path, index=False)
+    backend = SqlBackend(sqlite_engine(os.path.join(workdir, f"orders_{rows}.db")),
+                         snapshot_dir=os.path.join(workdir, "snapshots"))
+    backend.load(csv_path)
+
+    start = time.perf_counter()
+    series = build_series(backend.read_sql)
+    build = time.perf_counter() - start
+    print(f"{rows:>10,} orders | series of {series.days:,} days built in {build:5.2f}s, "
+          f"{series.nbytes / 2**20:5.1f} MB")
+
+    # view -> (SQL query, the series' trend, check of one against the other)
+    window = 28
+    first = series.start + np.timedelta64(window - 1, "D")
+    months = series.dates.year * 100 + series.dates.month
+    last_month = int(months[-1])
+    first_month = last_month - 100 if last_month - 100 >= months[0] + 100 else int(months[0])
+
+    def check_rolling(expected, answer):
+        expected = dated(expected.rename(columns={"Order_Date": "Date"}))
+        check("rolling 28 days per city", expected[expected["Date"] >= pd.Timestamp(first)], answer,
+              ["Date", "City"], ["Revenue", "Avg_delivery_time"], 6)
+
+    def check_monthly(expected, answer):
+        check("months per cuisine", dated(expected), answer, ["Date", "Cuisine_Type"],
+              ["Orders", "Cancellations", "Profit"], 4)
+
+    def check_yoy(expected, answer):
+        expected = year_over_year(expected, first_month, last_month)
+        expected["Date"] = pd.to_datetime(dict(year=expected["Year"], month=expected["Month"], day=1))
+        expected = expected.rename(columns={"Total_revenue": "Revenue", "Previous_year_revenue": "Previous_year_Revenue"})
+        check("year over year", expected, answer, ["Date"], ["Revenue", "Previous_year_Revenue"], 2)
+        check("year over year", expected, answer, ["Date"], ["YoY_change_percent"], 1)
+
+    def rolling(dim):
+        def trend():
+            revenue = series.trend("Revenue", dim, window=window)
+            delivery = series.trend("Avg_delivery_time", dim, window=window)
+            return revenue.assign(Avg_delivery_time=delivery["Avg_delivery_time"])
+        return trend
+
+    def monthly():
+        frames = [series.trend(metric, "Cuisine_Type", period="M") for metric in ["Orders", "Cancellations", "Profit"]]
+        return frames[0].join([frame.iloc[:, -1] for frame in frames[1:]])
+
+    views = {
+        "28-day revenue and delivery time per city": (
+            (Rolling_query.format(dim="City", preceding=window - 1), None), rolling("City"), check_rolling),
+        "orders, cancellations and profit per cuisine and month": (
+            (Monthly_query, None), monthly, check_monthly),
+        "monthly revenue over the year before": (
+            backend.yoy_query(first_month, last_month),
+            lambda: series.trend("Revenue", period="M", yoy=True, ranges={"Order_Month": (first_month, last_month)}),
+            check_yoy),
+    }
+    for view, (query, trend, check_view) in views.items():
+        sql_ms, expected = milliseconds(lambda: backend.read_sql(*query), max(1, repeat // 10))
+        series_ms, answer = milliseconds(trend, repeat)
+        check_view(expected, answer)
+        print(f"{'':>10} {view:<56} SQL {sql_ms:8.1f} ms | series {series_ms:7.2f} ms "
+              f"({sql_ms / series_ms:6.0f}x) | equal")
+
+    for window in [7, 28, 90]:
+        ms, _ = milliseconds(lambda: series.trend("Revenue", "City", window=window, yoy=True), repeat)
+        print(f"{'':>10} rolling {window:>2} days per city with year over year {ms:7.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily series trends (rolling windows, months, year over year) "
+                                                 "from the precomputed arrays vs the same in SQL, checked equal")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            run(rows, args.repeat, workdir)
@@ -0,0 +1,199 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import round_half_up, scaled_integers
+from cube import filter_conditions, mean, total
+from dtypes import compact
+from rollups import Measures
+
+# --------------------------------------------------
+# BINNABLE COLUMNS
+# --------------------------------------------------
+
+# Numeric columns of Food_Order_Details that can be binned, with the decimal
+# places they are stored with: bin edges are rounded to them, so an edge
+# compares the same in SQL and in numpy
+Bin_columns = {"Distance_km": 2,
+               "Discount_Applied": 2,
+               "Delivery_Time_Min": 0,
+               "Order_Value": 2,
+               "Customer_Age": 0}
+
+# A binned answer has at most this many rows, however many orders there are
+Max_bins = 200
+
+# Equal-width bins over the column's range when an analysis is given none
+Default_bins = 10
+
+# --------------------------------------------------
+# BINS
+# --------------------------------------------------
+
+class Bins:
+    # Bin i holds the values in (edges[i], edges[i + 1]]; the first bin also
+    # takes everything at or below edges[1] and the last everything above
+    # edges[-2], as the distance CASE expression did
+
+    def __init__(self, edges, labels=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        if len(self.edges) < 2:
+            raise ValueError("bins need at least two edges")
+        if len(self.edges) - 1 > Max_bins:
+            raise ValueError(f"{len(self.edges) - 1} bins, at most {Max_bins} are allowed")
+        self.labels = list(labels) if labels is not None else edge_labels(self.edges)
+
+    def __len__(self):
+        return len(self.edges) - 1
+
+    def codes(self, values):
+        return np.searchsorted(self.edges[1:-1], values, side="left")
+
+def edge_labels(edges):
+    labels = [f"{low:g}-{high:g}" for low, high in zip(edges[:-1], edges[1:])]
+    if math.isinf(edges[-1]):
+        labels[-1] = f"{edges[-2]:g}+"
+    return labels
+
+def distinct_edges(edges, decimals):
+    return np.unique(round_half_up(np.asarray(edges, dtype=np.float64), decimals))
+
+def count_bins(low, high, bins, decimals=2):
+    # bins equal-width bins over [low, high]
+    if high <= low:
+        return Bins([low, low])
+    return Bins(distinct_edges(np.linspace(low, high, bins + 1), decimals))
+
+def width_bins(low, high, width, decimals=2):
+    # Bins of the given width, aligned on multiples of it
+    start = math.floor(low / width) * width
+    bins = max(1, math.ceil((high - start) / width))
+    if bins > Max_bins:
+        raise ValueError(f"width {width:g} makes {bins} bins, at most {Max_bins} are allowed")
+    return Bins(distinct_edges(start + width * np.arange(bins + 1), decimals))
+
+def quantile_bins(values, weights, bins, decimals=2):
+    # About equally many orders per bin: edges at the weighted quantiles of
+    # the distinct values (repeated values merge bins, so there may be fewer)
+    order = np.argsort(values)
+    values, weights = np.asarray(values, dtype=np.float64)[order], np.asarray(weights, dtype=np.float64)[order]
+    cumulative = np.cumsum(weights)
+    positions = np.searchsorted(cumulative, np.linspace(0, 1, bins + 1)[1:-1] * cumulative[-1], side="left")
+    edges = np.concatenate([[values[0]], values[positions], [values[-1]]])
+    return Bins(distinct_edges(edges, decimals) if len(np.unique(edges)) > 1 else [values[0], values[0]])
+
+# The distance analysis' ranges
+Distance_ranges = Bins([0, 5, 10, 15, 20, 30, math.inf],
+                       ["0-5 km", "5-10 km", "10-15 km", "15-20 km", "20-30 km", "30+ km"])
+
+# --------------------------------------------------
+# BUCKET AGGREGATES
+# --------------------------------------------------
+
+# Both ways return the measures per bin as the cube sums them (order_count,
+# cancelled_count, cnt_<measure> and sum_<measure> in the integer units of
+# rollups.Measures), so the topic formulas are shared
+
+def bin_query(column, bins, table="Food_Order_Details", conditions=()):
+    # Bucket aggregates computed by the database; orders without a value, or
+    # failing the SQL conditions, are left out
+    decimals = Bin_columns[column]
+    cases = " ".join(f"WHEN {column} <= {edge:.{decimals}f} THEN {position}"
+                     for position, edge in enumerate(bins.edges[1:-1]))
+    bucket = f"CASE {cases} ELSE {len(bins) - 1} END" if cases else "0"
+    measures = [f"COUNT({measure}) AS cnt_{measure}, SUM({measure}) AS sum_{measure}" for measure in Measures]
+    return f"""
+        SELECT {bucket} AS bucket,
+        COUNT(*) AS order_count,
+        SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count,
+        {', '.join(measures)}
+        FROM {table}
+        WHERE {" AND ".join([f"{column} IS NOT NULL", *conditions])}
+        GROUP BY bucket
+        ORDER BY bucket;
+        """
+
+def query_groups(frame, bins):
+    # Groups of a bin_query answer, one entry per bin (empty bins as zeros)
+    buckets = frame["bucket"].to_numpy(dtype=np.int64)
+    groups = {"bucket": np.arange(len(bins))}
+    for name in frame.columns.drop("bucket"):
+        scale = Measures[name[4:]] if name.startswith("sum_") else 1
+        values = np.zeros(len(bins), dtype=np.int64)
+        values[buckets] = np.nan_to_num(scaled_integers(frame[name], scale)).astype(np.int64)
+        groups[name] = values
+    return groups
+
+def cube_groups(cube, column, bins, filters=None, ranges=None):
+    # Bucket aggregates under the cube's sidebar filters, by the database:
+    # the binned columns are near-unique per order, so they are not cube
+    # dimensions
+    conditions, params = filter_conditions(filters, ranges)
+    return query_groups(cube.read_sql(bin_query(column, bins, conditions=conditions), params), bins)
+
+# --------------------------------------------------
+# BINNED TOPICS
+# --------------------------------------------------
+
+# topic -> (binned column, label column, {column: formula}). The formulas are
+# the topic's own (cube.Cube_topics), per bin instead of per value.
+Binned_topics = {
+    "Distance vs delivery delay analysis": (
+        "Distance_km", "Distance_range",
+        {"total_orders": lambda g: g["order_count"],
+         "Avg_delivery_time": lambda g: mean(g, "Delivery_Time_Min")}),
+    "Impact of discounts on profit": (
+        "Discount_Applied", "Discount_range",
+        {"Total_orders": lambda g: g["order_count"],
+         "Total_Revenue": lambda g: total(g, "Final_Amount"),
+         "Avg_order_value": lambda g: mean(g, "Order_Value"),
+         "Avg_profit_margin": lambda g: mean(g, "Profit_Margin"),
+         "Avg_profit_margin_percent": lambda g: mean(g, "Profit_Margin_Percent")}),
+}
+
+def binned_summary(groups, bins, label, columns):
+    # One row per bin that has orders, in bin order
+    summary = pd.DataFrame({label: bins.labels,
+                            "Low": bins.edges[:-1],
+                            "High": bins.edges[1:]})
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, formula in columns.items():
+            summary[name] = formula(groups)
+    return compact(summary[groups["order_count"] > 0].reset_index(drop=True))
+
+def binned_topic(topic, groups, bins):
+    column, label, columns = Binned_topics[topic]
+    return binned_summary(groups, bins, label, columns)
+
+# The measures of any binnable column's bins (binned_column)
+Column_summary = {"Total_orders": lambda g: g["order_count"],
+                  "Cancelled_orders": lambda g: g["cancelled_count"],
+                  "Total_Revenue": lambda g: total(g, "Final_Amount"),
+                  "Avg_order_value": lambda g: mean(g, "Order_Value"),
+                  "Avg_delivery_time": lambda g: mean(g, "Delivery_Time_Min"),
+                  "Avg_profit_margin_percent": lambda g: mean(g, "Profit_Margin_Percent")}
+
+def binned_column(column, groups, bins):
+    return binned_summary(groups, bins, f"{column}_range", Column_summary)
+
+def column_range(cube, column):
+    # (lowest, highest) stored value of a column; cube is anything with
+    # read_sql(query, params), a backend too
+    frame = cube.read_sql(f"SELECT MIN({column}) AS low, MAX({column}) AS high FROM Food_Order_Details;", None)
+    return float(frame["low"].iloc[0]), float(frame["high"].iloc[0])
+
+def value_weights(cube, column):
+    # Distinct values of a column and their order counts, for quantile_bins
+    frame = cube.read_sql(f"""
+        SELECT {column}, COUNT(*) AS order_count
+        FROM Food_Order_Details
+        WHERE {column} IS NOT NULL
+        GROUP BY {column};
+        """, None)
+    return frame[column].to_numpy(dtype=np.float64), frame["order_count"].to_numpy(dtype=np.int64)
+
+def default_bins(cube, column):
+    # Default_bins equal-width bins over the column's whole range
+    low, high = column_range(cube, column)
+    return count_bins(low, high, Default_bins, Bin_columns[column])
@@ -0,0 +1,205 @@
+import csv
+import datetime
+import itertools
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+
+Batch_size = 5_000
+
+# Fastest strategy per SQLAlchemy dialect, from benchmarks/bench_bulk_load.py.
+# Anything not listed falls back to multi-row INSERTs.
+Default_strategy = {"mysql": "infile",
+                    "sqlite": "multirow"}
+
+# Bound-parameter limit of one statement, caps the multi-row batch size
+Max_parameters = {"sqlite": 32766}
+
+Known_tables = set()
+
+# DECIMAL(p,2) columns of the Food_Order_Details DDL. They are rounded the way
+# MySQL stores them, so every backend holds the same values.
+Decimal_places = {"Distance_km": 2,
+                  "Order_Value": 2,
+                  "Discount_Applied": 2,
+                  "Final_Amount": 2,
+                  "Restaurant_Rating": 2,
+                  "Profit_Margin": 2,
+                  "Profit_Margin_Percent": 2}
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def ensure_table(db_engine, table, food_df):
+    key = (str(db_engine.url), table)
+    if key not in Known_tables:
+        if not inspect(db_engine).has_table(table):
+            # Local stand-ins (SQLite) get a table shaped like the frame
+            food_df.head(0).to_sql(table, db_engine, index=False)
+        Known_tables.add(key)
+
+def scaled_integers(values, scale):
+    # values * scale rounded half away from zero, as MySQL rounds the shortest
+    # decimal form of a float into a DECIMAL column. Each value is compared
+    # with the double nearest to the midpoint between its two candidates, so
+    # binary float error cannot move a value across the midpoint.
+    values = np.asarray(pd.to_numeric(values, errors="coerce"), dtype="float64")
+    magnitude = np.abs(values)
+    lower = np.floor(magnitude * scale)
+    midpoint = (2 * lower + 1) / (2 * scale)
+    return np.sign(values) * np.where(magnitude >= midpoint, lower + 1, lower)
+
+def round_half_up(values, places):
+    return scaled_integers(values, 10 ** places) / 10 ** places
+
+def driver_columns(food_df):
+    # Column values in the plain forms every DBAPI driver binds and
+    # LOAD DATA parses: ISO dates, HH:MM:SS times, 0/1 flags, NULL for NaN.
+    columns = {}
+    for column in food_df.columns:
+        series = food_df[column]
+        if series.dtype.kind == "M":
+            date_only = (series.dt.normalize() == series).all()
+            series = series.dt.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S")
+        elif series.dtype.kind == "f" and column in Decimal_places:
+            series = pd.Series(round_half_up(series, Decimal_places[column]), index=series.index)
+        elif series.dtype.kind == "b":
+            series = series.astype("int8")
+        elif series.dtype == object:
+            first = series.first_valid_index()
+            if first is not None and isinstance(series.at[first], datetime.time):
+                series = series.astype(str).where(series.notna())
+        columns[column] = series
+    return pd.DataFrame(columns)
+
+def driver_rows(food_df):
+    values = driver_columns(food_df).astype(object)
+    return list(values.where(values.notna(), None).itertuples(index=False, name=None))
+
+def insert_sql(conn, table, columns, rows=1):
+    placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    group = f"({', '.join([placeholder] * len(columns))})"
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([group] * rows)}"
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        yield batch
+
+# --------------------------------------------------
+# STRATEGIES
+# --------------------------------------------------
+
+def load_multirow(food_df, conn, table, batch_size):
+    # One INSERT ... VALUES (...), (...), ... statement per batch
+    columns = list(food_df.columns)
+    limit = Max_parameters.get(conn.dialect.name)
+    if limit:
+        batch_size = max(1, min(batch_size, limit // len(columns)))
+    for batch in batches(driver_rows(food_df), batch_size):
+        flat = tuple(itertools.chain.from_iterable(batch))
+        conn.exec_driver_sql(insert_sql(conn, table, columns, len(batch)), flat)
+
+def load_executemany(food_df, conn, table, batch_size):
+    statement = insert_sql(conn, table, list(food_df.columns))
+    for batch in batches(driver_rows(food_df), batch_size):
+        conn.exec_driver_sql(statement, batch)
+
+def load_infile(food_df, conn, table, batch_size):
+    # The frame goes through a temporary CSV. MySQL reads it server side with
+    # LOAD DATA LOCAL INFILE (the engine needs allow_local_infile=True); other
+    # backends replay the file through executemany as a local stand-in.
+    handle, path = tempfile.mkstemp(suffix=".csv")
+    os.close(handle)
+    try:
+        driver_columns(food_df).to_csv(path, index=False, header=False, na_rep="\\N", lineterminator="\n")
+        columns = list(food_df.columns)
+        if conn.dialect.name == "mysql":
+            conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' INTO TABLE {table} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\n' ({', '.join(columns)})")
+        else:
+            statement = insert_sql(conn, table, columns)
+            with open(path, newline="") as file:
+                rows = (tuple(None if value == "\\N" else value for value in row) for row in csv.reader(file))
+                for batch in batches(rows, batch_size):
+                    conn.exec_driver_sql(statement, batch)
+    finally:
+        os.remove(path)
+
+Strategies = {"multirow": load_multirow,
+              "executemany": load_executemany,
+              "infile": load_infile}
+
+# --------------------------------------------------
+# BULK LOAD
+# --------------------------------------------------
+
+def bulk_load(food_df, db_engine, table="Food_Order_Details", strategy=None, batch_size=Batch_size):
+    if food_df.empty:
+        return 0
+    chosen = strategy or Default_strategy.get(db_engine.dialect.name, "multirow")
+    ensure_table(db_engine, table, food_df)
+    try:
+        with db_engine.begin() as conn:
+            Strategies[chosen](food_df, conn, table, batch_size)
+    except DBAPIError as error:
+        # e.g. local_infile disabled on the server; only the automatic choice
+        # falls back, an explicitly requested strategy reports the failure
+        if strategy is not None or chosen == "multirow":
+            raise
+        warnings.warn(f"{chosen} bulk load failed ({error.orig}), using multi-row INSERTs")
+        with db_engine.begin() as conn:
+            load_multirow(food_df, conn, table, batch_size)
+    return len(food_df)
+
+# --------------------------------------------------
+# THROUGHPUT REPORT
+# --------------------------------------------------
+
+# Rows are loaded into a scratch table the report creates and drops, never
+# into the orders themselves: each strategy starts from an empty table
+Bench_table = "Food_Order_Details_bench"
+
+def throughput_report(food_df, db_engine, table=Bench_table,
+                      strategies=None, batch_sizes=(500, Batch_size)):
+    cases = [("to_sql", None)]
+    for strategy in strategies or Strategies:
+        cases += [(strategy, batch_size) for batch_size in batch_sizes]
+
+    if inspect(db_engine).has_table(table):
+        raise ValueError(f"{table} already exists; the throughput report only loads into a table it creates")
+    ensure_table(db_engine, table, food_df)
+    report = []
+    try:
+        for strategy, batch_size in cases:
+            with db_engine.begin() as conn:
+                conn.exec_driver_sql(f"DELETE FROM {table}")
+            start = time.perf_counter()
+            if strategy == "to_sql":
+                # pandas' default path, the baseline being replaced
+                food_df.to_sql(table, db_engine, if_exists="append", index=False)
+            else:
+                bulk_load(food_df, db_engine, table, strategy, batch_size)
+            seconds = time.perf_counter() - start
+            with db_engine.connect() as conn:
+                loaded = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+            report.append({"backend": db_engine.dialect.name,
+                           "strategy": strategy,
+                           "batch_size": batch_size,
+                           "rows": loaded,
+                           "seconds": round(seconds, 3),
+                           "rows_per_sec": round(loaded / seconds)})
+    finally:
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+        Known_tables.discard((str(db_engine.url), table))
+    return pd.DataFrame(report).sort_values("rows_per_sec", ascending=False, ignore_index=True)
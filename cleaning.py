@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+
+# --------------------------------------------------
+# CLEANING RULES
+# --------------------------------------------------
+
+# Constant defaults for categorical gaps. Delivery_Rating and Discount_Applied
+# are filled with their column medians, computed before any fill happens.
+Default_values = {"City":"Hyderabad",
+                  "Cuisine_Type":"Indian",
+                  "Payment_Mode" : "Card",
+                  "Customer_Gender" : "Other",
+                  "Peak_Hour":"False",
+                  "Order_Time" :"0:00",
+                  "Area" : "South"}
+
+Median_columns = ["Delivery_Rating","Discount_Applied"]
+
+# Column types for reading the raw CSV. Pinning them keeps every chunk of a
+# chunked read typed exactly like a full read of the file.
+Text_columns = ["Order_Id","Customer_ID","Customer_Gender","City","Area","Restaurant_ID",
+                "Restaurant_Name","Cuisine_Type","Order_Date","Order_Time","Payment_Mode",
+                "Order_Status","Cancellation_Reason","Delivery_Partner_ID","Order_Day"]
+Number_columns = ["Customer_Age","Delivery_Time_Min","Distance_km","Order_Value","Discount_Applied",
+                  "Final_Amount","Delivery_Rating","Restaurant_Rating","Profit_Margin"]
+Raw_dtypes = {**{column: "object" for column in Text_columns},
+              **{column: "float64" for column in Number_columns}}
+
+# (column, group keys) in the order the fills must run: Distance_km is grouped
+# on Delivery_Time_Min, so it has to come after that column is filled.
+Group_median_fills = [("Customer_Age", ["Customer_Gender","Area"]),
+                      ("Order_Value", ["City","Area","Cuisine_Type"]),
+                      ("Delivery_Time_Min", ["Delivery_Rating"]),
+                      ("Distance_km", ["Delivery_Time_Min","Delivery_Rating"])]
+
+# --------------------------------------------------
+# VECTORIZED HELPERS
+# --------------------------------------------------
+
+def iqr_bounds(values):
+    Q1 = np.percentile(values,25)
+    Q3 = np.percentile(values,75)
+
+    IQR = Q3 - Q1
+
+    return Q1 - (1.5*IQR), Q3 + (1.5*IQR)
+
+def group_medians(food_df, column, keys):
+    return food_df.groupby(keys)[column].median()
+
+def fill_group_median(food_df, column, keys, medians):
+    # Only the missing rows are looked up in the precomputed median table,
+    # which replaces the per-group Python lambda of groupby().transform().
+    missing = food_df[column].isna().to_numpy()
+    if not missing.any():
+        return food_df
+    if len(keys) == 1:
+        values = food_df.loc[missing, keys[0]].map(medians).to_numpy()
+    else:
+        index = pd.MultiIndex.from_frame(food_df.loc[missing, keys])
+        values = medians.reindex(index).to_numpy()
+    food_df.loc[missing, column] = values
+    return food_df
+
+def parse_datetimes(values, first=None):
+    # Orders repeat a few thousand dates and at most 1440 clock times, so only
+    # the distinct strings are parsed. factorize keeps first-seen order, so
+    # pandas infers the same format it would have from the full column.
+    # A chunk passes the first value of the whole file to anchor that guess.
+    codes, uniques = pd.factorize(values)
+    if first is None:
+        parsed = pd.DatetimeIndex(pd.to_datetime(uniques))
+    else:
+        parsed = pd.DatetimeIndex(pd.to_datetime(np.concatenate([[first], uniques])))[1:]
+    return parsed, codes
+
+def add_features(food_df):
+    age = food_df['Customer_Age'].to_numpy()
+    food_df["Customer_Age_group"] = np.where((age > 15) & (age < 24), "Youth", "Adults")
+
+    rating = food_df["Delivery_Rating"].to_numpy()
+    food_df["Delivery_Performance"] = np.select([rating >= 4, rating >= 2], ["Good", "Moderate"], "Worst")
+
+    food_df['Profit_Margin_Percent'] = food_df['Profit_Margin']*100
+
+    food_df['Peak_Hour_Indicator'] = np.where(food_df['Peak_Hour'].to_numpy(), "High", "Low")
+
+    food_df['Order_day_name'] = food_df['Order_Date'].dt.day_name()
+
+    return food_df
+
+# --------------------------------------------------
+# DATA CLEANING AND PREPROCESSING
+# --------------------------------------------------
+
+# stats holds the global statistics of the whole dataset (see
+# ingest.collect_statistics). Without it they are computed from food_df itself.
+
+def Food_Delivery_Cleaning(food_df, stats=None):
+    food_df = food_df.dropna(subset=["Order_Date"])
+    if stats is None:
+        stats = {}
+
+    Replace_value = dict(Default_values)
+    for column in Median_columns:
+        if column not in stats:
+            stats[column] = food_df[column].median()
+        Replace_value[column] = stats[column]
+    food_df = food_df.fillna(Replace_value)
+
+    if "Discount_bounds" not in stats:
+        stats["Discount_bounds"] = iqr_bounds(food_df['Discount_Applied'])
+    lower_bound, upper_bound = stats["Discount_bounds"]
+    food_df['Discount_Applied'] = food_df['Discount_Applied'].clip(lower_bound, upper_bound)
+
+    for column, keys in Group_median_fills:
+        if column not in stats:
+            stats[column] = group_medians(food_df, column, keys)
+        fill_group_median(food_df, column, keys, stats[column])
+
+    return finish_cleaning(food_df, stats)
+
+def finish_cleaning(food_df, stats):
+    # Everything after the imputations is row-local
+    food_df['Final_Amount'] = food_df['Order_Value'] - food_df['Discount_Applied']
+
+    delivered = (food_df["Order_Status"] == "Delivered").to_numpy()
+    cancelled = (food_df["Order_Status"] == "Cancelled").to_numpy()
+    no_reason = food_df["Cancellation_Reason"].isnull().to_numpy()
+    food_df.loc[delivered & no_reason, "Cancellation_Reason"] = "No Cancellation"
+    food_df.loc[cancelled & no_reason, "Cancellation_Reason"] = "Not Mentioned"
+
+    food_df[["Customer_Age","Delivery_Time_Min","Delivery_Rating"]]=food_df[["Customer_Age","Delivery_Time_Min","Delivery_Rating"]].astype("int")
+
+    dates, codes = parse_datetimes(food_df['Order_Date'], stats.get("Order_Date_first"))
+    food_df['Order_Date'] = dates.take(codes, allow_fill=True, fill_value=pd.NaT).to_numpy()
+
+    food_df['Peak_Hour'] = food_df['Peak_Hour'].astype("bool")
+
+    times, codes = parse_datetimes(food_df['Order_Time'], stats.get("Order_Time_first"))
+    food_df['Order_Time'] = times.time[codes]
+
+    return add_features(food_df)
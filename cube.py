@@ -0,0 +1,378 @@
+import datetime
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import round_half_up, scaled_integers
+from dtypes import compact
+from rollups import Measures
+from topics import Topic_queries
+
+# --------------------------------------------------
+# CUBE DEFINITION
+# --------------------------------------------------
+
+# The sidebar filters on these, so every cuboid keeps them: any filter is
+# then answered from the cuboid already built for a topic. Order_Month is
+# the year and month of the order as YYYYMM; Month, the month of the year
+# the monthly trend groups by, is derived from it.
+Filter_dimensions = ["Order_Month", "City", "Cuisine_Type"]
+
+# Dimensions computed by the database, as SQL; the others are columns
+Dimension_sql = {
+    "Order_Month": "YEAR(Order_Date) * 100 + MONTH(Order_Date)",
+    "Distance_range": """CASE WHEN Distance_km <= 5 THEN '0-5 km' WHEN Distance_km <= 10 THEN '5-10 km'
+        WHEN Distance_km <= 15 THEN '10-15 km' WHEN Distance_km <= 20 THEN '15-20 km'
+        WHEN Distance_km <= 30 THEN '20-30 km' ELSE '30+ km' END""",
+}
+
+Derived_dimensions = {"Month": ("Order_Month", lambda months: months % 100)}
+
+# Group keys up to this many combinations are aggregated with a dense
+# bincount; larger groupings go through np.unique
+Dense_groups = 2**22
+
+# --------------------------------------------------
+# CUBOID QUERIES
+# --------------------------------------------------
+
+# A cuboid is the orders summed per combination of a topic's dimensions and
+# the filter dimensions, read with one GROUP BY, so its size follows those
+# dimensions' values and not the number of orders. Measures come back in
+# the integer units of rollups.Measures, so sums stay exact.
+
+def cuboid_query(dims):
+    columns = [f"{Dimension_sql.get(dim, dim)} AS {dim}" for dim in dims]
+    measures = [f"COUNT({measure}) AS cnt_{measure}, SUM({measure}) AS sum_{measure}" for measure in Measures]
+    return f"""
+        SELECT {', '.join(columns)},
+        COUNT(*) AS order_count,
+        SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count,
+        {', '.join(measures)}
+        FROM Food_Order_Details
+        GROUP BY {', '.join(dims)}
+        """
+
+def plain(value):
+    # numpy scalars as the Python values drivers bind
+    return value.item() if isinstance(value, np.generic) else value
+
+def filter_conditions(filters=None, ranges=None):
+    # ([SQL condition], params) selecting the orders the cube's filters
+    # {dim: values to keep} and Order_Month ranges keep; the month range is a
+    # range of Order_Date, so its index serves it
+    conditions, params = [], {}
+    for dim, chosen in (filters or {}).items():
+        names = [f"{dim}_{position}" for position in range(len(chosen))]
+        params.update(zip(names, map(plain, chosen)))
+        conditions.append(f"{Dimension_sql.get(dim, dim)} IN ({', '.join(f':{name}' for name in names)})")
+    for dim, (low, high) in (ranges or {}).items():
+        if dim != "Order_Month":
+            raise ValueError(f"SQL ranges are over Order_Month only, not {dim}")
+        low, high = int(low), int(high)
+        params["start"] = datetime.date(low // 100, low % 100, 1).isoformat()
+        params["end"] = datetime.date(high // 100 + high % 100 // 12, high % 100 % 12 + 1, 1).isoformat()
+        conditions.append("Order_Date >= :start AND Order_Date < :end")
+    return conditions, params
+
+def cuboid_frame(frame, dims):
+    # The Cuboid of a cuboid_query answer
+    codes, values = {}, {}
+    for dim in dims:
+        codes[dim], dim_values = pd.factorize(frame[dim], sort=True, use_na_sentinel=False)
+        values[dim] = pd.Index(np.asarray(dim_values))
+    measures = {"order_count": frame["order_count"].to_numpy(dtype=np.int64),
+                "cancelled_count": frame["cancelled_count"].astype("float64").fillna(0).to_numpy(dtype=np.int64)}
+    for measure, scale in Measures.items():
+        measures[f"cnt_{measure}"] = frame[f"cnt_{measure}"].to_numpy(dtype=np.int64)
+        measures[f"sum_{measure}"] = np.nan_to_num(scaled_integers(frame[f"sum_{measure}"], scale)).astype(np.int64)
+    return Cuboid(codes, values, measures)
+
+# --------------------------------------------------
+# CUBOIDS
+# --------------------------------------------------
+
+class Cuboid:
+    # Orders summed per distinct combination of some dimensions (a cell).
+    # Each dimension is an integer code array over the cells plus its sorted
+    # values; each measure is an int64 array over the cells. Queries mask and
+    # group those arrays with numpy.
+
+    def __init__(self, codes, values, measures):
+        self.codes = codes
+        self.values = values
+        self.measures = measures
+        self.cells = len(measures["order_count"])
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in [*self.codes.values(), *self.measures.values()])
+
+    def dimension(self, dim):
+        # (code per cell, values) of a stored or derived dimension
+        if dim in Derived_dimensions:
+            base, derive = Derived_dimensions[dim]
+            derived_codes, values = pd.factorize(derive(self.values[base].to_numpy()), sort=True)
+            return derived_codes[self.codes[base]], pd.Index(values)
+        return self.codes[dim], self.values[dim]
+
+    def mask(self, filters=None, exclude=None, ranges=None):
+        # Cells kept by filters {dim: values to keep}, exclude {dim: values to
+        # drop} and ranges {dim: (low, high)}, bounds included; None keeps all
+        keep = None
+        for dim, chosen in (filters or {}).items():
+            codes, values = self.dimension(dim)
+            keep = combined(keep, values.isin(chosen)[codes])
+        for dim, dropped in (exclude or {}).items():
+            codes, values = self.dimension(dim)
+            keep = combined(keep, ~values.isin(dropped)[codes])
+        for dim, (low, high) in (ranges or {}).items():
+            codes, values = self.dimension(dim)
+            keep = combined(keep, ((values >= low) & (values <= high))[codes])
+        return keep
+
+    def grouping(self, dims, keep=None):
+        # (codes of each dim per group, sums(cell values) -> per-group totals)
+        # over the kept cells; groups are in the order of the dims' values
+        columns, shape = [], []
+        for dim in dims:
+            codes, values = self.dimension(dim)
+            columns.append(codes if keep is None else codes[keep])
+            shape.append(len(values))
+        combinations = np.prod(shape, dtype=np.float64)
+
+        if combinations <= Dense_groups:
+            size = int(np.prod(shape, dtype=np.int64))
+            key = np.ravel_multi_index(columns, shape) if dims else \
+                np.zeros(self.cells if keep is None else int(keep.sum()), dtype=np.int64)
+            groups = np.flatnonzero(np.bincount(key, minlength=size))
+            codes = np.unravel_index(groups, shape) if dims else ()
+
+            def sums(cells):
+                return np.bincount(key, cells if keep is None else cells[keep], minlength=size)[groups]
+        else:
+            if combinations < 2**62:
+                groups, first, position = np.unique(np.ravel_multi_index(columns, shape),
+                                                    return_index=True, return_inverse=True)
+            else:
+                # Too many combinations for one integer key
+                position = pd.DataFrame(dict(enumerate(columns))).groupby(list(range(len(columns))),
+                                                                             sort=True).ngroup().to_numpy()
+                groups, first = np.unique(position, return_index=True)
+            codes = [column[first] for column in columns]
+
+            def sums(cells):
+                return np.bincount(position, cells if keep is None else cells[keep], minlength=len(groups))
+
+        return codes, lambda cells: np.rint(sums(cells)).astype(np.int64)
+
+    def aggregate(self, dims, filters=None, exclude=None, ranges=None):
+        # Dimension values and measures per combination of dims over the kept
+        # cells; a measure is only summed when it is first looked up
+        codes, sums = self.grouping(dims, self.mask(filters, exclude, ranges))
+        groups = Groups(sums, self.measures)
+        for dim, dim_codes in zip(dims, codes):
+            groups[dim] = self.dimension(dim)[1].take(dim_codes)
+        return groups
+
+class Groups(dict):
+
+    def __init__(self, sums, measures):
+        super().__init__()
+        self.sums = sums
+        self.measures = measures
+
+    def __missing__(self, name):
+        self[name] = self.sums(self.measures[name])
+        return self[name]
+
+def combined(keep, cells):
+    return cells if keep is None else keep & cells
+
+# --------------------------------------------------
+# CUBE
+# --------------------------------------------------
+
+class OrderCube:
+    # One cuboid per set of dimensions a topic groups by (with the filter
+    # dimensions), read from the database when first asked for and kept for
+    # the data version (Main.py caches the cube). Topics the cuboids cannot
+    # answer, which group by a near-unique column, go to the database:
+    # unfiltered through topic_query (the rollup or profile tables where the
+    # backend keeps them), filtered through Filtered_queries.
+
+    def __init__(self, read_sql, topic_query=None):
+        self.read_sql = read_sql
+        self.topic_query = topic_query or Topic_queries.get
+        self.cuboids = {}
+        self.lock = threading.Lock()
+        self.values = self.cuboid(Filter_dimensions).values
+
+    @property
+    def nbytes(self):
+        return sum(cuboid.nbytes for cuboid in self.cuboids.values())
+
+    @property
+    def cells(self):
+        return sum(cuboid.cells for cuboid in self.cuboids.values())
+
+    def cuboid(self, dims):
+        used = {Derived_dimensions[dim][0] if dim in Derived_dimensions else dim for dim in dims}
+        dims = tuple(sorted(used | set(Filter_dimensions)))
+        with self.lock:
+            cuboid = self.cuboids.get(dims)
+        if cuboid is None:
+            cuboid = cuboid_frame(self.read_sql(cuboid_query(list(dims)), None), dims)
+            with self.lock:
+                self.cuboids[dims] = cuboid
+        return cuboid
+
+    def aggregate(self, dims, filters=None, exclude=None, ranges=None):
+        used = [*dims, *(filters or {}), *(exclude or {}), *(ranges or {})]
+        return self.cuboid(used).aggregate(dims, filters, exclude, ranges)
+
+    def topic(self, topic, filters=None, ranges=None):
+        # A topic's answer, as its SQL would give it over the filtered orders
+        if topic not in Cube_topics:
+            if not filters and not ranges:
+                return self.read_sql(self.topic_query(topic), None)
+            conditions, params = filter_conditions(filters, ranges)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            return self.read_sql(Filtered_queries[topic].format(where=where), params)
+        dims, columns, order, limit, exclude = Cube_topics[topic]
+        groups = self.aggregate(dims, filters, exclude, ranges)
+        answer = pd.DataFrame({dim: groups[dim] for dim in dims})
+        for name, formula in columns.items():
+            answer[name] = formula(groups)
+        if order:
+            answer = answer.sort_values([column for column, _ in order],
+                                        ascending=[ascending for _, ascending in order],
+                                        kind="stable", ignore_index=True)
+        if limit:
+            answer = answer.head(limit)
+        return compact(answer)
+
+def build_cube(read_sql, topic_query=None):
+    # read_sql(query, params) and topic_query(topic) as a backend's; only the
+    # cuboid of the filter dimensions is read up front
+    return OrderCube(read_sql, topic_query)
+
+# --------------------------------------------------
+# TOPICS
+# --------------------------------------------------
+
+def total(groups, measure):
+    return groups[f"sum_{measure}"] / Measures[measure]
+
+def mean(groups, measure):
+    return total(groups, measure) / groups[f"cnt_{measure}"]
+
+def rounded(values):
+    # ROUND(x, 2) as MySQL rounds
+    return round_half_up(values, 2)
+
+# topic -> (group dims, {column: formula over the summed measures},
+# [(sort column, ascending)], row limit, excluded values). The answers equal
+# topics.Topic_queries over the same orders. Top spenders and the per-value
+# discount impact group by near-unique columns (a cuboid would hold about a
+# cell per order), so they are Filtered_queries instead; binning.py bins
+# the discounts.
+Cube_topics = {
+    "Age Group vs Order value": (
+        ["Customer_Age_group"],
+        {"Total_orders": lambda g: g["order_count"],
+         "Total_revenue": lambda g: total(g, "Order_Value"),
+         "Total_order_value": lambda g: total(g, "Final_Amount")},
+        [("Total_order_value", False)], None, None),
+    "Weekend vs Weekday Order patterns": (
+        ["Order_Day","Order_day_name"],
+        {"Total_orders": lambda g: g["order_count"],
+         "Total_Revenue": lambda g: total(g, "Order_Value"),
+         "avg_order_value": lambda g: mean(g, "Order_Value")},
+        None, None, None),
+    "Monthly revenue trends": (
+        ["Month"],
+        {"Total_orders": lambda g: g["order_count"],
+         "Total_revenue": lambda g: total(g, "Final_Amount"),
+         "Avg_Order_Value": lambda g: rounded(mean(g, "Final_Amount"))},
+        [("Month", True)], None, None),
+    "High-revenue cities and cuisines": (
+        ["City","Cuisine_Type"],
+        {"Total_Revenue": lambda g: total(g, "Final_Amount")},
+        [("Total_Revenue", False)], None, None),
+    "Average delivery time by city": (
+        ["City"],
+        {"Avg_delivery_time": lambda g: mean(g, "Delivery_Time_Min")},
+        [("Avg_delivery_time", False)], None, None),
+    "Distance vs delivery delay analysis": (
+        ["Distance_range"],
+        {"total_orders": lambda g: g["order_count"],
+         "Avg_delivery_time": lambda g: mean(g, "Delivery_Time_Min")},
+        [("Avg_delivery_time", True)], None, None),
+    "Delivery rating vs delivery time": (
+        ["Delivery_Rating"],
+        {"total_orders": lambda g: g["order_count"],
+         "Avg_delivery_time": lambda g: mean(g, "Delivery_Time_Min")},
+        [("Delivery_Rating", True)], None, None),
+    "Top-rated restaurants": (
+        ["Restaurant_Name"],
+        {"Total_orders": lambda g: g["order_count"],
+         "Avg_rating": lambda g: mean(g, "Restaurant_Rating")},
+        [("Avg_rating", False)], None, None),
+    "Cancellation rate by restaurant": (
+        ["Restaurant_Name"],
+        {"total_orders": lambda g: g["order_count"],
+         "cancelled_orders": lambda g: g["cancelled_count"],
+         "cancellation_percent": lambda g: rounded(g["cancelled_count"] * 100.0 / g["order_count"])},
+        [("cancellation_percent", False)], None, None),
+    "Cuisine-wise performance": (
+        ["Cuisine_Type"],
+        {"Total_orders": lambda g: g["order_count"],
+         "Total_revenue": lambda g: total(g, "Final_Amount"),
+         "Avg_order_value": lambda g: mean(g, "Final_Amount"),
+         "Avg_profit": lambda g: mean(g, "Profit_Margin"),
+         "Avg_profit_percent": lambda g: mean(g, "Profit_Margin_Percent")},
+        [("Avg_profit_percent", False)], None, None),
+    "Peak hour demand analysis": (
+        ["Peak_Hour"],
+        {"total_orders": lambda g: g["order_count"],
+         "total_revenue": lambda g: total(g, "Final_Amount"),
+         "avg_order_value": lambda g: mean(g, "Final_Amount")},
+        [("total_orders", False)], None, None),
+    "Payment mode preferences": (
+        ["Payment_Mode"],
+        {"total_orders": lambda g: g["order_count"],
+         "Revenue_amount": lambda g: rounded(total(g, "Final_Amount"))},
+        [("Revenue_amount", False)], None, None),
+    "Cancellation reason analysis": (
+        ["City","Cancellation_Reason"],
+        {"count": lambda g: g["order_count"]},
+        [("count", False)], None, {"Cancellation_Reason": ["No Cancellation"]}),
+}
+
+# Topics answered by the database under the cube's filters, as
+# topics.Topic_queries with a {where} clause
+Filtered_queries = {
+    "Top-spending customers": """
+        SELECT Customer_ID,
+        SUM(Order_Value) AS Total_spent
+        FROM Food_Order_Details
+        {where}
+        GROUP BY Customer_ID
+        ORDER BY Total_spent DESC
+        LIMIT 10;
+        """,
+    "Impact of discounts on profit": """
+        SELECT Discount_Applied,
+        COUNT(*) AS Total_orders,
+        SUM(Final_Amount) AS Total_Revenue,
+        AVG(Order_Value) AS Avg_order_value,
+        AVG(Profit_Margin) AS Avg_profit_margin,
+        AVG(Profit_Margin_Percent) AS Avg_profit_margin_percent
+        FROM Food_Order_Details
+        {where}
+        GROUP BY Discount_Applied
+        ORDER BY Discount_Applied ASC;
+        """,
+}
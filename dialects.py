@@ -0,0 +1,79 @@
+import re
+
+# --------------------------------------------------
+# MYSQL TO OTHER DIALECTS
+# --------------------------------------------------
+
+# The app's SQL is written for MySQL. translate() rewrites the parts other
+# engines read differently; string literals are never touched.
+
+Quoted = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")""")
+
+Enum_type = re.compile(r"\bENUM\s*\(\s*'(?:[^'\\]|\\.|'')*'(?:\s*,\s*'(?:[^'\\]|\\.|'')*')*\s*\)", re.IGNORECASE)
+Token = re.compile(f"(?P<enum>{Enum_type.pattern})|{Quoted.pattern}", re.IGNORECASE)
+
+Date_part_call = re.compile(r"\b(?P<part>MONTH|YEAR)\s*\(", re.IGNORECASE)
+Date_parts = {"month": "%m", "year": "%Y"}
+Signed_cast = re.compile(r"\bAS\s+SIGNED\b", re.IGNORECASE)
+Named_parameter = re.compile(r"(?<![:\w]):(\w+)")
+
+def single_quoted(literal):
+    # MySQL reads "text" as a string literal; standard SQL as an identifier
+    body = literal[1:-1].replace('""', '"').replace("'", "''")
+    return f"'{body}'"
+
+def date_part_calls(query):
+    # MONTH(expr) -> CAST(strftime('%m', expr) AS INTEGER) (YEAR(expr) with
+    # '%Y'), matching the closing parenthesis of each call and skipping
+    # string literals
+    literals = {match.start(): match.end() for match in Quoted.finditer(query)}
+    inside = [range(start, end) for start, end in literals.items()]
+    parts = []
+    position = 0
+    for match in Date_part_call.finditer(query):
+        if match.start() < position or any(match.start() in span for span in inside):
+            continue
+        depth = 1
+        end = match.end()
+        while depth and end < len(query):
+            if end in literals:
+                end = literals[end]
+                continue
+            depth += {"(": 1, ")": -1}.get(query[end], 0)
+            end += 1
+        argument = query[match.end():end - 1]
+        part = Date_parts[match.group("part").lower()]
+        parts += [query[position:match.start()], f"CAST(strftime('{part}', {date_part_calls(argument)}) AS INTEGER)"]
+        position = end
+    return "".join(parts) + query[position:]
+
+def translate_code(code, dialect):
+    if dialect == "sqlite":
+        code = Signed_cast.sub("AS INTEGER", code)
+    elif dialect == "duckdb":
+        code = Named_parameter.sub(r"$\1", code)
+    return code
+
+def translate(query, dialect):
+    if dialect == "mysql":
+        return query
+    # Scanned left to right: ENUM('a','b') column types become VARCHAR,
+    # literals are kept (double-quoted ones re-quoted) and only the SQL code
+    # between them is rewritten. A MONTH() or YEAR() call may contain
+    # literals (e.g. MONTH('2020-01-01')), so it is rewritten on the whole
+    # query afterwards.
+    parts = []
+    position = 0
+    for match in Token.finditer(query):
+        parts.append(translate_code(query[position:match.start()], dialect))
+        token = match.group()
+        if match.group("enum"):
+            parts.append("VARCHAR(20)")
+        else:
+            parts.append(single_quoted(token) if token.startswith('"') else token)
+        position = match.end()
+    parts.append(translate_code(query[position:], dialect))
+    translated = "".join(parts)
+    if dialect == "sqlite":
+        translated = date_part_calls(translated)
+    return translated
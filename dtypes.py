@@ -0,0 +1,140 @@
+import decimal
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import Decimal_places, round_half_up
+
+# --------------------------------------------------
+# DECLARED SCHEMA
+# --------------------------------------------------
+
+# In-memory types of the Food_Order_Details columns (database.Migrations,
+# version 1). Frames come out of cleaning, the snapshot and pd.read_sql with
+# text as Python strings and, on MySQL, DECIMAL as decimal.Decimal; compact()
+# turns whichever of these columns a frame has into the types below.
+
+# ENUM columns, with the DDL's values as their categories
+Enum_categories = {"Customer_Gender": ["Male","Female","Other"],
+                   "Order_Status": ["Delivered","Cancelled"],
+                   "Order_Day": ["Weekday","Weekend"],
+                   "Customer_Age_group": ["Youth","Adults"],
+                   "Delivery_Performance": ["Good","Moderate","Worst"],
+                   "Peak_Hour_Indicator": ["High","Low"]}
+
+# Low-cardinality VARCHAR columns; their categories are the values present
+Category_columns = ["City","Area","Restaurant_Name","Cuisine_Type","Payment_Mode",
+                    "Cancellation_Reason","Order_day_name"]
+
+# INT columns and the narrowest type their range needs (ages, minutes, 1-5)
+Integer_dtypes = {"Customer_Age": "int8",
+                  "Delivery_Time_Min": "int16",
+                  "Delivery_Rating": "int8"}
+
+# DECIMAL columns are rounded to the DDL's places as the database stores them
+# (bulk_load.round_half_up) and held as float32 while every value stays below
+# this bound, where float32 still resolves cents
+Float32_limit = 2**23 / 100
+
+Boolean_columns = ["Peak_Hour"]
+Date_columns = ["Order_Date"]
+
+# --------------------------------------------------
+# CONVERSIONS
+# --------------------------------------------------
+
+def first_value(values):
+    present = values.dropna()
+    return present.iloc[0] if len(present) else None
+
+def as_numbers(values):
+    # decimal.Decimal and other object numbers as float64
+    if values.dtype == object:
+        return pd.to_numeric(values, errors="coerce").astype("float64")
+    return values
+
+def compact_category(values, categories=()):
+    if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype != object:
+        return values
+    # Values outside the declared ones are kept as extra categories
+    extra = sorted(set(values.dropna().unique()) - set(categories))
+    return values.astype(pd.CategoricalDtype([*categories, *extra]))
+
+def compact_integer(values, dtype):
+    values = as_numbers(values)
+    if values.dtype.kind not in "iuf":
+        return values
+    present = values.dropna().to_numpy()
+    if values.dtype.kind == "f" and not np.array_equal(present, np.round(present)):
+        # An average or other fractional result under an INT column's name
+        return values
+    # A value outside the declared range widens the type instead of wrapping
+    widths = ["int8", "int16", "int32", "int64"]
+    for candidate in widths[widths.index(dtype):]:
+        limits = np.iinfo(candidate)
+        if not len(present) or (limits.min <= present.min() and present.max() <= limits.max):
+            break
+    # Missing values need the nullable counterpart (Int8, Int16, ...)
+    return values.astype(candidate.capitalize() if values.isna().any() else candidate)
+
+def compact_decimal(values, places):
+    values = as_numbers(values)
+    if values.dtype.kind != "f" or values.dtype == "float32":
+        return values
+    if np.nanmax(np.abs(values.to_numpy()), initial=0) >= Float32_limit:
+        return values
+    return pd.Series(round_half_up(values, places), index=values.index, name=values.name).astype("float32")
+
+def compact_boolean(values):
+    if values.dtype == bool or isinstance(values.dtype, pd.BooleanDtype):
+        return values.astype("boolean")
+    values = as_numbers(values)
+    # 0/1 from the TINYINT(1) column; anything else is not a flag
+    if values.dtype.kind not in "iuf" or not values.dropna().isin([0, 1]).all():
+        return values
+    return values.astype("boolean")
+
+def compact_date(values):
+    if values.dtype.kind == "M":
+        return values
+    return pd.to_datetime(values)
+
+def compact(food_df):
+    # food_df with its Food_Order_Details columns in the declared types;
+    # other columns are left alone except Decimal results (SUM, AVG on
+    # MySQL), which become float64
+    food_df = food_df.copy(deep=False)
+    for column in food_df.columns:
+        values = food_df[column]
+        if column in Enum_categories:
+            values = compact_category(values, Enum_categories[column])
+        elif column in Category_columns:
+            values = compact_category(values)
+        elif column in Integer_dtypes:
+            values = compact_integer(values, Integer_dtypes[column])
+        elif column in Decimal_places:
+            values = compact_decimal(values, Decimal_places[column])
+        elif column in Boolean_columns:
+            values = compact_boolean(values)
+        elif column in Date_columns:
+            values = compact_date(values)
+        elif values.dtype == object and isinstance(first_value(values), decimal.Decimal):
+            values = as_numbers(values)
+        food_df[column] = values
+    return food_df
+
+# --------------------------------------------------
+# MEMORY REPORT
+# --------------------------------------------------
+
+def memory_report(food_df):
+    # Bytes per column as loaded (object strings, Decimals) and compacted,
+    # with a Total row
+    compacted = compact(food_df)
+    report = pd.DataFrame({"loaded_dtype": food_df.dtypes.astype(str),
+                           "loaded_bytes": food_df.memory_usage(deep=True, index=False),
+                           "compact_dtype": compacted.dtypes.astype(str),
+                           "compact_bytes": compacted.memory_usage(deep=True, index=False)})
+    report.loc["Total"] = ["", report["loaded_bytes"].sum(), "", report["compact_bytes"].sum()]
+    report["ratio"] = report["loaded_bytes"] / report["compact_bytes"]
+    return report
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from lazy import lazy_module
+from profiler import profiler
+
+# Imported with the first figure built
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+go = lazy_module("plotly.graph_objects")
+pio = lazy_module("plotly.io")
+
+# Points kept per line or scatter trace of a figure without a layout width;
+# with one, a trace keeps one point per pixel of it
+Pixel_budget = int(os.environ.get("OFD_FIGURE_POINTS", 1200))
+
+# --------------------------------------------------
+# DOWNSAMPLING (LARGEST TRIANGLE THREE BUCKETS)
+# --------------------------------------------------
+
+def lttb(x, y, points):
+    # Indices of at most points of the series (x ascending) that keep its
+    # visual shape: the first and last point, then from each of points - 2
+    # equal buckets the point making the largest triangle with the point kept
+    # before it and the mean of the next bucket
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = np.nanmean(x[end:edges[bucket + 2]])
+            next_y = np.nanmean(y[end:edges[bucket + 2]])
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs((x[kept] - next_x) * (y[start:end] - y[kept]) - (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        keep[bucket + 1] = kept
+    return keep
+
+def numeric_positions(values, n):
+    # The x of a trace as numbers: dates as nanoseconds, categories by position
+    if values is None:
+        return np.arange(n, dtype=np.float64)
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.float64)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return np.arange(n, dtype=np.float64)
+
+# Per-point properties of a trace that are cut with x and y
+Point_properties = ["x", "y", "text", "hovertext", "customdata"]
+
+def downsample(figure, points=None):
+    # Cuts every line or scatter trace longer than the budget to its LTTB
+    # points, in place. Bars, pies and sunbursts are left alone: each of
+    # their points is a category the chart has to show.
+    points = points or int(figure.layout.width or Pixel_budget)
+    for trace in figure.data:
+        if trace.type not in ("scatter", "scattergl") or trace.y is None or len(trace.y) <= points:
+            continue
+        y = np.asarray(trace.y)
+        if y.dtype.kind not in "iuf":
+            continue
+        keep = lttb(numeric_positions(trace.x, len(y)), y, points)
+        for name in Point_properties:
+            values = trace[name]
+            if values is not None and not isinstance(values, str) and len(values) == len(y):
+                trace[name] = np.asarray(values)[keep]
+    return figure
+
+# --------------------------------------------------
+# CACHE KEYS
+# --------------------------------------------------
+
+def frame_key(frame):
+    # Digest of a frame's columns, types and values: figures of the same data
+    # share an entry whichever filters or source produced it
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(name), str(dtype)) for name, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def style_key(build):
+    # The builder's code and constants (titles, colors, sizes): editing a
+    # chart's styling makes new entries instead of serving the old figure
+    code = build.__code__
+    return build.__qualname__, hash((code.co_code, code.co_consts, code.co_names))
+
+# --------------------------------------------------
+# FIGURE CACHE
+# --------------------------------------------------
+
+class FigureCache:
+    # Figures serialized to Plotly JSON once, keyed on the topic, the builder
+    # and the frame it plots, in a memory-bounded LRU shared by every session.
+    # A hit is rebuilt from the JSON without Plotly's validation, which
+    # st.plotly_chart also skips for a Figure, so a topic viewed before is
+    # drawn without running its builder again.
+
+    def __init__(self, max_bytes=64 * 2**20, version_source=None, version_poll=30, points=None):
+        self.max_bytes = max_bytes
+        # Callable returning the current data version (Backend.data_version),
+        # polled at most every version_poll seconds; a new version drops
+        # every entry
+        self.version_source = version_source
+        self.version_poll = version_poll
+        self.points = points
+        self.entries = OrderedDict()
+        # Bytes of every entry, kept as entries come and go
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def size_bytes(self):
+        return self.bytes
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def check_version(self):
+        if self.version_source is None:
+            return
+        now = time.monotonic()
+        if now - self.version_checked < self.version_poll:
+            return
+        self.version_checked = now
+        version = self.version_source()
+        if version != self.version:
+            self.version = version
+            self.invalidate()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+            return entry["spec"]
+
+    def put(self, key, spec, seconds):
+        nbytes = len(spec)
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries[key]["bytes"]
+            self.bytes += nbytes
+            self.entries[key] = {"spec": spec, "bytes": nbytes, "seconds": seconds}
+            self.entries.move_to_end(key)
+            while self.bytes > self.max_bytes:
+                self.bytes -= self.entries.popitem(last=False)[1]["bytes"]
+                self.evictions += 1
+
+    def figure(self, topic, build, frame):
+        # build(frame)'s figure, downsampled, from the cache when it has been
+        # built before
+        self.check_version()
+        with profiler.phase("figure") as span:
+            key = (topic, style_key(build), frame_key(frame))
+            spec = self.get(key)
+            if spec is None:
+                start = time.perf_counter()
+                spec = pio.to_json(downsample(build(frame), self.points), validate=False)
+                seconds = time.perf_counter() - start
+                with self.lock:
+                    self.misses += 1
+                self.put(key, spec, seconds)
+            span.count(rows=len(frame), nbytes=len(spec))
+            return go.Figure(json.loads(spec), _validate=False)
+
+    def builder(self, topic, build):
+        # build, answered from the cache; for PageRunner.build
+        return lambda frame: self.figure(topic, build, frame)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "evictions": self.evictions,
+                "data_version": self.version}
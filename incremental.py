@@ -0,0 +1,366 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from bulk_load import Batch_size, batches, bulk_load, load_multirow
+from cleaning import Food_Delivery_Cleaning, Default_values, Raw_dtypes
+from database import bump_data_version
+from ingest import (Chunk_size, Count_tables, Source_columns, chunk_counts, delivery_medians, discount_statistics,
+                    distance_medians, group_medians_from_counts, median_from_counts, merge_count_tables,
+                    merge_counts, positive, source_values, statistics_from_counts)
+from profiles import Profile_columns, profile_deltas, upsert_profiles
+from rollups import Fact_columns, Rollups, compact_rollups, rollup_deltas
+from sketches import Sketch_columns, read_sketches, write_sketches
+from snapshot import file_digest
+
+# Keys per lookup or delete statement, well under every driver's parameter
+# limit
+Lookup_batch = 1_000
+
+# An order is new when its Order_Id was never ingested and changed when the
+# hash of its raw CSV row differs from the stored one. Only those rows are
+# cleaned. The statistics they are cleaned with come from the value counts
+# kept in the database (ingest.Count_tables), read only for the groups the
+# new rows have gaps in, and the counts are updated key by key, so a file
+# costs time in proportion to its own rows. Orders already stored keep the
+# values they were cleaned with.
+
+# (filled column, group keys, counts table) of the group-median fills
+Group_counts = [("Customer_Age", ["Customer_Gender","Area"], "counts_customer_age"),
+                ("Order_Value", ["City","Area","Cuisine_Type"], "counts_order_value")]
+
+# The discount median and IQR bounds are ranks in the whole discount
+# distribution. The discounts are also counted per whole unit (migration 9),
+# a table bounded by the discounts' range rather than by their distinct
+# values, so the ranks are located on those blocks and only the blocks
+# holding them are read value by value.
+Discount_blocks = "counts_discount_block"
+
+# Counted columns of every counts table incremental ingest keeps
+Counted_columns = {**Count_tables, Discount_blocks: ["Discount_block"]}
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+
+def row_hashes(chunk):
+    # 64-bit content hash of each row, stable across processes
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy().view("int64")
+
+def source_rows(chunk):
+    rows = source_values(chunk)
+    rows.insert(0, "row_hash", row_hashes(chunk))
+    rows.insert(0, "Order_Id", chunk["Order_Id"].to_numpy())
+    return rows
+
+def typed(rows):
+    # Counted numbers come back from the database as objects when a column
+    # is all NULL; they must be floats to hash and group like the CSV's
+    numeric = [column for column in rows.columns if Raw_dtypes.get(column) == "float64"]
+    return rows.astype({column: "float64" for column in numeric})
+
+def rows_for(conn, table, columns, keys, key="Order_Id"):
+    # Rows of table whose key column is one of keys
+    query = text(f"SELECT {', '.join(columns)} FROM {table} WHERE {key} IN :keys")
+    query = query.bindparams(bindparam("keys", expanding=True))
+    frames = [pd.read_sql(query, conn, params={"keys": batch}) for batch in batches(keys, Lookup_batch)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return typed(pd.concat(frames, ignore_index=True))
+
+def delete_rows(conn, table, keys, key="Order_Id"):
+    statement = text(f"DELETE FROM {table} WHERE {key} IN :keys").bindparams(bindparam("keys", expanding=True))
+    for batch in batches(keys, Lookup_batch):
+        conn.execute(statement, {"keys": batch})
+
+def negated(counts):
+    return {table: -total for table, total in counts.items()}
+
+# --------------------------------------------------
+# RUNNING STATISTICS
+# --------------------------------------------------
+
+def count_rows(counts, table):
+    rows = counts.rename("occurrences").reset_index()[Counted_columns[table] + ["occurrences"]]
+    rows.insert(0, "count_key", row_hashes(rows[Counted_columns[table]]))
+    return rows
+
+def as_counts(rows, table):
+    return typed(rows).set_index(Counted_columns[table])["occurrences"]
+
+def discount_blocks(discount_counts):
+    # Discount counts summed per whole unit; missing discounts stay NaN
+    blocks = np.floor(discount_counts.index.to_numpy(dtype="float64"))
+    return discount_counts.groupby(pd.Index(blocks, name="Discount_block"), dropna=False).sum()
+
+def with_blocks(counts):
+    # The counts tables with the discount blocks derived from them
+    return {**counts, Discount_blocks: discount_blocks(counts["counts_discount"])}
+
+def upsert_counts(conn, count_deltas):
+    # Adds the deltas to the stored counts, reading and rewriting only the
+    # rows of the counted values they touch
+    for table, delta in count_deltas.items():
+        rows = count_rows(delta[delta != 0], table)
+        keys = rows["count_key"].tolist()
+        stored = rows_for(conn, table, ["count_key", "occurrences"], keys, key="count_key")
+        stored = rows["count_key"].map(stored.set_index("count_key")["occurrences"])
+        rows["occurrences"] += stored.fillna(0).astype("int64")
+        delete_rows(conn, table, keys, key="count_key")
+        load_multirow(rows[rows["occurrences"] > 0], conn, table, Batch_size)
+
+def stored_counts(conn):
+    counts = {}
+    for table, columns in Count_tables.items():
+        rows = pd.read_sql(text(f"SELECT {', '.join(columns)}, occurrences FROM {table}"), conn)
+        counts[table] = as_counts(rows, table)
+    return counts
+
+def block_values(conn, blocks, delta):
+    # Stored discount counts plus delta for the values in the given blocks,
+    # one index range per block
+    ranges = " OR ".join(f"(Discount_Applied >= :low_{i} AND Discount_Applied < :high_{i})"
+                         for i in range(len(blocks)))
+    params = {name: float(block + offset) for i, block in enumerate(blocks)
+              for name, offset in [(f"low_{i}", 0), (f"high_{i}", 1)]}
+    stored = pd.read_sql(text(f"SELECT Discount_Applied, occurrences FROM counts_discount WHERE {ranges}"),
+                         conn, params=params)
+    values = delta.index.to_numpy(dtype="float64")
+    return merge_counts(as_counts(stored, "counts_discount"), delta[np.isin(np.floor(values), blocks)])
+
+def rank_blocks(totals, ranks):
+    # The blocks holding the given 0-based ranks of counts sorted by value
+    cumulative = np.cumsum(totals.to_numpy())
+    return set(totals.index[np.searchsorted(cumulative, [rank for rank in ranks if rank >= 0], side="right")])
+
+def discount_counts(conn, delta):
+    # Discount counts that give discount_statistics the same answer as all of
+    # them: value by value in the blocks holding the median's and the
+    # quartiles' ranks, and one count at its lower bound for every other
+    # block, which sorts the same. Reads the block table and a few blocks.
+    blocks = pd.read_sql(text(f"SELECT Discount_block, occurrences FROM {Discount_blocks}"), conn)
+    blocks = positive(merge_counts(as_counts(blocks, Discount_blocks), discount_blocks(delta)))
+    missing = blocks[blocks.index.isna()]
+    known = blocks[blocks.index.notna()].sort_index()
+    read, values = set(), None
+
+    def counts_for(ranks, totals):
+        nonlocal values
+        wanted = sorted(rank_blocks(totals, ranks) - read)
+        if wanted:
+            read.update(wanted)
+            values = merge_counts(values, block_values(conn, wanted, delta))
+        proxies = known[~known.index.isin(list(read))]
+        return positive(merge_counts(proxies.rename_axis("Discount_Applied"), values))
+
+    n, filled_in = int(known.sum()), int(missing.sum())
+    if not n:
+        return missing.rename_axis("Discount_Applied")
+    counts = counts_for([n // 2 - 1, n // 2], known)
+    totals = known
+    if filled_in:
+        # The quartiles are taken after the missing discounts are filled with
+        # the median, which adds to its block
+        median = median_from_counts(counts)
+        totals = merge_counts(known, pd.Series({np.floor(median): filled_in})).sort_index()
+    size = n + filled_in
+    positions = [int(np.floor((size - 1) * (q / 100))) for q in (25, 75)]
+    counts = counts_for([rank for position in positions for rank in (position, min(position + 1, size - 1))], totals)
+    return merge_counts(counts, missing.rename_axis("Discount_Applied"))
+
+def ensure_discount_blocks(db_engine):
+    # Counts recorded before migration 9 get their blocks once
+    with db_engine.connect() as conn:
+        counted = conn.execute(text("SELECT COUNT(*) FROM (SELECT 1 FROM counts_discount LIMIT 1) c")).scalar()
+        blocked = conn.execute(text(f"SELECT COUNT(*) FROM (SELECT 1 FROM {Discount_blocks} LIMIT 1) b")).scalar()
+        if not counted or blocked:
+            return
+        counts = pd.read_sql(text("SELECT Discount_Applied, occurrences FROM counts_discount"), conn)
+    bulk_load(count_rows(discount_blocks(as_counts(counts, "counts_discount")), Discount_blocks), db_engine,
+              Discount_blocks)
+
+def running_statistics(db_engine):
+    # The cleaning statistics of every order ingested so far
+    with db_engine.connect() as conn:
+        return statistics_from_counts(stored_counts(conn))
+
+def group_counts(conn, table, groups, delta):
+    # Stored counts plus delta for the given groups (a frame of group keys),
+    # read with one IN list per key column and narrowed to the exact groups
+    keys = list(groups.columns)
+    conditions = " AND ".join(f"{key} IN :{key}" for key in keys)
+    query = text(f"SELECT {', '.join(Count_tables[table])}, occurrences FROM {table} WHERE {conditions}")
+    query = query.bindparams(*[bindparam(key, expanding=True) for key in keys])
+    stored = pd.read_sql(query, conn, params={key: groups[key].unique().tolist() for key in keys})
+    counts = merge_counts(as_counts(stored, table), delta)
+    wanted = pd.MultiIndex.from_frame(groups.drop_duplicates())
+    return counts[counts.index.droplevel(-1).isin(wanted)]
+
+def delta_statistics(conn, raw, count_deltas):
+    # The statistics a full reload would clean raw with, computed from the
+    # stored counts plus count_deltas
+    sources = source_values(raw)
+    stats = {"Order_Date_first": raw["Order_Date"].iloc[0],
+             "Order_Time_first": raw["Order_Time"].fillna(Default_values["Order_Time"]).iloc[0]}
+
+    # The discounts around the median's and the quartiles' ranks
+    discounts = discount_counts(conn, count_deltas["counts_discount"])
+    stats["Discount_Applied"], stats["Discount_bounds"] = discount_statistics(positive(discounts))
+
+    # Ratings and times are summed over distances by the database
+    rating_times = typed(pd.read_sql(text(
+        "SELECT Delivery_Rating, Delivery_Time_Min, SUM(occurrences) AS occurrences "
+        "FROM counts_delivery GROUP BY Delivery_Rating, Delivery_Time_Min"), conn))
+    rating_times = merge_counts(rating_times.set_index(["Delivery_Rating","Delivery_Time_Min"])["occurrences"],
+                                count_deltas["counts_delivery"].groupby(level=[0, 1], dropna=False).sum())
+    stats["Delivery_Rating"], stats["Delivery_Time_Min"] = delivery_medians(positive(rating_times))
+
+    # Group medians only for the groups raw has missing values in; the other
+    # groups are never looked up
+    for column, keys, table in Group_counts:
+        groups = sources.loc[sources[column].isna(), keys]
+        stats[column] = pd.Series(dtype="float64")
+        if not groups.empty:
+            counts = group_counts(conn, table, groups, count_deltas[table])
+            stats[column] = group_medians_from_counts(positive(counts), keys)
+
+    # Distances are grouped on the filled time and rating. Every order that
+    # can fill into one of the needed times has that time or none.
+    rating = sources["Delivery_Rating"].fillna(stats["Delivery_Rating"])
+    time = sources["Delivery_Time_Min"].fillna(rating.map(stats["Delivery_Time_Min"]))
+    times = time[sources["Distance_km"].isna()].unique().tolist()
+    stats["Distance_km"] = pd.Series(dtype="float64")
+    if times:
+        query = text("SELECT Delivery_Rating, Delivery_Time_Min, Distance_km, occurrences FROM counts_delivery "
+                     "WHERE Delivery_Time_Min IN :times OR Delivery_Time_Min IS NULL")
+        stored = pd.read_sql(query.bindparams(bindparam("times", expanding=True)), conn, params={"times": times})
+        counts = merge_counts(as_counts(stored, "counts_delivery"), count_deltas["counts_delivery"])
+        medians = distance_medians(positive(counts), stats["Delivery_Rating"], stats["Delivery_Time_Min"])
+        stats["Distance_km"] = medians[medians.index.get_level_values("Delivery_Time_Min").isin(times)]
+
+    return stats
+
+# --------------------------------------------------
+# FILE BOOKKEEPING
+# --------------------------------------------------
+
+def ingested(conn, digest):
+    query = text("SELECT COUNT(*) FROM ingested_files WHERE digest = :digest")
+    return conn.execute(query, {"digest": digest}).scalar() > 0
+
+def record_file(conn, digest, rows):
+    conn.execute(text("INSERT INTO ingested_files (digest, rows_read) VALUES (:digest, :rows)"),
+                 {"digest": digest, "rows": rows})
+
+# --------------------------------------------------
+# BASELINE
+# --------------------------------------------------
+
+def record_sources(csv_path, db_engine, chunksize=Chunk_size):
+    # Hashes, source values and value counts of a file loaded in full (e.g.
+    # by ingest_snapshot), streamed so later files can be ingested
+    # incrementally against it
+    counts = None
+    rows = 0
+    for chunk in pd.read_csv(csv_path, dtype=Raw_dtypes, chunksize=chunksize):
+        chunk = chunk.dropna(subset=["Order_Date"])
+        if chunk.empty:
+            continue
+        sources = source_rows(chunk)
+        rows += bulk_load(sources, db_engine, "ingested_orders")
+        counts = merge_count_tables(counts, chunk_counts(sources[Source_columns]))
+    for table, total in (with_blocks(counts) if counts else {}).items():
+        bulk_load(count_rows(total, table), db_engine, table)
+    with db_engine.begin() as conn:
+        record_file(conn, file_digest(csv_path), rows)
+    return rows
+
+def ensure_sources(csv_path, db_engine):
+    # Orders loaded before incremental ingest existed have no stored hashes;
+    # they are taken to come from csv_path (the app's single source file)
+    with db_engine.connect() as conn:
+        orders = conn.execute(text("SELECT COUNT(*) FROM Food_Order_Details")).scalar()
+        recorded = conn.execute(text("SELECT COUNT(*) FROM ingested_orders")).scalar()
+    if orders and not recorded:
+        record_sources(csv_path, db_engine)
+    ensure_discount_blocks(db_engine)
+
+# --------------------------------------------------
+# INCREMENTAL INGEST
+# --------------------------------------------------
+
+def changed_rows(csv_path, conn, chunksize):
+    # Raw rows of csv_path whose order is new or whose content changed, the
+    # last one winning when a file repeats an Order_Id
+    parts = []
+    read = 0
+    for chunk in pd.read_csv(csv_path, dtype=Raw_dtypes, chunksize=chunksize):
+        chunk = chunk.dropna(subset=["Order_Date"])
+        if chunk.empty:
+            continue
+        read += len(chunk)
+        stored = rows_for(conn, "ingested_orders", ["Order_Id", "row_hash"], chunk["Order_Id"].unique().tolist())
+        # Nullable integers, so new orders are <NA> and hashes stay exact
+        stored = chunk["Order_Id"].map(stored.set_index("Order_Id")["row_hash"].astype("Int64"))
+        hashes = pd.Series(row_hashes(chunk), index=chunk.index)
+        parts.append(chunk[(stored != hashes).fillna(True).to_numpy(dtype=bool)])
+    if not parts:
+        return pd.DataFrame(columns=list(Raw_dtypes)), read
+    delta = pd.concat(parts, ignore_index=True).drop_duplicates("Order_Id", keep="last", ignore_index=True)
+    return delta, read
+
+def incremental_ingest(csv_path, db_engine, table="Food_Order_Details", rollups=True, chunksize=Chunk_size):
+    # Upserts the new and changed orders of csv_path and returns how many; a
+    # file whose exact content was ingested before is skipped outright
+    digest = file_digest(csv_path)
+    with db_engine.connect() as conn:
+        if ingested(conn, digest):
+            return 0
+        raw, read = changed_rows(csv_path, conn, chunksize)
+        if not raw.empty:
+            order_ids = raw["Order_Id"].tolist()
+            old_sources = rows_for(conn, "ingested_orders", Source_columns, order_ids)
+            old_facts = rows_for(conn, table, list(dict.fromkeys(Fact_columns + Sketch_columns + Profile_columns)),
+                                 order_ids)
+            # The running statistics with the replaced rows taken out and the
+            # new ones in
+            sources = source_rows(raw)
+            count_deltas = merge_count_tables(chunk_counts(sources[Source_columns]),
+                                              negated(chunk_counts(old_sources)))
+            stats = delta_statistics(conn, raw, count_deltas)
+
+    if raw.empty:
+        with db_engine.begin() as conn:
+            record_file(conn, digest, read)
+        return 0
+
+    food_df = Food_Delivery_Cleaning(raw, stats)
+
+    with db_engine.begin() as conn:
+        delete_rows(conn, table, order_ids)
+        delete_rows(conn, "ingested_orders", order_ids)
+        load_multirow(food_df, conn, table, Batch_size)
+        load_multirow(sources, conn, "ingested_orders", Batch_size)
+        upsert_counts(conn, with_blocks(count_deltas))
+        if rollups:
+            # The replaced orders leave the rollups as negative deltas
+            deltas = [rollup_deltas(food_df)]
+            if not old_facts.empty:
+                deltas.append({name: delta.assign(**{column: -delta[column] for column in delta.columns
+                                                      if column not in Rollups[name]})
+                               for name, delta in rollup_deltas(old_facts).items()})
+            for table_deltas in deltas:
+                for name, delta in table_deltas.items():
+                    load_multirow(delta, conn, name, Batch_size)
+            sketches = read_sketches(conn)
+            sketches.remove(old_facts)
+            sketches.add(food_df)
+            write_sketches(conn, sketches)
+            # Replaced orders are taken out of their entities' profiles
+            upsert_profiles(conn, profile_deltas(food_df, old_facts), old_facts["Customer_ID"].dropna().unique())
+        record_file(conn, digest, read)
+
+    if rollups:
+        compact_rollups(db_engine)
+    bump_data_version(db_engine)
+    return len(food_df)
@@ -0,0 +1,167 @@
+import re
+import time
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from database import Migrations
+from dialects import translate
+from pagination import count_query
+from rollups import topic_query
+from topics import Topic_queries
+
+# Widest index proposed; beyond it covering columns are left out
+Max_index_columns = 6
+
+# Columns of Food_Order_Details, from its CREATE TABLE migration
+Order_columns = re.findall(r"^\s*(\w+)\s+(?:VARCHAR|INT|ENUM|DATE|TIME|DECIMAL|TINYINT)",
+                           Migrations[0][2][0], re.MULTILINE)
+
+# --------------------------------------------------
+# QUERY ANALYSIS
+# --------------------------------------------------
+
+Clause = re.compile(r"\b(select|from|where|group\s+by|order\s+by|limit)\b", re.IGNORECASE)
+
+def app_queries(rollups=True):
+    # Every query the app sends to Food_Order_Details. With rollups (as the
+    # SQL backends run) most topics read the small rollup tables instead and
+    # are left out; the paged table views seek on the primary key.
+    queries = {topic: topic_query(topic, rollups) for topic in Topic_queries}
+    queries = {name: query for name, query in queries.items()
+               if re.search(r"\bfood_order_details\b", query, re.IGNORECASE)}
+    queries["Total row count"] = count_query("Food_Order_Details")
+    return queries
+
+def clauses(query):
+    # {"select": ..., "where": ..., "group by": ...} of a single-table query
+    parts = Clause.split(query.strip().rstrip(";"))
+    return {re.sub(r"\s+", " ", parts[index].lower()): parts[index + 1]
+            for index in range(1, len(parts) - 1, 2)}
+
+def split_list(expressions):
+    # Comma-separated list, ignoring commas inside parentheses
+    items, depth, current = [], 0, ""
+    for char in expressions:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            items.append(current.strip())
+            current = ""
+        else:
+            current += char
+    return items + [current.strip()] if current.strip() else items
+
+def referenced(expression):
+    # Table columns used by an expression, in order of appearance
+    positions = {column: match.start() for column in Order_columns
+                 if (match := re.search(rf"\b{column}\b", expression, re.IGNORECASE))}
+    return sorted(positions, key=positions.get)
+
+def select_aliases(select):
+    aliases = {}
+    for item in split_list(select):
+        match = re.match(r"(.*?)\s+(?:as\s+)?(\w+)$", item, re.IGNORECASE | re.DOTALL)
+        if match and match.group(2).lower() not in {column.lower() for column in Order_columns}:
+            aliases[match.group(2).lower()] = match.group(1)
+    return aliases
+
+def unique(columns):
+    return list(dict.fromkeys(columns))
+
+def index_for(query):
+    # (key columns, covering columns) of the index that serves a query:
+    # filtered and grouped columns lead, the other columns it reads follow so
+    # the index alone answers it. None when the query needs no index.
+    parts = clauses(query)
+    aliases = select_aliases(parts.get("select", ""))
+    key = referenced(parts.get("where", ""))
+    for item in split_list(parts.get("group by", "")):
+        key += referenced(aliases.get(item.lower(), item))
+    key = unique(key)
+    if not key:
+        return None
+    used = referenced(parts.get("select", "")) + referenced(parts.get("order by", ""))
+    return tuple(key), [column for column in unique(used) if column not in key]
+
+# --------------------------------------------------
+# PROPOSAL
+# --------------------------------------------------
+
+def propose_indexes(queries=None):
+    # One index per distinct key; queries sharing a key share its covering
+    # columns. Indexes that are a prefix of another one are dropped.
+    merged = {}
+    for query in (queries or app_queries()).values():
+        found = index_for(query)
+        if found:
+            key, covering = found
+            merged[key] = unique(merged.get(key, []) + covering)
+    indexes = {}
+    for key, covering in merged.items():
+        name = "idx_" + "_".join(key).lower()
+        indexes[name] = (list(key) + covering)[:max(Max_index_columns, len(key))]
+    return {name: columns for name, columns in indexes.items()
+            if not any(other != columns and other[:len(columns)] == columns for other in indexes.values())}
+
+def index_statements(indexes, table="Food_Order_Details"):
+    return [f"CREATE INDEX {name} ON {table} ({', '.join(columns)})" for name, columns in indexes.items()]
+
+# --------------------------------------------------
+# EXPLAIN AND TIMINGS
+# --------------------------------------------------
+
+def explain(conn, query):
+    # One line per plan step; a full scan shows as ALL (MySQL) or SCAN <table>
+    # without an index (SQLite)
+    dialect = conn.dialect.name
+    query = translate(query, dialect)
+    if dialect == "sqlite":
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).mappings().all()
+        return "; ".join(step["detail"] for step in plan)
+    plan = conn.execute(text(f"EXPLAIN {query}")).mappings().all()
+    return "; ".join(f"{step['table']}: {step['type']} key={step['key']} {step['Extra'] or ''}".strip()
+                     for step in plan)
+
+def drop_indexes(db_engine, indexes, table="Food_Order_Details"):
+    existing = {index["name"] for index in inspect(db_engine).get_indexes(table)}
+    with db_engine.begin() as conn:
+        for name in indexes:
+            if name in existing:
+                on_table = f" ON {table}" if conn.dialect.name == "mysql" else ""
+                conn.execute(text(f"DROP INDEX {name}{on_table}"))
+
+def create_indexes(db_engine, indexes, table="Food_Order_Details"):
+    with db_engine.begin() as conn:
+        for statement in index_statements(indexes, table):
+            conn.execute(text(statement))
+        # Fresh statistics so the planner weighs the new indexes
+        conn.execute(text(f"ANALYZE TABLE {table}" if conn.dialect.name == "mysql" else "ANALYZE"))
+
+def time_queries(db_engine, queries, repeat):
+    results = {}
+    with db_engine.connect() as conn:
+        for name, query in queries.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.execute(text(translate(query, conn.dialect.name))).fetchall()
+                timings.append(time.perf_counter() - start)
+            results[name] = (min(timings), explain(conn, query))
+    return results
+
+def index_report(db_engine, indexes=None, queries=None, repeat=3):
+    # Times and plans every query without, then with the indexes. The indexes
+    # are left in place afterwards.
+    indexes = indexes or propose_indexes(queries)
+    queries = queries or app_queries()
+    drop_indexes(db_engine, indexes)
+    before = time_queries(db_engine, queries, repeat)
+    create_indexes(db_engine, indexes)
+    after = time_queries(db_engine, queries, repeat)
+    report = pd.DataFrame([{"query": name,
+                            "before_ms": before[name][0] * 1000,
+                            "after_ms": after[name][0] * 1000,
+                            "speedup": before[name][0] / after[name][0],
+                            "plan_before": before[name][1],
+                            "plan_after": after[name][1]} for name in queries])
+    return report
@@ -0,0 +1,219 @@
+import pandas as pd
+import numpy as np
+
+from cleaning import Food_Delivery_Cleaning, Default_values, Raw_dtypes
+from bulk_load import bulk_load
+from database import bump_data_version
+from profiles import Profiles, upsert_profiles
+from rollups import compact_rollups, update_rollups
+from sketches import read_sketches, write_sketches
+
+Chunk_size = 100_000
+
+# Columns the first pass needs to reproduce every global statistic of
+# Food_Delivery_Cleaning
+Stat_columns = ["Order_Date","Order_Time","Customer_Gender","Area","City","Cuisine_Type",
+                "Customer_Age","Order_Value","Discount_Applied","Delivery_Rating",
+                "Delivery_Time_Min","Distance_km"]
+
+# Value counts behind the statistics: table -> counted columns, the counted
+# value last. Streaming ingest keeps them in memory; the database keeps them
+# in these tables (migration 5) for incremental ingest.
+Count_tables = {"counts_customer_age": ["Customer_Gender","Area","Customer_Age"],
+                "counts_order_value": ["City","Area","Cuisine_Type","Order_Value"],
+                "counts_discount": ["Discount_Applied"],
+                "counts_delivery": ["Delivery_Rating","Delivery_Time_Min","Distance_km"]}
+
+Source_columns = list(dict.fromkeys(column for columns in Count_tables.values() for column in columns))
+
+# --------------------------------------------------
+# EXACT STATISTICS FROM VALUE COUNTS
+# --------------------------------------------------
+
+# A median or percentile only needs how often each value occurs, so the first
+# pass keeps value counts instead of rows. Memory is bounded by the number of
+# distinct values, not by the size of the file, and the results are bit-for-bit
+# what pandas/numpy return on the full column.
+
+def merge_counts(total, counts):
+    if total is None:
+        return counts
+    levels = list(range(counts.index.nlevels))
+    return pd.concat([total, counts]).groupby(level=levels, dropna=False).sum()
+
+def kth_value(values, cumulative, k):
+    return values[np.searchsorted(cumulative, k, side="right")]
+
+def median_from_counts(counts):
+    counts = counts[counts.index.notna()].sort_index()
+    if counts.empty:
+        return np.nan
+    values = counts.index.to_numpy(dtype="float64")
+    cumulative = np.cumsum(counts.to_numpy())
+    n = cumulative[-1]
+    if n % 2:
+        return kth_value(values, cumulative, n // 2)
+    return (kth_value(values, cumulative, n // 2 - 1) + kth_value(values, cumulative, n // 2)) / 2
+
+def percentile_from_counts(counts, q):
+    counts = counts.sort_index()
+    values = counts.index.to_numpy(dtype="float64")
+    cumulative = np.cumsum(counts.to_numpy())
+    n = cumulative[-1]
+    # Same virtual index as np.percentile(method="linear"); the final
+    # interpolation is handed to numpy so it rounds exactly the same way.
+    virtual = (n - 1) * (q / 100)
+    previous = int(np.floor(virtual))
+    lower = kth_value(values, cumulative, previous)
+    upper = kth_value(values, cumulative, min(previous + 1, n - 1))
+    return np.quantile([lower, upper], virtual - previous)
+
+def group_medians_from_counts(counts, keys):
+    # counts is indexed by (*keys, value); the result matches group_medians().
+    # Sorted by group and value, a group's median ranks are located on its
+    # running count, for all groups at once.
+    counts = counts[counts.index.get_level_values(-1).notna()].sort_index()
+    frame = counts.rename("count").reset_index()
+    value = frame.columns[len(keys)]
+    grouped = frame.groupby(keys, sort=False)["count"]
+    end = grouped.cumsum().to_numpy()
+    start = end - frame["count"].to_numpy()
+    n = grouped.transform("sum").to_numpy()
+    lower = frame.loc[(start <= (n - 1) // 2) & ((n - 1) // 2 < end), keys + [value]]
+    upper = frame.loc[(start <= n // 2) & (n // 2 < end), value].to_numpy()
+    # An odd count has one middle value, and (v + v) / 2 == v exactly
+    medians = pd.Series((lower[value].to_numpy() + upper) / 2,
+                        index=pd.MultiIndex.from_frame(lower[keys]) if len(keys) > 1 else pd.Index(lower[keys[0]]),
+                        name=counts.name)
+    medians.index.names = keys
+    return medians
+
+# --------------------------------------------------
+# FIRST PASS: GLOBAL STATISTICS
+# --------------------------------------------------
+
+def source_values(chunk):
+    # The counted columns, with the categorical gaps filled the way
+    # Food_Delivery_Cleaning fills them before grouping
+    values = chunk[Source_columns].copy()
+    for column in ["Customer_Gender","Area","City","Cuisine_Type"]:
+        values[column] = values[column].fillna(Default_values[column])
+    return values
+
+def chunk_counts(values):
+    # Missing values are counted as NaN keys; each statistic drops or
+    # resolves them
+    return {table: values.groupby(columns, dropna=False).size() for table, columns in Count_tables.items()}
+
+def merge_count_tables(totals, counts):
+    if totals is None:
+        return counts
+    return {table: merge_counts(totals[table], counts[table]) for table in Count_tables}
+
+def positive(counts):
+    # Merged deltas leave a zero count behind for a value whose rows were all
+    # replaced
+    return counts[counts > 0]
+
+def discount_statistics(discount_counts):
+    # Median of the known discounts, then the IQR bounds once the missing ones
+    # are filled with it
+    discount_missing = int(discount_counts[discount_counts.index.isna()].sum())
+    discount_counts = discount_counts[discount_counts.index.notna()]
+    median = median_from_counts(discount_counts)
+    if discount_missing:
+        filled = pd.Series({median: discount_missing})
+        discount_counts = merge_counts(discount_counts, filled)
+    Q1, Q3 = (percentile_from_counts(discount_counts, q) for q in (25, 75))
+    IQR = Q3 - Q1
+    return median, (Q1 - (1.5*IQR), Q3 + (1.5*IQR))
+
+def delivery_medians(rating_time_counts):
+    # Rating median and per-rating time medians from counts indexed by
+    # (Delivery_Rating, Delivery_Time_Min); missing ratings count towards the
+    # rating median's group
+    rating_median = median_from_counts(rating_time_counts.groupby(level="Delivery_Rating").sum())
+    times = rating_time_counts.rename("count").reset_index()
+    times["Delivery_Rating"] = times["Delivery_Rating"].fillna(rating_median)
+    time_counts = times.groupby(["Delivery_Rating","Delivery_Time_Min"])["count"].sum()
+    return rating_median, group_medians_from_counts(time_counts, ["Delivery_Rating"])
+
+def distance_medians(distance_counts, rating_median, time_medians):
+    # Distance medians per (Delivery_Time_Min, Delivery_Rating) once both are
+    # filled; distance_counts is indexed like counts_delivery
+    delivery = distance_counts.rename("count").reset_index()
+    delivery["Delivery_Rating"] = delivery["Delivery_Rating"].fillna(rating_median)
+    delivery["Delivery_Time_Min"] = delivery["Delivery_Time_Min"].fillna(
+        delivery["Delivery_Rating"].map(time_medians))
+    grouped = delivery.groupby(["Delivery_Time_Min","Delivery_Rating","Distance_km"])["count"].sum()
+    return group_medians_from_counts(grouped, ["Delivery_Time_Min","Delivery_Rating"])
+
+def statistics_from_counts(counts, first_date=None, first_time=None):
+    counts = {table: positive(total) for table, total in counts.items()}
+    stats = {"Order_Date_first": first_date, "Order_Time_first": first_time}
+
+    delivery_counts = counts["counts_delivery"]
+    rating_time_counts = delivery_counts.groupby(level=[0, 1], dropna=False).sum()
+    stats["Delivery_Rating"], stats["Delivery_Time_Min"] = delivery_medians(rating_time_counts)
+    stats["Distance_km"] = distance_medians(delivery_counts, stats["Delivery_Rating"], stats["Delivery_Time_Min"])
+
+    stats["Discount_Applied"], stats["Discount_bounds"] = discount_statistics(counts["counts_discount"])
+
+    stats["Customer_Age"] = group_medians_from_counts(counts["counts_customer_age"], ["Customer_Gender","Area"])
+    stats["Order_Value"] = group_medians_from_counts(counts["counts_order_value"], ["City","Area","Cuisine_Type"])
+
+    return stats
+
+def collect_statistics(csv_path, chunksize=Chunk_size):
+    counts = None
+    first_date = first_time = None
+
+    for chunk in pd.read_csv(csv_path, usecols=Stat_columns, dtype=Raw_dtypes, chunksize=chunksize):
+        chunk = chunk.dropna(subset=["Order_Date"])
+        if chunk.empty:
+            continue
+        if first_date is None:
+            first_date = chunk["Order_Date"].iloc[0]
+            first_time = chunk["Order_Time"].fillna(Default_values["Order_Time"]).iloc[0]
+        counts = merge_count_tables(counts, chunk_counts(source_values(chunk)))
+
+    if first_date is None:
+        raise ValueError(f"{csv_path} has no rows with an Order_Date")
+
+    return statistics_from_counts(counts, first_date, first_time)
+
+# --------------------------------------------------
+# SECOND PASS: CLEAN AND INSERT CHUNK BY CHUNK
+# --------------------------------------------------
+
+def cleaned_chunks(csv_path, chunksize=Chunk_size):
+    stats = collect_statistics(csv_path, chunksize)
+    for chunk in pd.read_csv(csv_path, dtype=Raw_dtypes, chunksize=chunksize):
+        yield Food_Delivery_Cleaning(chunk, stats)
+
+def load_chunks(chunks, db_engine, table="Food_Order_Details", rollups=True):
+    # rollups: maintain the rollup tables (rollups.py), the sketches
+    # (sketches.py) and the entity profiles (profiles.py) from each cleaned
+    # chunk
+    rows = 0
+    if rollups:
+        with db_engine.connect() as conn:
+            sketches = read_sketches(conn)
+        profiles = Profiles()
+    for food_df in chunks:
+        rows += bulk_load(food_df, db_engine, table)
+        if rollups:
+            update_rollups(food_df, db_engine)
+            sketches.add(food_df)
+            profiles.add(food_df)
+    if rows:
+        if rollups:
+            compact_rollups(db_engine)
+            with db_engine.begin() as conn:
+                write_sketches(conn, sketches)
+                upsert_profiles(conn, profiles.deltas)
+        bump_data_version(db_engine)
+    return rows
+
+def stream_ingest(csv_path, db_engine, table="Food_Order_Details", chunksize=Chunk_size, rollups=True):
+    return load_chunks(cleaned_chunks(csv_path, chunksize), db_engine, table, rollups)
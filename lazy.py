@@ -0,0 +1,39 @@
+import importlib
+import threading
+
+# Stand-ins that defer an import or an object until it is first used, so a
+# process (or a Streamlit page) pays only for what it touches: a page
+# without charts never imports Plotly, one without queries never imports
+# SQLAlchemy or connects to the database.
+
+class Lazy:
+    # factory()'s result, made on first attribute access and then used for
+    # every attribute; thread safe, so page runner tasks may be the first
+
+    def __init__(self, factory):
+        self.__dict__["lazy_factory"] = factory
+        self.__dict__["lazy_lock"] = threading.Lock()
+
+    def lazy_target(self):
+        target = self.__dict__.get("lazy_value")
+        if target is None:
+            with self.lazy_lock:
+                target = self.__dict__.get("lazy_value")
+                if target is None:
+                    target = self.lazy_factory()
+                    self.__dict__["lazy_value"] = target
+        return target
+
+    @property
+    def loaded(self):
+        return "lazy_value" in self.__dict__
+
+    def __getattr__(self, name):
+        return getattr(self.lazy_target(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.lazy_target(), name, value)
+
+def lazy_module(name):
+    # pd = lazy_module("pandas") in place of import pandas as pd
+    return Lazy(lambda: importlib.import_module(name))
@@ -0,0 +1,60 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from query_cache import cache_key
+
+# Threads shared by every session for page work. Queries spend their time
+# waiting on the database, so they overlap on threads; more threads than the
+# engine's pool_size + max_overflow (database.Pool_settings) would only queue
+# for a connection.
+Page_workers = int(os.environ.get("OFD_PAGE_WORKERS", 8))
+
+# --------------------------------------------------
+# PAGE RUNNER
+# --------------------------------------------------
+
+class PageRunner:
+    # Runs a page's independent queries concurrently, and the figure builders
+    # of a frame concurrently with each other, so a page takes about as long
+    # as its slowest step instead of the sum of all of them. read_sql(query,
+    # params) runs one query (Main.py passes the query cache's).
+
+    def __init__(self, read_sql, workers=Page_workers):
+        self.read_sql = read_sql
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page")
+        self.lock = threading.Lock()
+        self.running = {}
+
+    def submit(self, function, *args):
+        return self.pool.submit(in_context(function), *args)
+
+    def query(self, query, params=None):
+        # Future of the query's frame. A query already in flight (run by
+        # another session) is joined instead of run twice.
+        key = cache_key(query, params)
+        with self.lock:
+            future = self.running.get(key)
+            if future is not None:
+                return future
+            future = self.running[key] = self.submit(self.read_sql, query, params)
+        future.add_done_callback(lambda done: self.finished(key, done))
+        return future
+
+    def finished(self, key, future):
+        with self.lock:
+            if self.running.get(key) is future:
+                del self.running[key]
+
+    def build(self, frame, *builders):
+        # (frame, figure, ...) for a frame already at hand (e.g. from the
+        # cube or a query), with every builder run concurrently
+        figures = [self.submit(build, frame) for build in builders]
+        return (frame, *[figure.result() for figure in figures])
+
+def in_context(function):
+    # function run in a copy of the caller's context variables (the
+    # profiler's current topic, profiler.py) on whichever thread runs it
+    context = contextvars.copy_context()
+    return lambda *args: context.run(function, *args)
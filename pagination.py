@@ -0,0 +1,109 @@
+Page_size = 50
+
+# Pages fetched ahead of the visible one, so "Next" is usually served from
+# memory without a query
+Prefetch_pages = 2
+
+# --------------------------------------------------
+# KEYSET QUERIES
+# --------------------------------------------------
+
+def page_query(table, columns, key="Order_Id", after=False, limit=Page_size):
+    # Keyset pagination: rows strictly after the last key already shown, so
+    # the cost of a page does not grow with its position (unlike OFFSET)
+    where = f" WHERE {key} > :after" if after else ""
+    return f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY {key} LIMIT {int(limit)}"
+
+def count_query(table):
+    return f"SELECT COUNT(*) AS total FROM {table}"
+
+# --------------------------------------------------
+# PAGER
+# --------------------------------------------------
+
+class KeysetPager:
+    # Holds the navigation state of one table view (kept in st.session_state
+    # by Main.py). read_sql(query, params) runs a query and returns a frame.
+
+    def __init__(self, table, columns, key="Order_Id", page_size=Page_size, prefetch_pages=Prefetch_pages):
+        self.table = table
+        # None selects every column
+        if columns is None:
+            self.columns = ["*"]
+        else:
+            self.columns = list(columns) if key in columns else [key, *columns]
+        self.key = key
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        # Data version the pages were read at; a new one resets the view
+        self.version = None
+        self.reset()
+
+    def reset(self):
+        # Back to the first page, with nothing buffered. starts holds the
+        # exclusive start key of every page visited so far; None is the start
+        # of the table. "Previous" steps back through this list.
+        self.starts = [None]
+        self.page = 0
+        self.buffer = None
+        self.buffer_after = None
+        self.exhausted = False
+        self.has_next = False
+
+    def fetch(self, read_sql, after):
+        limit = self.page_size * (1 + self.prefetch_pages)
+        query = page_query(self.table, self.columns, self.key, after is not None, limit)
+        params = {"after": after} if after is not None else None
+        self.buffer = read_sql(query, params)
+        self.buffer_after = after
+        self.exhausted = len(self.buffer) < limit
+
+    def position(self, after):
+        # Row of the buffer where the page starting after `after` begins, or
+        # None when the buffer does not hold the whole page
+        if self.buffer is None:
+            return None
+        if after == self.buffer_after:
+            start = 0
+        else:
+            matches = (self.buffer[self.key] == after).to_numpy().nonzero()[0]
+            if not len(matches):
+                return None
+            start = int(matches[0]) + 1
+        if start + self.page_size > len(self.buffer) and not self.exhausted:
+            return None
+        return start
+
+    def rows(self, read_sql, version=None):
+        # version: the data version (QueryCache.data_version); the buffer and
+        # the visited pages are dropped when an ingest moved it
+        if version != self.version:
+            self.reset()
+            self.version = version
+        after = self.starts[self.page]
+        start = self.position(after)
+        if start is None:
+            self.fetch(read_sql, after)
+            start = 0
+        page = self.buffer.iloc[start:start + self.page_size]
+        self.has_next = len(page) == self.page_size and (
+            start + self.page_size < len(self.buffer) or not self.exhausted)
+        return page.reset_index(drop=True)
+
+    def next(self, last_key):
+        del self.starts[self.page + 1:]
+        self.starts.append(last_key)
+        self.page += 1
+
+    def previous(self):
+        if self.page:
+            self.page -= 1
+
+    @property
+    def first_row(self):
+        return self.page * self.page_size + 1
+
+def total_rows(read_sql, table):
+    # Read through the query cache, so the count is computed once per data
+    # version rather than on every rerun
+    return int(read_sql(count_query(table), None)["total"].iloc[0])
@@ -0,0 +1,168 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from cleaning import Food_Delivery_Cleaning, Default_values, Raw_dtypes
+from ingest import (Chunk_size, Stat_columns, chunk_counts, cleaned_chunks, merge_count_tables, source_values,
+                    statistics_from_counts)
+
+# Processes cleaning runs on; 1 keeps everything in the calling process.
+# Streamlit reruns its script in spawned children on some platforms, so the
+# app only uses a pool when this is set.
+Clean_workers = int(os.environ.get("OFD_CLEAN_WORKERS", 1))
+
+# Partitions per worker: a few more than one evens out uneven partitions
+Partitions_per_worker = 2
+
+# Cleaning a frame needs its global statistics first, so it runs as two
+# parallel passes over row partitions. Each worker counts the values behind
+# the statistics in its partition (the counts ingest.collect_statistics
+# merges), the parent merges them into exact medians and IQR bounds, then
+# each worker cleans its partition with those statistics. With the
+# statistics fixed every row is cleaned independently, so the partitions
+# concatenated in order equal the serial result. Partitions travel as Arrow
+# IPC streams in shared memory instead of pickles through the pool's pipes.
+
+# --------------------------------------------------
+# SHARED-MEMORY FRAMES
+# --------------------------------------------------
+
+def share_frame(food_df):
+    # (block name, size) of the frame written into a new shared-memory block;
+    # whoever reads it last unlinks it
+    table = pa.Table.from_pandas(food_df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    stream = sink.getvalue()
+    block = shared_memory.SharedMemory(create=True, size=max(stream.size, 1))
+    block.buf[:stream.size] = memoryview(stream).cast("B")
+    block.close()
+    return block.name, stream.size
+
+def read_frame(shared, unlink=False):
+    name, size = shared
+    block = shared_memory.SharedMemory(name=name)
+    # One copy out of the block, so no view of it outlives close()
+    view = block.buf[:size]
+    stream = bytes(view)
+    view.release()
+    block.close()
+    if unlink:
+        block.unlink()
+    food_df = pa.ipc.open_stream(stream).read_all().to_pandas()
+    # Arrow hands missing text back as None; CSV reads and pandas give NaN
+    for column in food_df.columns:
+        if food_df[column].dtype == object and food_df[column].isna().any():
+            food_df[column] = food_df[column].where(food_df[column].notna(), np.nan)
+    return food_df
+
+def release(shared):
+    block = shared_memory.SharedMemory(name=shared[0])
+    block.close()
+    block.unlink()
+
+# --------------------------------------------------
+# WORKER TASKS
+# --------------------------------------------------
+
+def first_values(food_df):
+    # Order_Date and Order_Time of the first dated row, which anchor the
+    # date and time format guesses
+    dated = food_df["Order_Date"].dropna()
+    if dated.empty:
+        return None
+    first_time = food_df.at[dated.index[0], "Order_Time"]
+    return dated.iloc[0], Default_values["Order_Time"] if pd.isna(first_time) else first_time
+
+def partition_counts(shared):
+    # (first values, value counts) of a partition, None if it has no dated rows
+    food_df = read_frame(shared).dropna(subset=["Order_Date"])
+    if food_df.empty:
+        return None
+    return first_values(food_df), chunk_counts(source_values(food_df))
+
+def clean_partition(shared, stats):
+    return share_frame(Food_Delivery_Cleaning(read_frame(shared), dict(stats)))
+
+def merged_statistics(partitions):
+    # Statistics of all partitions, merged as they arrive and anchored on the
+    # first dated one's values
+    first = totals = None
+    for part in partitions:
+        if part is None:
+            continue
+        if first is None:
+            first = part[0]
+        totals = merge_count_tables(totals, part[1])
+    if totals is None:
+        raise ValueError("no rows with an Order_Date")
+    return statistics_from_counts(totals, *first)
+
+# --------------------------------------------------
+# PARALLEL CLEANING
+# --------------------------------------------------
+
+def parallel_cleaning(food_df, workers=Clean_workers, stats=None):
+    # Food_Delivery_Cleaning(food_df, stats) on a process pool
+    if workers <= 1:
+        return Food_Delivery_Cleaning(food_df, stats)
+    bounds = np.linspace(0, len(food_df), workers * Partitions_per_worker + 1).astype(int)
+    shared = [share_frame(food_df.iloc[start:end]) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if stats is None:
+                stats = merged_statistics(pool.map(partition_counts, shared))
+            cleaned = list(pool.map(clean_partition, shared, [stats] * len(shared)))
+    finally:
+        for part in shared:
+            release(part)
+    return pd.concat([read_frame(part, unlink=True) for part in cleaned])
+
+def in_order(pool, task, frames, window, *args, discard=None):
+    # task over frames on the pool, results in input order, with at most
+    # window frames in flight so memory stays bounded on large files. If the
+    # caller stops early or a task fails, the frames still in flight are
+    # released once their tasks are done, and discard(result) drops the
+    # results nobody will read.
+    pending = []
+    try:
+        for food_df in frames:
+            shared = share_frame(food_df)
+            pending.append((shared, pool.submit(task, shared, *args)))
+            if len(pending) >= window:
+                yield finished(*pending.pop(0))
+        while pending:
+            yield finished(*pending.pop(0))
+    finally:
+        for shared, future in pending:
+            future.cancel()
+        wait([future for shared, future in pending])
+        for shared, future in pending:
+            if discard is not None and not future.cancelled() and future.exception() is None:
+                discard(future.result())
+            release(shared)
+
+def finished(shared, future):
+    try:
+        return future.result()
+    finally:
+        release(shared)
+
+def parallel_cleaned_chunks(csv_path, chunksize=Chunk_size, workers=Clean_workers):
+    # ingest.cleaned_chunks with both passes spread over a process pool
+    if workers <= 1:
+        yield from cleaned_chunks(csv_path, chunksize)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = workers * Partitions_per_worker
+        chunks = pd.read_csv(csv_path, usecols=Stat_columns, dtype=Raw_dtypes, chunksize=chunksize)
+        stats = merged_statistics(in_order(pool, partition_counts, chunks, window))
+
+        chunks = pd.read_csv(csv_path, dtype=Raw_dtypes, chunksize=chunksize)
+        for cleaned in in_order(pool, clean_partition, chunks, window, stats, discard=release):
+            yield read_frame(cleaned, unlink=True)
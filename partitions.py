@@ -0,0 +1,150 @@
+import datetime
+import glob
+import os
+import shutil
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from dtypes import compact
+from snapshot import Snapshot_dir, ensure_snapshot, open_snapshot, stored_values
+
+# The cleaned orders as Parquet files partitioned by year-month, in hive
+# layout (Year_Month=YYYYMM/part-0.parquet) next to the snapshot they are
+# written from, once per snapshot. A query over a date range opens only the
+# files of its months: one month costs one partition, not the decade.
+Partition_column = "Year_Month"
+
+# Rows buffered per partition before a row group is written
+Row_group_rows = 2**16
+
+# --------------------------------------------------
+# WRITE
+# --------------------------------------------------
+
+def year_months(dates):
+    return pc.add(pc.multiply(pc.year(dates), 100), pc.month(dates))
+
+def partitions_path(snapshot_path):
+    return f"{os.path.splitext(snapshot_path)[0]}.partitions"
+
+def ensure_partitions(csv_path, snapshot_dir=Snapshot_dir):
+    # DECIMAL columns rounded as the database stores them, like the Parquet
+    # copy of the snapshot; the directory only appears once complete
+    path = ensure_snapshot(csv_path, snapshot_dir)
+    root = partitions_path(path)
+    if not os.path.exists(root):
+        partial = f"{root}.partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        try:
+            # Sorted by date, so each month is written as a few large row
+            # groups (a scan of many small ones is far slower) whose Order_Date
+            # statistics also prune day ranges within the month
+            table = stored_values(open_snapshot(path))
+            table = table.append_column(Partition_column, year_months(table["Order_Date"]))
+            table = table.sort_by([("Order_Date", "ascending"), ("Order_Id", "ascending")])
+            ds.write_dataset(table, partial, format="parquet", partitioning=[Partition_column],
+                             partitioning_flavor="hive", min_rows_per_group=Row_group_rows,
+                             max_rows_per_group=Row_group_rows * 16)
+            os.replace(partial, root)
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+    return root
+
+# --------------------------------------------------
+# DATE-RANGE PRUNING
+# --------------------------------------------------
+
+def month_bounds(first, last):
+    # (first day of month first, first day after month last) as ISO dates,
+    # for Order_Date >= start AND Order_Date < end
+    start = datetime.date(first // 100, first % 100, 1)
+    end = datetime.date(last // 100 + last % 100 // 12, last % 100 % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def month_partitions(root, first=None, last=None):
+    # Partition directories of months first..last (YYYYMM, inclusive, open
+    # ended when None), chosen from the directory names alone
+    partitions = []
+    for name in sorted(os.listdir(root)):
+        column, _, value = name.partition("=")
+        if column != Partition_column or not value.isdigit():
+            continue
+        if (first is None or int(value) >= first) and (last is None or int(value) <= last):
+            partitions.append(os.path.join(root, name))
+    return partitions
+
+def read_partitions(root, first=None, last=None, columns=None):
+    # Orders of months first..last in the compact types of dtypes.py,
+    # reading only those months' files
+    files = [file for directory in month_partitions(root, first, last)
+             for file in sorted(glob.glob(os.path.join(directory, "*.parquet")))]
+    if not files:
+        schema = ds.dataset(root, format="parquet", partitioning="hive").schema
+        table = schema.remove(schema.get_field_index(Partition_column)).empty_table()
+        table = table if columns is None else table.select(columns)
+    else:
+        table = ds.dataset(files, format="parquet").to_table(columns=columns)
+    return compact(table.to_pandas())
+
+def read_months(csv_path, first=None, last=None, columns=None, snapshot_dir=Snapshot_dir):
+    return read_partitions(ensure_partitions(csv_path, snapshot_dir), first, last, columns)
+
+# --------------------------------------------------
+# YEAR-OVER-YEAR MONTHLY TREND
+# --------------------------------------------------
+
+# Monthly orders and revenue of a range of months, per source: the month
+# rollup (SQL backends with rollups), an Order_Date range on the indexed
+# table (SQL backends without) or the partitions of the range (DuckDB, whose
+# Food_Order_Partitions view exposes Year_Month)
+Yoy_queries = {
+    "rollups": """
+        SELECT Order_Year AS Year, Order_Month AS Month,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Final_Amount) / 100.0 AS Total_revenue
+        FROM rollup_month
+        WHERE Order_Year * 100 + Order_Month BETWEEN :first AND :last
+        GROUP BY Order_Year, Order_Month
+        ORDER BY Year, Month;
+        """,
+    "table": """
+        SELECT YEAR(Order_Date) AS Year, MONTH(Order_Date) AS Month,
+        COUNT(*) AS Total_orders,
+        SUM(Final_Amount) AS Total_revenue
+        FROM Food_Order_Details
+        WHERE Order_Date >= :start AND Order_Date < :end
+        GROUP BY YEAR(Order_Date), MONTH(Order_Date)
+        ORDER BY Year, Month;
+        """,
+    "partitions": """
+        SELECT Year_Month // 100 AS Year, Year_Month % 100 AS Month,
+        COUNT(*) AS Total_orders,
+        SUM(Final_Amount) AS Total_revenue
+        FROM Food_Order_Partitions
+        WHERE Year_Month BETWEEN :first AND :last
+        GROUP BY Year_Month
+        ORDER BY Year, Month;
+        """,
+}
+
+def yoy_query(source, first, last):
+    # (query, params) of months first..last and the same months a year
+    # earlier, which the change is computed against
+    first -= 100
+    if source == "table":
+        start, end = month_bounds(first, last)
+        return Yoy_queries[source], {"start": start, "end": end}
+    return Yoy_queries[source], {"first": first, "last": last}
+
+def year_over_year(monthly, first, last):
+    # Months first..last of a yoy_query answer, each with the revenue of the
+    # same month a year earlier and the change in percent
+    monthly = monthly.astype({"Year": "int64", "Month": "int64", "Total_orders": "int64", "Total_revenue": "float64"})
+    previous = monthly[["Year", "Month", "Total_revenue"]].rename(columns={"Total_revenue": "Previous_year_revenue"})
+    previous["Year"] += 1
+    trend = monthly.merge(previous, on=["Year", "Month"], how="left")
+    months = trend["Year"] * 100 + trend["Month"]
+    trend = trend[(months >= first) & (months <= last)].reset_index(drop=True)
+    trend["YoY_change_percent"] = ((trend["Total_revenue"] / trend["Previous_year_revenue"] - 1) * 100).round(2)
+    return trend
@@ -0,0 +1,151 @@
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from lazy import lazy_module
+
+# Needed only to summarize or export the spans
+np = lazy_module("numpy")
+pd = lazy_module("pandas")
+
+# Off unless OFD_PROFILE=1 (or switched on from the diagnostics page); while
+# off, every phase is a shared no-op and nothing is recorded
+Profile_enabled = os.environ.get("OFD_PROFILE", "0") == "1"
+
+# Where export writes the trace logs
+Trace_dir = os.environ.get("OFD_TRACE_DIR", "traces")
+
+# Phases of a topic, in the order they happen: a connection taken from the
+# pool, the query executed, its rows fetched, the frame built from them, the
+# figures built and the frames and figures handed to Streamlit
+Phases = ["connect", "execute", "fetch", "frame", "figure", "render"]
+
+# Spans kept in memory; the oldest are dropped first
+Max_spans = 100_000
+
+# --------------------------------------------------
+# SPANS
+# --------------------------------------------------
+
+# (run id, topic) of the script run a span belongs to. Page runner tasks run
+# in a copy of the submitting run's context, so their spans count for it too.
+Current_run = contextvars.ContextVar("profiler_run", default=(0, "other"))
+
+class Span:
+
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase = phase
+        self.rows = None
+        self.bytes = None
+
+    def count(self, rows=None, frame=None, nbytes=None):
+        # Rows and bytes moved by the phase; a frame gives both
+        if frame is not None:
+            rows = len(frame)
+            nbytes = int(frame.memory_usage(deep=True).sum())
+        if rows is not None:
+            self.rows = rows
+        if nbytes is not None:
+            self.bytes = nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        run, topic = Current_run.get()
+        self.profiler.record({"run": run, "topic": topic, "phase": self.phase, "ms": seconds * 1000,
+                              "rows": self.rows, "bytes": self.bytes, "thread": threading.current_thread().name,
+                              "time": time.time()})
+
+class NullSpan:
+    # Stands in for every span while profiling is off
+
+    def count(self, rows=None, frame=None, nbytes=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+Null_span = NullSpan()
+
+# --------------------------------------------------
+# PROFILER
+# --------------------------------------------------
+
+class Profiler:
+
+    def __init__(self, enabled=Profile_enabled, max_spans=Max_spans):
+        self.enabled = enabled
+        self.spans = deque(maxlen=max_spans)
+        self.runs = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def phase(self, name):
+        # with profiler.phase("execute") as span: ...; span.count(rows=...)
+        if not self.enabled:
+            return Null_span
+        return Span(self, name)
+
+    def start_run(self, topic):
+        # Spans until the next start_run in this context belong to one view
+        # of topic
+        if self.enabled:
+            Current_run.set((next(self.runs), topic))
+
+    def record(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def clear(self):
+        with self.lock:
+            self.spans.clear()
+
+    def frame(self):
+        with self.lock:
+            spans = list(self.spans)
+        spans = pd.DataFrame(spans, columns=["run", "topic", "phase", "ms", "rows", "bytes", "thread", "time"])
+        return spans.astype({"rows": "Int64", "bytes": "Int64"})
+
+    def summary(self):
+        # Per topic and phase: views, p50 and p95 of the phase's time per view
+        # (its spans summed, e.g. every query of a page) and rows and bytes
+        # moved per view
+        spans = self.frame()
+        if spans.empty:
+            return pd.DataFrame(columns=["topic", "phase", "views", "p50_ms", "p95_ms", "rows", "bytes"])
+        views = (spans.groupby(["topic", "phase", "run"], sort=False)
+                 .agg(ms=("ms", "sum"),
+                      rows=("rows", lambda rows: rows.sum(min_count=1)),
+                      bytes=("bytes", lambda nbytes: nbytes.sum(min_count=1)))
+                 .reset_index())
+        summary = (views.groupby(["topic", "phase"], sort=False)
+                   .agg(views=("run", "nunique"),
+                        p50_ms=("ms", lambda ms: np.percentile(ms, 50)),
+                        p95_ms=("ms", lambda ms: np.percentile(ms, 95)),
+                        rows=("rows", "median"), bytes=("bytes", "median"))
+                   .reset_index())
+        summary["phase"] = pd.Categorical(summary["phase"], Phases, ordered=True)
+        return summary.sort_values(["topic", "phase"], ignore_index=True).round(2)
+
+    def export(self, trace_dir=Trace_dir):
+        # Writes the spans as JSON lines and CSV; returns both paths
+        os.makedirs(trace_dir, exist_ok=True)
+        spans = self.frame()
+        stem = os.path.join(trace_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        with open(f"{stem}.jsonl", "w", encoding="utf-8") as file:
+            for span in spans.to_dict("records"):
+                file.write(json.dumps({key: None if pd.isna(value) else value for key, value in span.items()}) + "\n")
+        spans.to_csv(f"{stem}.csv", index=False)
+        return f"{stem}.jsonl", f"{stem}.csv"
+
+profiler = Profiler()
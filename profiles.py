@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from bulk_load import Batch_size, batches, load_multirow, scaled_integers
+from dtypes import compact
+from rollups import Measures
+
+# --------------------------------------------------
+# PROFILE TABLES
+# --------------------------------------------------
+
+# One row per customer, restaurant and delivery partner, kept up to date at
+# ingest (migration 8), so a question about one of them reads its row by
+# primary key and a leaderboard reads a range of an index instead of
+# grouping every order. Restaurants are keyed by name like the restaurant
+# analyses (a Restaurant_ID of the source data comes with many names).
+# Sums are exact integers in units of 1/scale (rollups.Measures), so
+# profiles add and subtract exactly; profile_customer_cuisine holds each
+# customer's orders per cuisine, which the favourite cuisine is picked from.
+#
+# table -> (key columns, summed columns)
+Ratings = [1, 2, 3, 4, 5]
+
+Profile_tables = {
+    "profile_customer": (["Customer_ID"],
+                         ["order_count", "cancelled_count", "sum_Order_Value", "sum_Final_Amount"]),
+    "profile_customer_cuisine": (["Customer_ID", "Cuisine_Type"],
+                                 ["order_count"]),
+    "profile_restaurant": (["Restaurant_Name"],
+                           ["order_count", "cancelled_count", "cnt_Restaurant_Rating", "sum_Restaurant_Rating",
+                            "sum_Final_Amount"]),
+    "profile_partner": (["Delivery_Partner_ID"],
+                        ["order_count", "delivered_count", "cnt_Delivery_Time_Min", "sum_Delivery_Time_Min",
+                         *[f"rating_{rating}" for rating in Ratings]]),
+}
+
+# Customer columns that are not sums: first and last order date (minimum and
+# maximum) and the favourite cuisine with its orders
+Customer_columns = ["first_order", "last_order", "favourite_cuisine", "favourite_orders"]
+
+Profile_columns = ["Customer_ID","Restaurant_Name","Delivery_Partner_ID","Cuisine_Type","Order_Date","Order_Status",
+                   "Order_Value","Final_Amount","Restaurant_Rating","Delivery_Time_Min","Delivery_Rating"]
+
+# entity -> (profile table, key column, {leaderboard: indexed column})
+Entities = {"customer": ("profile_customer", "Customer_ID",
+                         {"Spend": "sum_Order_Value", "Orders": "order_count"}),
+            "restaurant": ("profile_restaurant", "Restaurant_Name",
+                           {"Revenue": "sum_Final_Amount", "Orders": "order_count",
+                            "Cancellations": "cancelled_count"}),
+            "partner": ("profile_partner", "Delivery_Partner_ID",
+                        {"Deliveries": "delivered_count", "Orders": "order_count"})}
+
+# Keys per lookup or delete statement
+Key_batch = 1_000
+
+def profile_ddl():
+    statements = []
+    for table, (keys, sums) in Profile_tables.items():
+        columns = [f"{key} VARCHAR(50) NOT NULL" for key in keys]
+        columns += [f"{column} BIGINT NOT NULL" for column in sums]
+        if table == "profile_customer":
+            columns += ["first_order DATE", "last_order DATE", "favourite_cuisine VARCHAR(50)",
+                        "favourite_orders BIGINT"]
+        columns.append(f"PRIMARY KEY ({', '.join(keys)})")
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table}({', '.join(columns)})")
+    for table, key, leaderboards in Entities.values():
+        for column in dict.fromkeys(leaderboards.values()):
+            statements.append(f"CREATE INDEX idx_{table}_{column} ON {table} ({column})")
+    # An entity's own orders, for the drill-down and the customers' order
+    # dates (Customer_ID is indexed since migration 4)
+    statements += ["CREATE INDEX idx_restaurant_name ON Food_Order_Details (Restaurant_Name)",
+                   "CREATE INDEX idx_delivery_partner ON Food_Order_Details (Delivery_Partner_ID)"]
+    return statements
+
+# --------------------------------------------------
+# DELTAS FROM ORDERS
+# --------------------------------------------------
+
+def profile_facts(food_df):
+    facts = pd.DataFrame({key: food_df[key].astype(object).to_numpy()
+                          for key in ["Customer_ID", "Restaurant_Name", "Delivery_Partner_ID", "Cuisine_Type"]})
+    cancelled = (food_df["Order_Status"] == "Cancelled").to_numpy().astype(np.int64)
+    facts["order_count"] = np.ones(len(food_df), dtype=np.int64)
+    facts["cancelled_count"] = cancelled
+    facts["delivered_count"] = 1 - cancelled
+    facts["Order_Date"] = pd.to_datetime(food_df["Order_Date"]).to_numpy()
+    for measure in ["Order_Value", "Final_Amount", "Restaurant_Rating", "Delivery_Time_Min"]:
+        scaled = scaled_integers(food_df[measure], Measures[measure])
+        facts[f"cnt_{measure}"] = (~np.isnan(scaled)).astype(np.int64)
+        facts[f"sum_{measure}"] = np.nan_to_num(scaled).astype(np.int64)
+    ratings = pd.to_numeric(food_df["Delivery_Rating"], errors="coerce").to_numpy()
+    for rating in Ratings:
+        facts[f"rating_{rating}"] = (ratings == rating).astype(np.int64)
+    return facts
+
+def profile_sums(facts, table, sign=1):
+    # One row per entity of table (orders without its key are left out)
+    keys, sums = Profile_tables[table]
+    grouped = facts.dropna(subset=keys).groupby(keys, sort=False)
+    rows = (grouped[sums].sum() * sign).astype(np.int64)
+    if table == "profile_customer":
+        dates = grouped["Order_Date"].agg(["min", "max"])
+        # A minimum cannot be taken back: removed orders leave the dates to
+        # refresh_order_dates
+        rows["first_order"] = dates["min"] if sign > 0 else pd.NaT
+        rows["last_order"] = dates["max"] if sign > 0 else pd.NaT
+    return rows.reset_index()
+
+def profile_deltas(food_df, removed=None):
+    # Per-entity deltas of adding the orders of food_df and taking out those
+    # of removed (orders replaced by an incremental ingest)
+    deltas = {table: profile_sums(profile_facts(food_df), table) for table in Profile_tables}
+    if removed is not None and not removed.empty:
+        facts = profile_facts(removed)
+        for table in Profile_tables:
+            deltas[table] = merged_profiles(pd.concat([deltas[table], profile_sums(facts, table, -1)],
+                                                      ignore_index=True), table)
+    return deltas
+
+def merged_profiles(rows, table):
+    # Rows of the same entity summed (order dates by minimum and maximum)
+    keys, sums = Profile_tables[table]
+    aggregations = dict.fromkeys(sums, "sum")
+    if table == "profile_customer":
+        aggregations.update(first_order="min", last_order="max")
+    merged = rows.groupby(keys, sort=False).agg(aggregations).reset_index()
+    return merged.astype(dict.fromkeys(sums, np.int64))
+
+def favourite_cuisines(cuisines):
+    # Each customer's cuisine with the most orders (ties alphabetically)
+    cuisines = cuisines[cuisines["order_count"] > 0]
+    cuisines = cuisines.sort_values(["Customer_ID", "order_count", "Cuisine_Type"], ascending=[True, False, True])
+    favourites = cuisines.drop_duplicates("Customer_ID").set_index("Customer_ID")
+    return favourites.rename(columns={"Cuisine_Type": "favourite_cuisine", "order_count": "favourite_orders"})
+
+class Profiles:
+    # Deltas summed over the chunks of a load, written once at its end
+
+    def __init__(self):
+        self.deltas = {}
+
+    def add(self, food_df):
+        if food_df.empty:
+            return
+        for table, delta in profile_deltas(food_df).items():
+            if table in self.deltas:
+                delta = merged_profiles(pd.concat([self.deltas[table], delta], ignore_index=True), table)
+            self.deltas[table] = delta
+
+# --------------------------------------------------
+# MAINTENANCE
+# --------------------------------------------------
+
+def stored_profiles(conn, table, keys):
+    key = Profile_tables[table][0][0]
+    query = text(f"SELECT * FROM {table} WHERE {key} IN :keys").bindparams(bindparam("keys", expanding=True))
+    frames = [pd.read_sql(query, conn, params={"keys": batch}) for batch in batches(keys, Key_batch)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return None
+    rows = pd.concat(frames, ignore_index=True)
+    if table == "profile_customer":
+        rows = rows.drop(columns=["favourite_cuisine", "favourite_orders"])
+        rows[["first_order", "last_order"]] = rows[["first_order", "last_order"]].apply(pd.to_datetime)
+    return rows
+
+def delete_profiles(conn, table, keys):
+    key = Profile_tables[table][0][0]
+    statement = text(f"DELETE FROM {table} WHERE {key} IN :keys").bindparams(bindparam("keys", expanding=True))
+    for batch in batches(keys, Key_batch):
+        conn.execute(statement, {"keys": batch})
+
+def order_dates(conn, customers):
+    # First and last order of each customer, from the Customer_ID index
+    query = text("SELECT Customer_ID, MIN(Order_Date) AS first_order, MAX(Order_Date) AS last_order "
+                 "FROM Food_Order_Details WHERE Customer_ID IN :keys GROUP BY Customer_ID")
+    query = query.bindparams(bindparam("keys", expanding=True))
+    frames = [pd.read_sql(query, conn, params={"keys": batch}) for batch in batches(customers, Key_batch)]
+    dates = pd.concat(frames, ignore_index=True).set_index("Customer_ID")
+    return dates.apply(pd.to_datetime)
+
+def upsert_profiles(conn, deltas, replaced=()):
+    # Adds the deltas to the stored profiles, reading and rewriting only the
+    # rows of the entities they touch, by primary key; an empty table is
+    # simply filled. replaced: customers who lost orders, whose first and
+    # last order are read again once the table holds the new rows.
+    if not inspect(conn).has_table("profile_customer"):
+        return
+    merged = {}
+    for table, delta in deltas.items():
+        keys = delta[Profile_tables[table][0][0]].unique().tolist()
+        filled = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() > 0
+        stored = stored_profiles(conn, table, keys) if filled and keys else None
+        rows = delta if stored is None else merged_profiles(pd.concat([stored, delta], ignore_index=True), table)
+        merged[table] = rows[rows["order_count"] > 0]
+        if stored is not None:
+            delete_profiles(conn, table, keys)
+
+    customers = merged["profile_customer"].set_index("Customer_ID")
+    customers = customers.join(favourite_cuisines(merged["profile_customer_cuisine"]))
+    replaced = [customer for customer in replaced if customer in customers.index]
+    if replaced:
+        dates = order_dates(conn, replaced)
+        customers.loc[dates.index, ["first_order", "last_order"]] = dates[["first_order", "last_order"]]
+    merged["profile_customer"] = customers.reset_index()
+
+    for table, rows in merged.items():
+        keys, sums = Profile_tables[table]
+        columns = keys + sums + (Customer_columns if table == "profile_customer" else [])
+        load_multirow(rows[columns], conn, table, Batch_size)
+
+def rebuild_profiles(db_engine, chunksize=100_000):
+    # Full recomputation from Food_Order_Details, e.g. for data loaded before
+    # the profiles existed
+    profiles = Profiles()
+    query = f"SELECT {', '.join(Profile_columns)} FROM Food_Order_Details"
+    with db_engine.connect() as conn:
+        for chunk in pd.read_sql(text(query), conn, chunksize=chunksize):
+            profiles.add(chunk)
+    with db_engine.begin() as conn:
+        for table in Profile_tables:
+            conn.execute(text(f"DELETE FROM {table}"))
+        if profiles.deltas:
+            upsert_profiles(conn, profiles.deltas)
+
+def ensure_profiles(db_engine):
+    if not inspect(db_engine).has_table("profile_partner"):
+        return
+    with db_engine.connect() as conn:
+        orders = conn.execute(text("SELECT COUNT(Delivery_Partner_ID) FROM Food_Order_Details")).scalar()
+        profiled = conn.execute(text("SELECT COALESCE(SUM(order_count), 0) FROM profile_partner")).scalar()
+    if orders != profiled:
+        rebuild_profiles(db_engine)
+
+# --------------------------------------------------
+# LOOKUPS AND LEADERBOARDS
+# --------------------------------------------------
+
+# (SQL, params) pairs, for a backend's read_sql or the query cache
+
+def profile_query(entity, key):
+    # One entity's row, by primary key
+    table, column, _ = Entities[entity]
+    return f"SELECT * FROM {table} WHERE {column} = :key", {"key": key}
+
+def leaderboard_query(entity, leaderboard, k=10):
+    # The k entities with the highest value, read from the top of its index
+    table, _, leaderboards = Entities[entity]
+    return f"SELECT * FROM {table} ORDER BY {leaderboards[leaderboard]} DESC LIMIT {int(k)}", None
+
+def cuisine_query(customer):
+    # A customer's orders per cuisine, a range of the primary key
+    return ("SELECT Cuisine_Type, order_count FROM profile_customer_cuisine WHERE Customer_ID = :key "
+            "ORDER BY order_count DESC, Cuisine_Type", {"key": customer})
+
+def orders_query(entity, key, limit=20):
+    # An entity's latest orders, from its Food_Order_Details index
+    _, column, _ = Entities[entity]
+    return (f"SELECT Order_Id, Order_Date, Order_Time, Customer_ID, Restaurant_Name, Delivery_Partner_ID, City, "
+            f"Cuisine_Type, Order_Value, Final_Amount, Order_Status, Delivery_Time_Min, Delivery_Rating "
+            f"FROM Food_Order_Details WHERE {column} = :key ORDER BY Order_Date DESC, Order_Time DESC "
+            f"LIMIT {int(limit)}", {"key": key})
+
+def profile_view(rows, entity):
+    # Stored profile rows with their measures in plain units and the rates
+    # and averages derived from them
+    rows = rows.astype({column: "float64" for column in rows.columns if column.startswith(("sum_", "cnt_"))})
+    orders = rows["order_count"].astype("int64")
+    view = pd.DataFrame({Entities[entity][1]: rows[Entities[entity][1]], "Orders": orders})
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if entity == "customer":
+            view["Cancelled"] = rows["cancelled_count"].astype("int64")
+            view["Spend"] = rows["sum_Order_Value"] / Measures["Order_Value"]
+            view["Avg_order_value"] = (view["Spend"] / orders).round(2)
+            view["Paid"] = rows["sum_Final_Amount"] / Measures["Final_Amount"]
+            view["First_order"] = pd.to_datetime(rows["first_order"]).dt.date
+            view["Last_order"] = pd.to_datetime(rows["last_order"]).dt.date
+            view["Favourite_cuisine"] = rows["favourite_cuisine"]
+            view["Favourite_cuisine_orders"] = rows["favourite_orders"].astype("Int64")
+        elif entity == "restaurant":
+            view["Cancelled"] = rows["cancelled_count"].astype("int64")
+            view["Cancellation_percent"] = (rows["cancelled_count"] * 100.0 / orders).round(2)
+            view["Avg_rating"] = (rows["sum_Restaurant_Rating"] / Measures["Restaurant_Rating"]
+                                  / rows["cnt_Restaurant_Rating"]).round(2)
+            view["Ratings"] = rows["cnt_Restaurant_Rating"].astype("int64")
+            view["Revenue"] = rows["sum_Final_Amount"] / Measures["Final_Amount"]
+        else:
+            counts = rows[[f"rating_{rating}" for rating in Ratings]].astype("int64")
+            view["Delivered"] = rows["delivered_count"].astype("int64")
+            view["Avg_delivery_time"] = (rows["sum_Delivery_Time_Min"] / rows["cnt_Delivery_Time_Min"]).round(2)
+            view["Avg_rating"] = ((counts.to_numpy() * np.array(Ratings)).sum(axis=1) / counts.sum(axis=1)).round(2)
+            for rating in Ratings:
+                view[f"Rating_{rating}"] = counts[f"rating_{rating}"]
+    return compact(view)
@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dialects import Quoted
+
+# --------------------------------------------------
+# SQL NORMALIZATION
+# --------------------------------------------------
+
+def normalize_sql(query):
+    # Whitespace and a trailing ";" do not change a query, so they should not
+    # change its cache key either. String literals are kept as written.
+    parts = Quoted.split(query.strip().rstrip(";"))
+    return "".join(part if index % 2 else re.sub(r"\s+", " ", part)
+                   for index, part in enumerate(parts)).strip()
+
+def cache_key(query, params=None):
+    if params is None:
+        frozen = ()
+    elif isinstance(params, dict):
+        frozen = tuple(sorted(params.items()))
+    else:
+        frozen = tuple(params)
+    return normalize_sql(query), frozen
+
+# --------------------------------------------------
+# QUERY RESULT CACHE
+# --------------------------------------------------
+
+class QueryCache:
+    # Result frames are shared between callers and must not be modified.
+
+    def __init__(self, ttl=600, max_bytes=256 * 2**20, version_source=None, version_poll=30):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Callable returning the current data version (Backend.data_version),
+        # polled at most every version_poll seconds
+        self.version_source = version_source
+        self.version_poll = version_poll
+        self.entries = OrderedDict()
+        # Bytes of every entry, kept as entries come and go
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.version = None
+        self.version_checked = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def size_bytes(self):
+        return self.bytes
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def check_version(self, force=False):
+        # force polls now, after an ingest this process made
+        if self.version_source is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.version_checked < self.version_poll:
+            return
+        self.version_checked = now
+        version = self.version_source()
+        if version != self.version:
+            self.version = version
+            self.invalidate()
+
+    def data_version(self):
+        # The data version as of the last poll, for the caches keyed on it
+        # (cube, sketches, series): a rerun between polls costs no query
+        self.check_version()
+        return self.version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires"] < time.monotonic():
+                del self.entries[key]
+                self.bytes -= entry["bytes"]
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+            return entry["frame"]
+
+    def put(self, key, frame, seconds):
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries[key]["bytes"]
+            self.bytes += nbytes
+            self.entries[key] = {"frame": frame,
+                                 "bytes": nbytes,
+                                 "seconds": seconds,
+                                 "expires": time.monotonic() + self.ttl}
+            self.entries.move_to_end(key)
+            while self.bytes > self.max_bytes:
+                self.bytes -= self.entries.popitem(last=False)[1]["bytes"]
+                self.evictions += 1
+
+    def read_sql(self, query, backend, params=None):
+        # backend: any object with read_sql(query, params), see backends.py
+        self.check_version()
+        key = cache_key(query, params)
+        frame = self.get(key)
+        if frame is not None:
+            return frame
+
+        start = time.perf_counter()
+        frame = backend.read_sql(query, params)
+        seconds = time.perf_counter() - start
+        with self.lock:
+            self.misses += 1
+        self.put(key, frame, seconds)
+        return frame
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "evictions": self.evictions,
+                "data_version": self.version}
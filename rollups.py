@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from bulk_load import Batch_size, bulk_load, ensure_table, load_multirow, round_half_up, scaled_integers
+from dialects import translate
+from topics import Topic_queries
+
+# --------------------------------------------------
+# ROLLUP DEFINITIONS
+# --------------------------------------------------
+
+# Every analysis topic groups by a few of these dimensions, so each rollup
+# table holds one row of measures per dimension combination. Rows are appended
+# as deltas at ingest time and summed by the queries (compact_rollups merges
+# them).
+Rollups = {"rollup_age_group": ["Customer_Age_group"],
+           "rollup_order_day": ["Order_Day","Order_day_name"],
+           "rollup_month": ["Order_Year","Order_Month"],
+           "rollup_city_cuisine": ["City","Cuisine_Type"],
+           "rollup_restaurant": ["Restaurant_Name"],
+           "rollup_delivery": ["Delivery_Rating","Distance_range"],
+           "rollup_peak_payment": ["Peak_Hour","Payment_Mode"],
+           "rollup_cancellation": ["City","Cancellation_Reason"]}
+
+Integer_dimensions = ["Order_Year","Order_Month","Delivery_Rating","Peak_Hour"]
+
+# Sums are stored as exact integers in units of 1/scale (cents for the
+# DECIMAL(10,2) columns), so they add up exactly like SUM() over the table.
+Measures = {"Order_Value": 100,
+            "Final_Amount": 100,
+            "Delivery_Time_Min": 1,
+            "Restaurant_Rating": 100,
+            "Profit_Margin": 100,
+            "Profit_Margin_Percent": 100}
+
+Fact_columns = ["Order_Date","Distance_km","Order_Status","Customer_Age_group","Order_Day",
+                "Order_day_name","City","Cuisine_Type","Restaurant_Name","Delivery_Rating",
+                "Peak_Hour","Payment_Mode","Cancellation_Reason",*Measures]
+
+def rollup_ddl():
+    statements = []
+    for table, dims in Rollups.items():
+        columns = [f"{dim} {'INT' if dim in Integer_dimensions else 'VARCHAR(50)'}" for dim in dims]
+        columns += ["order_count BIGINT NOT NULL", "cancelled_count BIGINT NOT NULL"]
+        for measure in Measures:
+            columns += [f"cnt_{measure} BIGINT NOT NULL",
+                        f"sum_{measure} BIGINT NOT NULL",
+                        f"sumsq_{measure} DOUBLE NOT NULL"]
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table}({', '.join(columns)})")
+    return statements
+
+# --------------------------------------------------
+# DELTAS FROM CLEANED ORDERS
+# --------------------------------------------------
+
+def distance_range(distance_km):
+    # Same buckets as the CASE expression of the distance analysis, on the
+    # stored DECIMAL(10,2) distance
+    distance = round_half_up(distance_km, 2)
+    return np.select([distance <= 5, distance <= 10, distance <= 15, distance <= 20, distance <= 30],
+                     ["0-5 km", "5-10 km", "10-15 km", "15-20 km", "20-30 km"], "30+ km")
+
+def rollup_facts(food_df):
+    dates = pd.to_datetime(food_df["Order_Date"])
+    facts = pd.DataFrame({"Order_Year": dates.dt.year.to_numpy(),
+                          "Order_Month": dates.dt.month.to_numpy(),
+                          "Distance_range": distance_range(food_df["Distance_km"]),
+                          "Peak_Hour": food_df["Peak_Hour"].astype("int64").to_numpy(),
+                          "Delivery_Rating": food_df["Delivery_Rating"].astype("int64").to_numpy(),
+                          "cancelled": (food_df["Order_Status"] == "Cancelled").astype("int64").to_numpy()})
+    for dims in Rollups.values():
+        for dim in dims:
+            if dim not in facts:
+                facts[dim] = food_df[dim].to_numpy()
+    for measure, scale in Measures.items():
+        scaled = scaled_integers(food_df[measure], scale)
+        facts[f"sum_{measure}"] = scaled
+        facts[f"sumsq_{measure}"] = (scaled / scale) ** 2
+    return facts
+
+def rollup_deltas(food_df):
+    facts = rollup_facts(food_df)
+    deltas = {}
+    for table, dims in Rollups.items():
+        aggregations = {"order_count": ("cancelled", "size"),
+                        "cancelled_count": ("cancelled", "sum")}
+        for measure in Measures:
+            aggregations[f"cnt_{measure}"] = (f"sum_{measure}", "count")
+            aggregations[f"sum_{measure}"] = (f"sum_{measure}", "sum")
+            aggregations[f"sumsq_{measure}"] = (f"sumsq_{measure}", "sum")
+        delta = facts.groupby(dims, dropna=False).agg(**aggregations).reset_index()
+        counts = [column for column in delta.columns if column.startswith(("order_count","cancelled_count","cnt_","sum_"))]
+        deltas[table] = delta.astype({column: "int64" for column in counts})
+    return deltas
+
+# --------------------------------------------------
+# MAINTENANCE
+# --------------------------------------------------
+
+def update_rollups(food_df, db_engine):
+    if food_df.empty:
+        return
+    for table, delta in rollup_deltas(food_df).items():
+        bulk_load(delta, db_engine, table)
+
+def merge_deltas(rows, dims):
+    # Sum the delta rows of one rollup table per dimension combination
+    measures = [column for column in rows.columns if column not in dims]
+    return rows.groupby(dims, dropna=False)[measures].sum().reset_index()[rows.columns]
+
+def compact_rollups(db_engine):
+    # Merge the delta rows of each table into one row per dimension
+    # combination, in the same transaction that removes them
+    for table, dims in Rollups.items():
+        with db_engine.begin() as conn:
+            rows = pd.read_sql(text(f"SELECT * FROM {table}"), conn)
+            merged = merge_deltas(rows, dims)
+            # Groups whose orders were all replaced by an incremental ingest
+            merged = merged[merged["order_count"] != 0]
+            if len(merged) == len(rows):
+                continue
+            conn.execute(text(f"DELETE FROM {table}"))
+            load_multirow(merged, conn, table, Batch_size)
+
+def rebuild_rollups(db_engine, chunksize=100_000):
+    # Full recomputation from Food_Order_Details, e.g. for data loaded before
+    # the rollups existed. The totals are summed in memory while the table is
+    # read and replace each rollup table in one transaction.
+    totals = dict.fromkeys(Rollups)
+    query = f"SELECT {', '.join(Fact_columns)} FROM Food_Order_Details"
+    with db_engine.connect() as conn:
+        for chunk in pd.read_sql(text(query), conn, chunksize=chunksize):
+            for table, delta in rollup_deltas(chunk).items():
+                if totals[table] is not None:
+                    delta = merge_deltas(pd.concat([totals[table], delta], ignore_index=True), Rollups[table])
+                totals[table] = delta
+
+    for table, total in totals.items():
+        if total is not None:
+            ensure_table(db_engine, table, total)
+        with db_engine.begin() as conn:
+            if inspect(conn).has_table(table):
+                conn.execute(text(f"DELETE FROM {table}"))
+            if total is not None:
+                load_multirow(total, conn, table, Batch_size)
+
+def ensure_rollups(db_engine):
+    with db_engine.connect() as conn:
+        orders = conn.execute(text("SELECT COUNT(*) FROM Food_Order_Details")).scalar()
+        summarized = conn.execute(text("SELECT COALESCE(SUM(order_count), 0) FROM rollup_month")).scalar()
+    if orders != summarized:
+        rebuild_rollups(db_engine)
+
+# --------------------------------------------------
+# TOPIC QUERIES
+# --------------------------------------------------
+
+# topic -> (query on the rollups, key columns). The answers equal the
+# full-table topics.Topic_queries, without scanning Food_Order_Details.
+Rollup_queries = {
+    "Age Group vs Order value": ("""
+        SELECT Customer_Age_group,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Order_Value) / 100.0 AS Total_revenue,
+        SUM(sum_Final_Amount) / 100.0 AS Total_order_value
+        FROM rollup_age_group
+        GROUP BY Customer_Age_group
+        ORDER BY Total_order_value DESC;
+        """, ["Customer_Age_group"]),
+    "Weekend vs Weekday Order patterns": ("""
+        SELECT Order_Day, Order_day_name,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Order_Value) / 100.0 AS Total_Revenue,
+        SUM(sum_Order_Value) / 100.0 / SUM(cnt_Order_Value) AS avg_order_value
+        FROM rollup_order_day
+        GROUP BY Order_Day, Order_day_name;
+        """, ["Order_Day","Order_day_name"]),
+    "Monthly revenue trends": ("""
+        SELECT Order_Month AS Month,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Final_Amount) / 100.0 AS Total_revenue,
+        ROUND(SUM(sum_Final_Amount) / 100.0 / SUM(cnt_Final_Amount), 2) AS Avg_Order_Value
+        FROM rollup_month
+        GROUP BY Order_Month
+        ORDER BY Month ASC;
+        """, ["Month"]),
+    "High-revenue cities and cuisines": ("""
+        SELECT City,
+        Cuisine_Type,
+        SUM(sum_Final_Amount) / 100.0 AS Total_Revenue
+        FROM rollup_city_cuisine
+        GROUP BY City, Cuisine_Type
+        ORDER BY Total_Revenue DESC;
+        """, ["City","Cuisine_Type"]),
+    "Average delivery time by city": ("""
+        SELECT City,
+        SUM(sum_Delivery_Time_Min) * 1.0 / SUM(cnt_Delivery_Time_Min) AS Avg_delivery_time
+        FROM rollup_city_cuisine
+        GROUP BY City
+        ORDER BY Avg_delivery_time DESC;
+        """, ["City"]),
+    "Distance vs delivery delay analysis": ("""
+        SELECT Distance_range,
+        CAST(SUM(order_count) AS SIGNED) AS total_orders,
+        SUM(sum_Delivery_Time_Min) * 1.0 / SUM(cnt_Delivery_Time_Min) AS Avg_delivery_time
+        FROM rollup_delivery
+        GROUP BY Distance_range
+        ORDER BY Avg_delivery_time;
+        """, ["Distance_range"]),
+    "Delivery rating vs delivery time": ("""
+        SELECT Delivery_Rating,
+        CAST(SUM(order_count) AS SIGNED) AS total_orders,
+        SUM(sum_Delivery_Time_Min) * 1.0 / SUM(cnt_Delivery_Time_Min) AS Avg_delivery_time
+        FROM rollup_delivery
+        GROUP BY Delivery_Rating
+        ORDER BY Delivery_Rating ASC;
+        """, ["Delivery_Rating"]),
+    "Top-rated restaurants": ("""
+        SELECT Restaurant_Name,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Restaurant_Rating) / 100.0 / SUM(cnt_Restaurant_Rating) AS Avg_rating
+        FROM rollup_restaurant
+        GROUP BY Restaurant_Name
+        ORDER BY Avg_rating DESC;
+        """, ["Restaurant_Name"]),
+    "Cancellation rate by restaurant": ("""
+        SELECT Restaurant_Name,
+        CAST(SUM(order_count) AS SIGNED) AS total_orders,
+        CAST(SUM(cancelled_count) AS SIGNED) AS cancelled_orders,
+        ROUND(SUM(cancelled_count) * 100.0 / SUM(order_count), 2) AS cancellation_percent
+        FROM rollup_restaurant
+        GROUP BY Restaurant_Name
+        ORDER BY cancellation_percent DESC;
+        """, ["Restaurant_Name"]),
+    "Cuisine-wise performance": ("""
+        SELECT Cuisine_Type,
+        CAST(SUM(order_count) AS SIGNED) AS Total_orders,
+        SUM(sum_Final_Amount) / 100.0 AS Total_revenue,
+        SUM(sum_Final_Amount) / 100.0 / SUM(cnt_Final_Amount) AS Avg_order_value,
+        SUM(sum_Profit_Margin) / 100.0 / SUM(cnt_Profit_Margin) AS Avg_profit,
+        SUM(sum_Profit_Margin_Percent) / 100.0 / SUM(cnt_Profit_Margin_Percent) AS Avg_profit_percent
+        FROM rollup_city_cuisine
+        GROUP BY Cuisine_Type
+        ORDER BY Avg_profit_percent DESC;
+        """, ["Cuisine_Type"]),
+    "Peak hour demand analysis": ("""
+        SELECT Peak_Hour,
+        CAST(SUM(order_count) AS SIGNED) AS total_orders,
+        SUM(sum_Final_Amount) / 100.0 AS total_revenue,
+        SUM(sum_Final_Amount) / 100.0 / SUM(cnt_Final_Amount) AS avg_order_value
+        FROM rollup_peak_payment
+        GROUP BY Peak_Hour
+        ORDER BY total_orders DESC;
+        """, ["Peak_Hour"]),
+    "Payment mode preferences": ("""
+        SELECT Payment_Mode,
+        CAST(SUM(order_count) AS SIGNED) AS total_orders,
+        ROUND(SUM(sum_Final_Amount) / 100.0, 2) AS Revenue_amount
+        FROM rollup_peak_payment
+        GROUP BY Payment_Mode
+        ORDER BY Revenue_amount DESC;
+        """, ["Payment_Mode"]),
+    "Cancellation reason analysis": ("""
+        SELECT City,
+        Cancellation_Reason,
+        CAST(SUM(order_count) AS SIGNED) AS count
+        FROM rollup_cancellation
+        WHERE Cancellation_Reason != 'No Cancellation'
+        GROUP BY Cancellation_Reason, City
+        ORDER BY count DESC;
+        """, ["City","Cancellation_Reason"]),
+    # From the customer profiles (profiles.py), kept at ingest with the
+    # rollups: the top of their spend index
+    "Top-spending customers": ("""
+        SELECT Customer_ID,
+        sum_Order_Value / 100.0 AS Total_spent
+        FROM profile_customer
+        ORDER BY sum_Order_Value DESC
+        LIMIT 10;
+        """, ["Customer_ID"]),
+}
+
+def topic_query(topic, rollups=True):
+    # SQL answering a topic: from the rollup tables when the backend keeps
+    # them and they cover the topic, from Food_Order_Details otherwise
+    if rollups and topic in Rollup_queries:
+        return Rollup_queries[topic][0]
+    return Topic_queries[topic]
+
+# --------------------------------------------------
+# VERIFICATION
+# --------------------------------------------------
+
+def verify_rollups(db_engine, topics=None, rtol=1e-9):
+    report = []
+    for topic in topics or Rollup_queries:
+        query, keys = Rollup_queries[topic]
+        with db_engine.connect() as conn:
+            raw = pd.read_sql(text(translate(Topic_queries[topic], conn.dialect.name)), conn)
+            rolled = pd.read_sql(text(translate(query, conn.dialect.name)), conn)
+        raw = raw.sort_values(keys, ignore_index=True)
+        rolled = rolled.sort_values(keys, ignore_index=True)
+        same_keys = len(raw) == len(rolled) and raw[keys].astype(str).equals(rolled[keys].astype(str))
+        max_diff = 0.0
+        matches = same_keys
+        if same_keys:
+            for column in raw.columns.difference(keys):
+                expected = raw[column].astype("float64").to_numpy()
+                actual = rolled[column].astype("float64").to_numpy()
+                matches &= bool(np.allclose(actual, expected, rtol=rtol, atol=1e-6, equal_nan=True))
+                if len(raw):
+                    max_diff = max(max_diff, float(np.nanmax(np.abs(actual - expected), initial=0.0)))
+        report.append({"topic": topic, "rows": len(raw), "matches": matches, "max_abs_diff": max_diff})
+    return pd.DataFrame(report)
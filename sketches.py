@@ -0,0 +1,371 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from bulk_load import scaled_integers
+
+# --------------------------------------------------
+# SKETCH SIZES AND ERROR BOUNDS
+# --------------------------------------------------
+
+# The leaderboards and distinct counts are kept as small summaries updated at
+# ingest time, so the "fast approximate" mode answers without grouping every
+# order. Their guarantees, with W the total weight added (the sum of
+# Order_Value in paise for the spenders, the number of orders for the
+# restaurants):
+#
+# * TopK (Misra-Gries / Space-Saving) of Top_capacity keys: every key's total
+#   lies in [lower, lower + decrement], and decrement <= W / (Top_capacity + 1).
+#   A key above that share of W is always monitored; with fewer distinct keys
+#   than Top_capacity the decrement stays 0 and the counts are exact.
+# * CountMin of Countmin_width x Countmin_depth counters: an estimate is never
+#   below the true total and exceeds it by more than e / width * W with
+#   probability at most exp(-depth) (here 0.017% of W, 0.7%).
+# * HyperLogLog with 2**Hll_precision registers: relative standard error
+#   1.04 / sqrt(2**Hll_precision) (0.81%), about 16 KB per city or month.
+Top_capacity = 2048
+Countmin_width = 2**14
+Countmin_depth = 5
+Hll_precision = 14
+
+# Order_Value sums in paise, exact integers like the rollups' measures
+Spend_scale = 100
+
+# --------------------------------------------------
+# HASHING
+# --------------------------------------------------
+
+def key_values(keys):
+    return np.asarray(pd.Series(keys).astype(str), dtype=object)
+
+def hashed(keys, seed):
+    # 64-bit hash of each key, stable across processes; seed names one of
+    # several independent hash functions
+    return pd.util.hash_array(key_values(keys), hash_key=f"{seed:<16}"[:16])
+
+def leading_zeros(values):
+    # Leading zero bits of each uint64, by halving (64 for a zero)
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = values < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[empty] += shift
+        values[empty] <<= np.uint64(shift)
+    zeros[values == 0] += 1
+    return zeros
+
+# --------------------------------------------------
+# SKETCHES
+# --------------------------------------------------
+
+class TopK:
+    # Heavy hitters by weight: Misra-Gries counters (lower bounds) merged a
+    # chunk at a time, plus the total decrement, which bounds both what a
+    # counter may miss and the total of any key not monitored (the
+    # Space-Saving count is lower + decrement)
+
+    def __init__(self, capacity=Top_capacity, keys=(), counts=(), decrement=0):
+        self.capacity = capacity
+        self.counts = pd.Series(np.asarray(counts, dtype=np.int64), index=pd.Index(list(keys), dtype=object))
+        self.decrement = int(decrement)
+
+    def add(self, keys, weights):
+        # The chunk's exact totals are added to the counters; past capacity,
+        # the (capacity + 1)-th largest counter is taken off every counter
+        # and the ones left at zero are dropped
+        chunk = pd.Series(np.asarray(weights, dtype=np.int64)).groupby(key_values(keys)).sum()
+        counts = self.counts.add(chunk, fill_value=0).astype(np.int64)
+        if len(counts) > self.capacity:
+            cut = np.partition(counts.to_numpy(), len(counts) - self.capacity - 1)[len(counts) - self.capacity - 1]
+            counts = counts[counts > cut] - cut
+            self.decrement += int(cut)
+        self.counts = counts
+
+    def remove(self, keys, weights):
+        # Weights of replaced orders leave the counters that hold them; the
+        # totals of keys not monitored only go down, so the bounds still hold
+        chunk = pd.Series(np.asarray(weights, dtype=np.int64)).groupby(key_values(keys)).sum()
+        chunk = chunk[chunk.index.isin(self.counts.index)]
+        counts = self.counts.sub(chunk, fill_value=0).clip(lower=0).astype(np.int64)
+        self.counts = counts[counts > 0]
+
+    def top(self, k=None):
+        # (key, lower, upper), heaviest first
+        top = pd.DataFrame({"key": self.counts.index, "lower": self.counts.to_numpy()})
+        top["upper"] = top["lower"] + self.decrement
+        top = top.sort_values(["upper", "key"], ascending=[False, True], ignore_index=True)
+        return top if k is None else top.head(k)
+
+    def arrays(self):
+        return {"capacity": np.array(self.capacity), "decrement": np.array(self.decrement),
+                "keys": np.array(self.counts.index, dtype=str), "counts": self.counts.to_numpy()}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(int(arrays["capacity"]), arrays["keys"].tolist(), arrays["counts"], int(arrays["decrement"]))
+
+class CountMin:
+    # Counter per (hash function, bucket); a key's total is its smallest
+    # counter. Weights may be negative (replaced orders) as long as no true
+    # total does.
+
+    def __init__(self, width=Countmin_width, depth=Countmin_depth, table=None):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64) if table is None else table
+
+    def buckets(self, keys):
+        # Row i hashes to h1 + i * h2 (Kirsch-Mitzenmacher), from one 64-bit
+        # hash per key
+        hashes = hashed(keys, "countmin")
+        first, second = hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+        return [((first + np.uint64(row) * second) % np.uint64(self.width)).astype(np.intp)
+                for row in range(self.depth)]
+
+    def add(self, keys, weights):
+        # Weighted bincounts are float64: exact for totals below 2**53
+        weights = np.asarray(weights, dtype=np.float64)
+        for row, buckets in enumerate(self.buckets(keys)):
+            self.table[row] += np.rint(np.bincount(buckets, weights, self.width)).astype(np.int64)
+
+    def estimate(self, keys):
+        return np.min([self.table[row, buckets] for row, buckets in enumerate(self.buckets(keys))], axis=0)
+
+    def total(self):
+        return int(self.table[0].sum())
+
+    def error_bound(self):
+        # (additive error, probability of exceeding it)
+        return math.e / self.width * self.total(), math.exp(-self.depth)
+
+    def arrays(self):
+        return {"table": self.table}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        table = arrays["table"]
+        return cls(table.shape[1], table.shape[0], table.copy())
+
+class HyperLogLog:
+    # Distinct count from the longest run of leading zeros per register;
+    # registers merge by maximum. Keys cannot be taken out again.
+
+    def __init__(self, precision=Hll_precision, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, keys):
+        self.add_hashes(hashed(keys, "hyperloglog"))
+
+    def add_hashes(self, hashes):
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        ranks = np.minimum(leading_zeros(hashes << np.uint64(self.precision)), 64 - self.precision) + 1
+        np.maximum.at(self.registers, buckets, ranks.astype(np.uint8))
+
+    def merge(self, other):
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        registers = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / registers)
+        raw = alpha * registers**2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * registers and empty:
+            # Linear counting while many registers are still empty
+            return registers * math.log(registers / empty)
+        return float(raw)
+
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def arrays(self):
+        return {"registers": self.registers}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        registers = arrays["registers"].copy()
+        return cls(int(np.log2(len(registers))), registers)
+
+Sketch_kinds = {"TopK": TopK, "CountMin": CountMin, "HyperLogLog": HyperLogLog}
+
+# --------------------------------------------------
+# SKETCHES OF THE ORDERS
+# --------------------------------------------------
+
+# Sketch names: top_spenders / customer_spend (Customer_ID by Order_Value),
+# top_cancellations / restaurant_cancelled / restaurant_orders
+# (Restaurant_Name by order), customers_city:<City> and
+# customers_month:<YYYYMM> (distinct Customer_ID)
+Sketch_columns = ["Customer_ID","City","Restaurant_Name","Order_Date","Order_Status","Order_Value"]
+
+class Sketches:
+
+    def __init__(self, members=None):
+        self.members = {} if members is None else members
+
+    def get(self, name, kind):
+        if name not in self.members:
+            self.members[name] = kind()
+        return self.members[name]
+
+    def orders(self):
+        # Orders summarized, to tell whether the sketches cover the table
+        return self.get("restaurant_orders", CountMin).total()
+
+    def add(self, food_df):
+        if food_df.empty:
+            return
+        spend = order_spend(food_df)
+        cancelled = (food_df["Order_Status"] == "Cancelled").to_numpy()
+        restaurants = food_df["Restaurant_Name"]
+        self.get("top_spenders", TopK).add(food_df["Customer_ID"], spend)
+        self.get("customer_spend", CountMin).add(food_df["Customer_ID"], spend)
+        self.get("top_cancellations", TopK).add(restaurants[cancelled], np.ones(cancelled.sum(), dtype=np.int64))
+        self.get("restaurant_cancelled", CountMin).add(restaurants, cancelled)
+        self.get("restaurant_orders", CountMin).add(restaurants, np.ones(len(food_df), dtype=np.int64))
+        # Each customer hashed once for all the distinct counts
+        customers = pd.Series(hashed(food_df["Customer_ID"], "hyperloglog"), index=food_df.index)
+        for prefix, groups in [("customers_city", food_df["City"]),
+                               ("customers_month", order_months(food_df["Order_Date"]))]:
+            for group, hashes in customers.groupby(groups, observed=True):
+                self.get(f"{prefix}:{group}", HyperLogLog).add_hashes(hashes.to_numpy())
+
+    def remove(self, food_df):
+        # Replaced orders (incremental ingest). The distinct counts keep
+        # them: a customer whose every order was replaced still counts.
+        if food_df.empty:
+            return
+        spend = order_spend(food_df)
+        cancelled = (food_df["Order_Status"] == "Cancelled").to_numpy()
+        restaurants = food_df["Restaurant_Name"]
+        self.get("top_spenders", TopK).remove(food_df["Customer_ID"], spend)
+        self.get("customer_spend", CountMin).add(food_df["Customer_ID"], -spend)
+        self.get("top_cancellations", TopK).remove(restaurants[cancelled], np.ones(cancelled.sum(), dtype=np.int64))
+        self.get("restaurant_cancelled", CountMin).add(restaurants, -cancelled.astype(np.int64))
+        self.get("restaurant_orders", CountMin).add(restaurants, -np.ones(len(food_df), dtype=np.int64))
+
+def order_spend(food_df):
+    # NULL order values add nothing, as in SUM()
+    return np.nan_to_num(scaled_integers(food_df["Order_Value"], Spend_scale)).astype(np.int64)
+
+def order_months(dates):
+    # YYYYMM, missing for a missing date
+    dates = pd.to_datetime(dates)
+    return (dates.dt.year * 100 + dates.dt.month).astype("Int64")
+
+# --------------------------------------------------
+# STORAGE
+# --------------------------------------------------
+
+# One row per sketch in the sketches table (migration 6), its arrays in
+# numpy's .npz format
+
+def sketch_bytes(sketch):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **sketch.arrays())
+    return buffer.getvalue()
+
+def sketch_from_bytes(kind, state):
+    with np.load(io.BytesIO(state), allow_pickle=False) as arrays:
+        return Sketch_kinds[kind].from_arrays(dict(arrays))
+
+def read_sketches(conn):
+    # Databases created without the migrations have no sketches
+    if not inspect(conn).has_table("sketches"):
+        return Sketches()
+    rows = conn.execute(text("SELECT name, kind, state FROM sketches")).fetchall()
+    return Sketches({name: sketch_from_bytes(kind, bytes(state)) for name, kind, state in rows})
+
+def write_sketches(conn, sketches):
+    if not inspect(conn).has_table("sketches"):
+        return
+    conn.execute(text("DELETE FROM sketches"))
+    rows = [{"name": name, "kind": type(sketch).__name__, "state": sketch_bytes(sketch)}
+            for name, sketch in sketches.members.items()]
+    if rows:
+        conn.execute(text("INSERT INTO sketches (name, kind, state) VALUES (:name, :kind, :state)"), rows)
+
+def load_sketches(db_engine):
+    with db_engine.connect() as conn:
+        return read_sketches(conn)
+
+def rebuild_sketches(db_engine, chunksize=100_000):
+    # Full recomputation from Food_Order_Details, e.g. for data loaded before
+    # the sketches existed
+    sketches = Sketches()
+    query = f"SELECT {', '.join(Sketch_columns)} FROM Food_Order_Details"
+    with db_engine.connect() as conn:
+        for chunk in pd.read_sql(text(query), conn, chunksize=chunksize):
+            sketches.add(chunk)
+    with db_engine.begin() as conn:
+        write_sketches(conn, sketches)
+    return sketches
+
+def ensure_sketches(db_engine):
+    with db_engine.connect() as conn:
+        orders = conn.execute(text("SELECT COUNT(*) FROM Food_Order_Details")).scalar()
+        summarized = read_sketches(conn).orders()
+    if orders != summarized:
+        rebuild_sketches(db_engine)
+
+# --------------------------------------------------
+# FAST APPROXIMATE ANSWERS
+# --------------------------------------------------
+
+def top_spenders(sketches, k=10):
+    # Customer_ID, Total_spent like the exact topic: the Space-Saving count,
+    # tightened by the Count-Min estimate (both never below the truth), with
+    # the guaranteed lower bound and the largest possible overestimate
+    top = sketches.get("top_spenders", TopK).top()
+    upper = np.minimum(top["upper"].to_numpy(), sketches.get("customer_spend", CountMin).estimate(top["key"]))
+    frame = pd.DataFrame({"Customer_ID": top["key"],
+                          "Total_spent": upper / Spend_scale,
+                          "Spent_at_least": top["lower"].to_numpy() / Spend_scale,
+                          "Max_error": (upper - top["lower"].to_numpy()) / Spend_scale})
+    return frame.sort_values(["Total_spent", "Customer_ID"], ascending=[False, True], ignore_index=True).head(k)
+
+def restaurant_cancellations(sketches, k=10):
+    # The restaurants with the most cancellations, ranked by them (what the
+    # heavy-hitter counters find; the highest rates need every restaurant):
+    # cancelled orders from the top-k counters and the Count-Min estimate,
+    # total orders from the Count-Min estimate, both never below the truth,
+    # so the rate is only approximate, with the guaranteed lower bound of the
+    # cancellations. A restaurant can only be missing if it has at most
+    # top_cancellations' decrement cancellations.
+    top = sketches.get("top_cancellations", TopK).top()
+    cancelled = np.minimum(top["upper"].to_numpy(), sketches.get("restaurant_cancelled", CountMin).estimate(top["key"]))
+    orders = np.maximum(sketches.get("restaurant_orders", CountMin).estimate(top["key"]), cancelled)
+    frame = pd.DataFrame({"Restaurant_Name": top["key"],
+                          "total_orders": orders,
+                          "cancelled_orders": cancelled,
+                          "Cancelled_at_least": top["lower"].to_numpy(),
+                          "cancellation_percent": np.round(cancelled * 100.0 / np.maximum(orders, 1), 2)})
+    return frame.sort_values(["cancelled_orders", "Restaurant_Name"], ascending=[False, True],
+                             ignore_index=True).head(k)
+
+Approximate_topics = {"Top-spending customers": top_spenders,
+                      "Cancellation rate by restaurant": restaurant_cancellations}
+
+def approximate_topic(sketches, topic, k=10):
+    return Approximate_topics[topic](sketches, k)
+
+def distinct_customers(sketches, by="City"):
+    # Estimated distinct Customer_ID per city or month (YYYYMM), with one
+    # standard error; the "All" row merges the registers
+    prefix = {"City": "customers_city:", "Month": "customers_month:"}[by]
+    sketches_by = {name[len(prefix):]: sketch for name, sketch in sorted(sketches.members.items())
+                   if name.startswith(prefix)}
+    rows = [(group if by == "City" else int(group), sketch) for group, sketch in sketches_by.items()]
+    if sketches_by:
+        merged = HyperLogLog()
+        for sketch in sketches_by.values():
+            merged = merged.merge(sketch)
+        rows.append(("All", merged))
+    estimates = [sketch.estimate() for _, sketch in rows]
+    return pd.DataFrame({by: [group for group, _ in rows],
+                         "Distinct_customers": np.rint(estimates).astype(np.int64),
+                         "Std_error": [round(estimate * sketch.standard_error()) for estimate, (_, sketch)
+                                       in zip(estimates, rows)]})
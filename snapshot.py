@@ -0,0 +1,243 @@
+import glob
+import hashlib
+import importlib
+import inspect
+import os
+import re
+import shutil
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bulk_load import Decimal_places, round_half_up
+from dtypes import compact
+from ingest import Chunk_size, load_chunks
+from parallel import parallel_cleaned_chunks
+
+# Snapshots of the cleaned dataset, one Arrow IPC file per source CSV and
+# cleaning version
+Snapshot_dir = os.environ.get("OFD_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+
+# Bump when the file layout changes; old snapshots are then rebuilt
+Snapshot_format = 1
+
+# Code that decides the cleaned output: a whole module (None), or the entry
+# points of a module that also holds code the snapshot does not depend on.
+# The functions and constants those reach in the same modules are found by
+# walking their code (cleaning_names), so editing other code there (say a
+# sketch or profile hook in ingest.py) leaves the snapshots valid.
+Cleaning_sources = {
+    "cleaning": None,
+    "ingest": ["collect_statistics", "cleaned_chunks"],
+    "parallel": ["parallel_cleaning", "parallel_cleaned_chunks"],
+}
+
+# --------------------------------------------------
+# SNAPSHOT KEY
+# --------------------------------------------------
+
+# Digests are kept per (path, mtime, size), so a file is hashed again only
+# once it changed
+File_digests = {}
+Cleaning_digests = {}
+
+def file_state(path):
+    status = os.stat(path)
+    return os.path.abspath(path), status.st_mtime_ns, status.st_size
+
+def file_digest(path):
+    state = file_state(path)
+    if state not in File_digests:
+        with open(path, "rb") as file:
+            File_digests[state] = hashlib.file_digest(file, "sha256").hexdigest()
+    return File_digests[state]
+
+def source_text(value):
+    # Functions by their source, constants by their value
+    return inspect.getsource(value) if callable(value) else repr(value)
+
+def global_names(code):
+    # Names a function's code (nested functions and comprehensions included)
+    # looks up; attribute names come along, which only adds to the digest
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if inspect.iscode(constant):
+            names |= global_names(constant)
+    return names
+
+def cleaning_names():
+    # Every entry point, and every function or constant of the modules named
+    # with entry points that they reach, in a stable order. A name
+    # Cleaning_sources lists but its module lacks is an error, not a
+    # silently smaller digest.
+    queue = []
+    for module_name, entry_points in Cleaning_sources.items():
+        module = importlib.import_module(module_name)
+        missing = [name for name in entry_points or [] if not hasattr(module, name)]
+        if missing:
+            raise AttributeError(f"snapshot.Cleaning_sources names {', '.join(missing)}, which {module_name}.py "
+                                 "does not define")
+        queue.extend((module, name) for name in entry_points or [])
+    found = {}
+    while queue:
+        owner, name = queue.pop()
+        value = vars(owner).get(name)
+        if value is None or inspect.ismodule(value):
+            continue
+        source = getattr(value, "__module__", owner.__name__) if callable(value) else owner.__name__
+        # Whole modules are hashed as they are
+        if Cleaning_sources.get(source) is None or (source, name) in found:
+            continue
+        found[(source, name)] = value
+        if inspect.isfunction(value):
+            queue.extend((sys.modules[source], global_name) for global_name in global_names(value.__code__))
+    return sorted(found.items(), key=lambda item: item[0])
+
+def cleaning_digest():
+    # Per process, until one of the tracked modules' files changes
+    modules = [importlib.import_module(module_name) for module_name in Cleaning_sources]
+    state = tuple(file_state(module.__file__) for module in modules)
+    if state not in Cleaning_digests:
+        digest = hashlib.sha256(f"format {Snapshot_format}".encode())
+        for module, entry_points in zip(modules, Cleaning_sources.values()):
+            if entry_points is None:
+                digest.update(inspect.getsource(module).encode())
+        for (source, name), value in cleaning_names():
+            digest.update(f"{source}.{name}\n{source_text(value)}".encode())
+        Cleaning_digests[state] = digest.hexdigest()
+    return Cleaning_digests[state]
+
+def snapshot_key(csv_path):
+    # Changes with the CSV content and with the cleaning code, never with the
+    # file's path or modification time
+    combined = hashlib.sha256(f"{file_digest(csv_path)}:{cleaning_digest()}".encode())
+    return combined.hexdigest()[:16]
+
+def snapshot_path(csv_path, snapshot_dir=Snapshot_dir):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}-{snapshot_key(csv_path)}.arrow")
+
+# --------------------------------------------------
+# WRITE
+# --------------------------------------------------
+
+def chunk_table(food_df, schema=None):
+    table = pa.Table.from_pandas(food_df, schema=schema, preserve_index=False)
+    if schema is None:
+        # A text column that is entirely missing in the first chunk would be
+        # typed null; later chunks need it as string
+        schema = pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                            for field in table.schema])
+        table = table.cast(schema)
+    return table
+
+def write_snapshot(chunks, path):
+    # Record batches are written as the chunks are cleaned, so building a
+    # snapshot needs no more memory than streaming ingest. The file only
+    # appears under its final name once it is complete.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    schema = None
+    rows = 0
+    try:
+        with pa.OSFile(partial, "wb") as sink:
+            writer = None
+            for food_df in chunks:
+                table = chunk_table(food_df, schema)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(sink, schema)
+                writer.write_table(table)
+                rows += len(table)
+            if writer is None:
+                raise ValueError("no cleaned rows to snapshot")
+            writer.close()
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return rows
+
+# What is kept per snapshot: the Arrow file, its Parquet copy and the
+# partitions directory (partitions.py)
+Snapshot_suffixes = [".arrow", ".parquet", ".partitions"]
+
+def prune_snapshots(path):
+    # Older snapshots (and their Parquet copies and partitions) of the same
+    # CSV are superseded by this one. Names are matched whole, so a CSV whose
+    # name has dots, or is the prefix of another CSV's name, keeps its own.
+    stem, key = os.path.splitext(os.path.basename(path))[0].rsplit("-", 1)
+    suffixes = "|".join(map(re.escape, Snapshot_suffixes))
+    snapshot_name = re.compile(rf"{re.escape(stem)}-(?P<key>[0-9a-f]{{{len(key)}}})(?:{suffixes})")
+    for old in glob.glob(os.path.join(glob.escape(os.path.dirname(path)), f"{glob.escape(stem)}-*")):
+        match = snapshot_name.fullmatch(os.path.basename(old))
+        if match and match["key"] != key:
+            if os.path.isdir(old):
+                shutil.rmtree(old)
+            else:
+                os.remove(old)
+
+def ensure_snapshot(csv_path, snapshot_dir=Snapshot_dir, chunksize=Chunk_size):
+    path = snapshot_path(csv_path, snapshot_dir)
+    if not os.path.exists(path):
+        # Cleaned on OFD_CLEAN_WORKERS processes; the output is the same
+        write_snapshot(parallel_cleaned_chunks(csv_path, chunksize), path)
+        prune_snapshots(path)
+    return path
+
+def stored_values(table):
+    # DECIMAL columns rounded as the database stores them (bulk_load), so an
+    # engine querying the file sees the same values as MySQL
+    for column in Decimal_places:
+        index = table.schema.get_field_index(column)
+        rounded = round_half_up(table[column].to_numpy(), Decimal_places[column])
+        table = table.set_column(index, column, pa.array(rounded, from_pandas=True))
+    return table
+
+def ensure_parquet(csv_path, snapshot_dir=Snapshot_dir):
+    # Parquet copy of the snapshot for engines that scan Parquet files
+    # (DuckDB), written once per snapshot
+    path = ensure_snapshot(csv_path, snapshot_dir)
+    parquet_path = f"{os.path.splitext(path)[0]}.parquet"
+    if not os.path.exists(parquet_path):
+        partial = f"{parquet_path}.partial"
+        try:
+            pq.write_table(stored_values(open_snapshot(path)), partial)
+            os.replace(partial, parquet_path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+    return parquet_path
+
+# --------------------------------------------------
+# READ
+# --------------------------------------------------
+
+def open_snapshot(path, columns=None):
+    # The file is memory-mapped and the uncompressed IPC format is read
+    # zero-copy, so only the pages of the selected columns are touched
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.select(columns) if columns is not None else table
+
+def read_snapshot(path, columns=None):
+    return open_snapshot(path, columns).to_pandas()
+
+def snapshot_chunks(path, columns=None):
+    # One frame per record batch, i.e. per cleaned chunk
+    reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+        if columns is not None:
+            batch = batch.select(columns)
+        yield batch.to_pandas()
+
+def cleaned_orders(csv_path, columns=None, snapshot_dir=Snapshot_dir):
+    # Cleaned dataset for analysis code; cleaning runs only when the CSV or
+    # the cleaning code changed since the last snapshot. Columns come in the
+    # compact types of dtypes.py.
+    return compact(read_snapshot(ensure_snapshot(csv_path, snapshot_dir), columns))
+
+def ingest_snapshot(csv_path, db_engine, table="Food_Order_Details", snapshot_dir=Snapshot_dir, rollups=True):
+    # Same rows as ingest.stream_ingest, loaded from the snapshot
+    return load_chunks(snapshot_chunks(ensure_snapshot(csv_path, snapshot_dir)), db_engine, table, rollups)
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+# Seeded synthetic orders shaped like the raw Food_Order_Details CSV, to run
+# the pipeline and the app at any volume. The same (rows, seed, skews) always
+# give the same orders, block by block, so a 100x file can be streamed to
+# disk and any block regenerated on its own.
+
+# --------------------------------------------------
+# UNIFORM ORDERS (THE BENCHMARKS' REFERENCE DATA)
+# --------------------------------------------------
+
+def make_raw_orders(rows, seed=7):
+    rng = np.random.default_rng(seed)
+
+    def with_nulls(values, rate):
+        values = pd.Series(values, dtype=object if values.dtype.kind in "OU" else "float64")
+        values[rng.random(rows) < rate] = np.nan
+        return values
+
+    dates = pd.Timestamp("2012-01-01") + pd.to_timedelta(rng.integers(0, 3985, rows), unit="D")
+    order_value = np.round(rng.uniform(100, 2000, rows), 2)
+    discount = np.round(rng.choice([0, 0, 0, 5, 10, 15, 20, 25, 50, 150], rows) * rng.uniform(0.5, 1.5, rows), 2)
+    status = rng.choice(["Delivered","Cancelled"], rows, p=[0.85, 0.15])
+    reasons = np.where(status == "Cancelled",
+                       rng.choice(["Late Delivery","Customer Cancelled","Restaurant Closed"], rows),
+                       None)
+    peak = rng.choice(np.array([True, False], dtype=object), rows)
+
+    return pd.DataFrame({
+        "Order_Id": np.char.add("ORD", np.arange(rows).astype(str)),
+        "Customer_ID": np.char.add("CUST", rng.integers(1000, 9999, rows).astype(str)),
+        "Customer_Age": with_nulls(rng.integers(16, 60, rows), 0.05),
+        "Customer_Gender": with_nulls(rng.choice(["Male","Female","Other"], rows), 0.03),
+        "City": with_nulls(rng.choice(["Hyderabad","Chennai","Bangalore","Mumbai","Delhi","Pune"], rows), 0.03),
+        "Area": with_nulls(rng.choice(["North","South","East","West","Central"], rows), 0.03),
+        "Restaurant_ID": np.char.add("R", rng.integers(1, 500, rows).astype(str)),
+        "Restaurant_Name": np.char.add("Restaurant_", rng.integers(1, 500, rows).astype(str)),
+        "Cuisine_Type": with_nulls(rng.choice(["Indian","Chinese","Italian","Mexican","Continental"], rows), 0.03),
+        "Order_Date": with_nulls(dates.strftime("%Y-%m-%d").to_numpy(), 0.01),
+        "Order_Time": with_nulls(np.char.add(np.char.add(rng.integers(0, 24, rows).astype(str), ":"),
+                                             np.char.zfill(rng.integers(0, 60, rows).astype(str), 2)), 0.02),
+        "Delivery_Time_Min": with_nulls(rng.integers(10, 180, rows), 0.05),
+        "Distance_km": with_nulls(np.round(rng.uniform(0.5, 40, rows), 2), 0.05),
+        "Order_Value": with_nulls(order_value, 0.04),
+        "Discount_Applied": with_nulls(discount, 0.04),
+        "Final_Amount": order_value - discount,
+        "Payment_Mode": with_nulls(rng.choice(["Card","UPI","Cash","Wallet"], rows), 0.03),
+        "Order_Status": status,
+        "Cancellation_Reason": with_nulls(reasons.astype(object), 0.2),
+        "Delivery_Partner_ID": np.char.add("DP", rng.integers(1, 2000, rows).astype(str)),
+        "Delivery_Rating": with_nulls(rng.integers(1, 6, rows), 0.05),
+        "Restaurant_Rating": np.round(rng.uniform(1, 5, rows), 1),
+        "Order_Day": np.where(dates.dayofweek >= 5, "Weekend", "Weekday"),
+        "Peak_Hour": with_nulls(peak, 0.03),
+        "Profit_Margin": np.round(rng.uniform(0.05, 0.35, rows), 2),
+    })
+
+# --------------------------------------------------
+# REALISTIC ORDERS
+# --------------------------------------------------
+
+# Orders generated per block; block i draws from its own seed
+Block_rows = 100_000
+
+# Share of orders per value
+Cities = {"Bangalore": 0.24, "Mumbai": 0.20, "Delhi": 0.18, "Hyderabad": 0.16, "Chennai": 0.12, "Pune": 0.10}
+Areas = {"Central": 0.28, "South": 0.20, "North": 0.20, "East": 0.16, "West": 0.16}
+Cuisines = {"Indian": 0.34, "Chinese": 0.22, "Italian": 0.18, "Continental": 0.14, "Mexican": 0.12}
+Payment_modes = {"UPI": 0.38, "Card": 0.32, "Wallet": 0.18, "Cash": 0.12}
+Genders = {"Male": 0.52, "Female": 0.45, "Other": 0.03}
+Cancellation_reasons = {"Late Delivery": 0.40, "Customer Cancelled": 0.35, "Restaurant Closed": 0.25}
+
+# Missing values per column, as in the raw CSV (Cancellation_Reason of
+# cancelled orders only)
+Null_rates = {"Customer_Age": 0.05, "Customer_Gender": 0.03, "City": 0.03, "Area": 0.03, "Cuisine_Type": 0.03,
+              "Order_Date": 0.01, "Order_Time": 0.02, "Delivery_Time_Min": 0.05, "Distance_km": 0.05,
+              "Order_Value": 0.04, "Discount_Applied": 0.04, "Payment_Mode": 0.03, "Cancellation_Reason": 0.2,
+              "Delivery_Rating": 0.05, "Peak_Hour": 0.03}
+
+# Orders per customer, restaurant and delivery partner; the populations grow
+# with the volume, never below the real file's
+Orders_per_customer = 11
+Orders_per_restaurant = 200
+Orders_per_partner = 50
+Min_customers, Min_restaurants, Min_partners = 9000, 500, 2000
+
+# Zipf exponents of how orders spread over customers and restaurants: 0 is
+# uniform; at 0.5 the busiest of 9,000 customers places ~0.5% of the orders,
+# at 0.6 the busiest of 500 restaurants gets ~3%
+Customer_skew = 0.5
+Restaurant_skew = 0.6
+
+First_date = pd.Timestamp("2012-01-01")
+Days = 3985
+
+# Order hours: lunch and dinner peaks, which are the peak hours
+Hour_weights = np.array([1, 1, 1, 1, 1, 1, 2, 3, 4, 4, 5, 6, 10, 10, 8, 5, 4, 5, 7, 10, 10, 9, 5, 2], dtype=np.float64)
+Peak_hours = [12, 13, 14, 19, 20, 21]
+
+def zipf_weights(size, skew):
+    weights = np.arange(1, size + 1, dtype=np.float64) ** -skew
+    return weights / weights.sum()
+
+def weighted(rng, shares, size):
+    return rng.choice(np.array(list(shares), dtype=object), size, p=np.array(list(shares.values())))
+
+class OrderGenerator:
+    # Orders with per-customer age and gender, restaurants with their own city,
+    # cuisine, rating and cancellation propensity, Zipf-skewed customers and
+    # restaurants, delivery times growing with distance and ratings falling
+    # with delivery time
+
+    def __init__(self, rows, seed=7, customer_skew=Customer_skew, restaurant_skew=Restaurant_skew):
+        self.rows = rows
+        self.seed = seed
+        rng = np.random.default_rng([seed, 0])
+
+        self.customers = max(Min_customers, rows // Orders_per_customer)
+        self.customer_weights = zipf_weights(self.customers, customer_skew)
+        # Ranks shuffled, so the busiest customer is not CUST1000
+        self.customer_ids = rng.permutation(self.customers) + 1000
+        self.customer_ages = rng.integers(16, 60, self.customers)
+        self.customer_genders = weighted(rng, Genders, self.customers)
+
+        self.restaurants = max(Min_restaurants, rows // Orders_per_restaurant)
+        self.restaurant_weights = zipf_weights(self.restaurants, restaurant_skew)
+        self.restaurant_ids = rng.permutation(self.restaurants) + 1
+        self.restaurant_cities = weighted(rng, Cities, self.restaurants)
+        self.restaurant_cuisines = weighted(rng, Cuisines, self.restaurants)
+        self.restaurant_ratings = rng.uniform(2.5, 4.8, self.restaurants)
+        self.restaurant_cancel_rates = rng.beta(2, 11, self.restaurants)
+
+        self.partners = max(Min_partners, rows // Orders_per_partner)
+
+    @property
+    def blocks(self):
+        return -(-self.rows // Block_rows)
+
+    def block(self, index):
+        start = index * Block_rows
+        rows = min(Block_rows, self.rows - start)
+        rng = np.random.default_rng([self.seed, 1, index])
+
+        def with_nulls(column, values):
+            values = pd.Series(values, dtype=object if values.dtype.kind in "OU" else "float64")
+            values[rng.random(rows) < Null_rates[column]] = np.nan
+            return values
+
+        customer = rng.choice(self.customers, rows, p=self.customer_weights)
+        restaurant = rng.choice(self.restaurants, rows, p=self.restaurant_weights)
+        restaurant_ids = self.restaurant_ids[restaurant].astype(str)
+        dates = First_date + pd.to_timedelta(rng.integers(0, Days, rows), unit="D")
+        hours = rng.choice(24, rows, p=Hour_weights / Hour_weights.sum())
+
+        distance = np.round(rng.gamma(2.2, 4.5, rows).clip(0.5, 40), 2)
+        delivery_time = np.rint(12 + distance * 2.4 + rng.gamma(2, 12, rows)).clip(10, 180)
+        rating = np.rint(5.6 - delivery_time / 45 + rng.normal(0, 0.9, rows)).clip(1, 5)
+        order_value = np.round(rng.lognormal(6.6, 0.55, rows).clip(100, 2000), 2)
+        discount = np.round(rng.choice([0, 0, 0, 5, 10, 15, 20, 25, 50, 150], rows) * rng.uniform(0.5, 1.5, rows), 2)
+        # Before with_nulls blanks values of the arrays it is given
+        final_amount = order_value - discount
+        cancelled = rng.random(rows) < self.restaurant_cancel_rates[restaurant]
+        reasons = np.where(cancelled, weighted(rng, Cancellation_reasons, rows), None)
+
+        return pd.DataFrame({
+            "Order_Id": np.char.add("ORD", np.arange(start, start + rows).astype(str)),
+            "Customer_ID": np.char.add("CUST", self.customer_ids[customer].astype(str)),
+            "Customer_Age": with_nulls("Customer_Age", self.customer_ages[customer]),
+            "Customer_Gender": with_nulls("Customer_Gender", self.customer_genders[customer]),
+            "City": with_nulls("City", self.restaurant_cities[restaurant]),
+            "Area": with_nulls("Area", weighted(rng, Areas, rows)),
+            "Restaurant_ID": np.char.add("R", restaurant_ids),
+            "Restaurant_Name": np.char.add("Restaurant_", restaurant_ids),
+            "Cuisine_Type": with_nulls("Cuisine_Type", self.restaurant_cuisines[restaurant]),
+            "Order_Date": with_nulls("Order_Date", dates.strftime("%Y-%m-%d").to_numpy()),
+            "Order_Time": with_nulls("Order_Time", np.char.add(np.char.add(hours.astype(str), ":"),
+                                                               np.char.zfill(rng.integers(0, 60, rows).astype(str), 2))),
+            "Delivery_Time_Min": with_nulls("Delivery_Time_Min", delivery_time),
+            "Distance_km": with_nulls("Distance_km", distance),
+            "Order_Value": with_nulls("Order_Value", order_value),
+            "Discount_Applied": with_nulls("Discount_Applied", discount),
+            "Final_Amount": final_amount,
+            "Payment_Mode": with_nulls("Payment_Mode", weighted(rng, Payment_modes, rows)),
+            "Order_Status": np.where(cancelled, "Cancelled", "Delivered"),
+            "Cancellation_Reason": with_nulls("Cancellation_Reason", reasons.astype(object)),
+            "Delivery_Partner_ID": np.char.add("DP", rng.integers(1, self.partners + 1, rows).astype(str)),
+            "Delivery_Rating": with_nulls("Delivery_Rating", rating),
+            "Restaurant_Rating": np.round((self.restaurant_ratings[restaurant] + rng.normal(0, 0.4, rows)).clip(1, 5), 1),
+            "Order_Day": np.where(dates.dayofweek >= 5, "Weekend", "Weekday"),
+            "Peak_Hour": with_nulls("Peak_Hour", np.isin(hours, Peak_hours).astype(object)),
+            "Profit_Margin": np.round(rng.uniform(0.05, 0.35, rows), 2),
+        })
+
+    def frame(self):
+        return pd.concat([self.block(index) for index in range(self.blocks)], ignore_index=True)
+
+    def write_csv(self, path):
+        # Block by block, so memory stays at one block whatever the volume
+        for index in range(self.blocks):
+            self.block(index).to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        return path
+
+def make_orders(rows, seed=7, customer_skew=Customer_skew, restaurant_skew=Restaurant_skew):
+    return OrderGenerator(rows, seed, customer_skew, restaurant_skew).frame()
+
+def write_orders(path, rows, seed=7, customer_skew=Customer_skew, restaurant_skew=Restaurant_skew):
+    return OrderGenerator(rows, seed, customer_skew, restaurant_skew).write_csv(path)
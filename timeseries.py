@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from dtypes import compact
+
+# --------------------------------------------------
+# SERIES DEFINITION
+# --------------------------------------------------
+
+# Daily order measures over every day from the first order to the last, days
+# without orders included, per value of each breakdown and in total. Each
+# measure is a contiguous int64 array of (breakdown values, days) in units
+# of 1/scale, so rolling windows, resampling and year-over-year comparisons
+# are array arithmetic with exact sums, and the rates and averages are
+# derived from the summed measures afterwards (a 28-day average delivery
+# time is the window's minutes over its deliveries, not a mean of means).
+# The series is built once per data version (Main.py caches it) from one
+# GROUP BY per breakdown, each at most days x values rows.
+Breakdowns = ["City", "Cuisine_Type", "Payment_Mode"]
+
+# measure -> scale; the profit of an order is Final_Amount * Profit_Margin
+Series_measures = {"order_count": 1,
+                   "cancelled_count": 1,
+                   "sum_Final_Amount": 100,
+                   "sum_Profit": 10_000,
+                   "sum_Delivery_Time_Min": 1,
+                   "cnt_Delivery_Time_Min": 1}
+
+def total(sums, measure):
+    return sums[measure] / Series_measures[measure]
+
+# metric -> formula over the summed measures of a day, window or period
+Metrics = {"Orders": lambda s: s["order_count"],
+           "Revenue": lambda s: total(s, "sum_Final_Amount"),
+           "Profit": lambda s: total(s, "sum_Profit"),
+           "Cancellations": lambda s: s["cancelled_count"],
+           "Cancellation_percent": lambda s: s["cancelled_count"] * 100.0 / s["order_count"],
+           "Avg_delivery_time": lambda s: s["sum_Delivery_Time_Min"] / s["cnt_Delivery_Time_Min"]}
+
+# Rolling windows in days
+Windows = [7, 28, 90]
+
+# period -> (pandas period frequency, periods a year back for the
+# year-over-year comparison); days go back 52 weeks so weekdays line up
+Periods = {"D": ("D", 364), "W": ("W", 52), "M": ("M", 12), "Q": ("Q", 4), "Y": ("Y", 1)}
+
+Series_query = """
+    SELECT Order_Date, {dim},
+    COUNT(*) AS order_count,
+    SUM(CASE WHEN Order_Status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count,
+    SUM(Final_Amount) AS sum_Final_Amount,
+    SUM(Final_Amount * Profit_Margin) AS sum_Profit,
+    SUM(Delivery_Time_Min) AS sum_Delivery_Time_Min,
+    COUNT(Delivery_Time_Min) AS cnt_Delivery_Time_Min
+    FROM Food_Order_Details
+    GROUP BY Order_Date, {dim}
+    """
+
+# --------------------------------------------------
+# PANELS
+# --------------------------------------------------
+
+def daily_panel(rows, dim, start, days):
+    # (values of dim, {measure: int64 array (values, days)}) of a
+    # Series_query answer, days counted from start
+    codes, values = pd.factorize(rows[dim], sort=True, use_na_sentinel=False)
+    day = (pd.to_datetime(rows["Order_Date"]).to_numpy("datetime64[D]") - start).astype(np.int64)
+    key = codes * days + day
+    size = len(values) * days
+    measures = {}
+    for measure, scale in Series_measures.items():
+        scaled = np.rint(rows[measure].astype("float64").fillna(0).to_numpy() * scale)
+        measures[measure] = np.rint(np.bincount(key, scaled, minlength=size)).astype(np.int64).reshape(len(values), days)
+    return pd.Index(np.asarray(values)), measures
+
+def rolling_sums(sums, window):
+    # Sums over each run of window days, for the days from the window-th on:
+    # a cumulative sum along the days minus itself window days earlier
+    rolled = {}
+    for measure, values in sums.items():
+        running = np.zeros((values.shape[0], values.shape[1] + 1), dtype=np.int64)
+        np.cumsum(values, axis=1, out=running[:, 1:])
+        rolled[measure] = running[:, window:] - running[:, :-window]
+    return rolled
+
+def period_sums(sums, dates, period):
+    # Sums per calendar period (week, month, quarter, year) and the first day
+    # of each; the first and last periods may be partial
+    labels = dates.to_period(Periods[period][0])
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    return ({measure: np.add.reduceat(values, starts, axis=1) for measure, values in sums.items()},
+            labels[starts].start_time)
+
+def year_ago(values, lag):
+    # values lag columns earlier, NaN before the first
+    shifted = np.full(values.shape, np.nan)
+    shifted[:, lag:] = values[:, :-lag]
+    return shifted
+
+# --------------------------------------------------
+# SERIES
+# --------------------------------------------------
+
+class OrderSeries:
+    # The daily panels of every breakdown and of all orders ("All"), and
+    # the trends computed from them
+
+    def __init__(self, start, days, panels):
+        self.start = start
+        self.days = days
+        self.panels = panels
+        self.dates = pd.date_range(pd.Timestamp(start), periods=days, freq="D")
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for _, measures in self.panels.values() for array in measures.values())
+
+    def values(self, breakdown):
+        return self.panels[breakdown][0]
+
+    def sums(self, breakdown=None, filters=None):
+        # (line labels, {measure: (lines, days)}): one line per value of the
+        # breakdown, or one of all orders. Filters {dim: values to keep} may
+        # name the breakdown, or for all orders a single breakdown whose
+        # chosen values are summed.
+        dims = [dim for dim, chosen in (filters or {}).items() if chosen]
+        if breakdown is None:
+            if len(dims) > 1:
+                raise ValueError(f"trends filter on one breakdown at a time, not {', '.join(dims)}")
+            if not dims:
+                return self.panels["All"]
+            values, measures = self.panels[dims[0]]
+            keep = values.isin(filters[dims[0]])
+            return pd.Index(["All"]), {measure: array[keep].sum(axis=0, keepdims=True)
+                                       for measure, array in measures.items()}
+        if set(dims) - {breakdown}:
+            raise ValueError(f"trends by {breakdown} filter on {breakdown} only, not {', '.join(dims)}")
+        values, measures = self.panels[breakdown]
+        if not dims:
+            return values, measures
+        keep = values.isin(filters[breakdown])
+        return values[keep], {measure: array[keep] for measure, array in measures.items()}
+
+    def trend(self, metric, breakdown=None, filters=None, ranges=None, period="D", window=None, yoy=False):
+        # The metric per day (optionally over a rolling window of days) or per
+        # period, per line, as a long frame of Date, the breakdown and the
+        # metric; yoy adds the value a year earlier and the change in
+        # percent. Ranges {"Order_Month": (first, last)} keep those months,
+        # compared against the year before them even when it is outside.
+        if window and period != "D":
+            raise ValueError("rolling windows are over days, so need period 'D'")
+        lines, sums = self.sums(breakdown, filters)
+        dates = self.dates
+        if window:
+            sums, dates = rolling_sums(sums, window), dates[window - 1:]
+        elif period != "D":
+            sums, dates = period_sums(sums, dates, period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.asarray(Metrics[metric](sums))
+            columns = {metric: values}
+            if yoy:
+                previous = year_ago(values, Periods[period][1])
+                columns[f"Previous_year_{metric}"] = previous
+                columns["YoY_change_percent"] = np.round((values / previous - 1) * 100, 2)
+
+        kept = np.ones(len(dates), dtype=bool)
+        if ranges and "Order_Month" in ranges:
+            first, last = ranges["Order_Month"]
+            months = dates.year * 100 + dates.month
+            kept = (months >= first) & (months <= last)
+        dates = dates[kept]
+        trend = pd.DataFrame({"Date": np.tile(dates, len(lines))})
+        if breakdown is not None:
+            trend[breakdown] = np.repeat(lines.to_numpy(), len(dates))
+        for name, array in columns.items():
+            trend[name] = array[:, kept].ravel()
+        return compact(trend)
+
+def build_series(read_sql):
+    # read_sql(query, params) as a backend's; one query per breakdown
+    rows = {dim: read_sql(Series_query.format(dim=dim), None) for dim in Breakdowns}
+    dates = pd.to_datetime(rows[Breakdowns[0]]["Order_Date"])
+    if dates.empty:
+        start, days = np.datetime64("today", "D"), 0
+    else:
+        start = dates.min().to_datetime64().astype("datetime64[D]")
+        days = int((dates.max().to_datetime64().astype("datetime64[D]") - start).astype(np.int64)) + 1
+    panels = {dim: daily_panel(rows[dim], dim, start, days) for dim in Breakdowns}
+    panels["All"] = (pd.Index(["All"]), {measure: array.sum(axis=0, keepdims=True)
+                                        for measure, array in panels[Breakdowns[0]][1].items()})
+    return OrderSeries(start, days, panels)
@@ -0,0 +1,150 @@
+# --------------------------------------------------
+# ANALYSIS TOPICS
+# --------------------------------------------------
+
+# Full-table SQL of every analysis topic, as written for MySQL
+# (dialects.translate adapts it to the other backends). Topics covered by
+# rollups.Rollup_queries are answered from the rollup tables where they exist.
+Topic_queries = {
+    "Top-spending customers": """ 
+        select Customer_ID,
+        sum(Order_Value) as Total_spent
+        from food_order_details
+        group by Customer_ID
+        order by Total_spent desc
+        limit 10;
+        """,
+    "Age Group vs Order value": """
+        select Customer_Age_group,
+        count(*) as Total_orders,
+        sum(Order_Value) as Total_revenue,
+        sum(Final_Amount) as Total_order_value
+        from food_order_details
+        group by Customer_Age_group
+        order by Total_order_value desc;
+        """,
+    "Weekend vs Weekday Order patterns": """
+        select Order_Day, Order_day_name,
+        count(*) as Total_orders,
+        sum(Order_Value) as Total_Revenue,
+        avg(Order_Value) as avg_order_value
+        from food_order_details
+        group by Order_Day, Order_day_name;
+        """,
+    "Monthly revenue trends": """
+        SELECT MONTH(Order_Date) as Month,
+        COUNT(*) as Total_orders,
+        SUM(Final_Amount) as Total_revenue,
+        round(avg(Final_Amount),2) as Avg_Order_Value
+        FROM food_order_details
+        GROUP BY Month
+        ORDER BY Month ASC;
+        """,
+    "Impact of discounts on profit": """
+        SELECT 
+        Discount_Applied,
+        COUNT(*) AS Total_orders,
+        SUM(Final_Amount) AS Total_Revenue,
+        AVG(Order_Value) AS Avg_order_value,
+        AVG(Profit_Margin) AS Avg_profit_margin,
+        AVG(Profit_Margin_Percent) AS Avg_profit_margin_percent
+        FROM food_order_details
+        GROUP BY Discount_Applied
+        ORDER BY Discount_Applied ASC;
+        """,
+    "High-revenue cities and cuisines": """
+        select City,
+        Cuisine_Type,
+        sum(Final_Amount) as Total_Revenue
+        from food_order_details
+        group by City, Cuisine_Type
+        order by Total_Revenue desc;
+        """,
+    "Average delivery time by city": """
+        select City,
+        avg(Delivery_Time_Min) as Avg_delivery_time
+        from food_order_details
+        group by City
+        order by Avg_delivery_time desc;
+        """,
+    "Distance vs delivery delay analysis": """
+        select
+        case
+        when Distance_km <= 5 then  '0-5 km'
+        when Distance_km <= 10 then '5-10 km'
+        when Distance_km <= 15 then '10-15 km'
+        when Distance_km <= 20 then '15-20 km'
+        when Distance_km <= 30 then '20-30 km'
+        else '30+ km'
+        end as Distance_range,
+        count(*) as total_orders,
+        avg(Delivery_Time_Min) as Avg_delivery_time
+        from food_order_details
+        group by distance_range
+        order by Avg_delivery_time;
+        """,
+    "Delivery rating vs delivery time": """
+        select Delivery_Rating,
+        count(*) as total_orders,
+        avg(Delivery_Time_Min) as Avg_delivery_time
+        from food_order_details
+        group by Delivery_Rating
+        order by Delivery_Rating asc;
+        """,
+    "Top-rated restaurants": """
+        select Restaurant_Name,
+       count(*) as Total_orders,
+       avg(Restaurant_Rating) as Avg_rating
+       from food_order_details
+       group by Restaurant_Name
+       order by Avg_rating desc;
+       """,
+    "Cancellation rate by restaurant": """
+        select Restaurant_Name,
+        count(*) as total_orders,
+        sum(case when Order_Status = 'Cancelled' then 1 else 0 end) as cancelled_orders,
+        round(
+        sum(case when Order_Status = 'Cancelled' then 1 else 0 end) * 100.0 / count(*),2
+        ) as cancellation_percent
+        from food_order_details
+        group by Restaurant_Name
+        order by cancellation_percent desc;
+        """,
+    "Cuisine-wise performance": """
+        select Cuisine_Type,
+        count(*) as Total_orders,
+        sum(Final_Amount) as Total_revenue,
+        avg(Final_Amount) as Avg_order_value,
+        avg(Profit_Margin) as Avg_profit,
+        avg(Profit_Margin_Percent) as Avg_profit_percent
+        from food_order_details
+        group by Cuisine_Type
+        order by Avg_profit_percent desc;
+        """,
+    "Peak hour demand analysis": """
+        select Peak_Hour,
+        count(*) as total_orders,
+        sum(Final_Amount) as total_revenue,
+        avg(Final_Amount) as avg_order_value
+        from food_order_details
+        group by Peak_Hour
+        order by total_orders desc;
+        """,
+    "Payment mode preferences": """
+        SELECT Payment_Mode,
+        COUNT(*) AS total_orders,
+        ROUND(SUM(Final_Amount), 2) AS Revenue_amount
+        FROM food_order_details
+        GROUP BY Payment_Mode
+        ORDER BY Revenue_amount DESC;
+        """,
+    "Cancellation reason analysis": """
+        select City,
+        Cancellation_Reason,
+        count(*) as count
+        from food_order_details
+        where Cancellation_Reason != "No Cancellation"
+        group by Cancellation_Reason, City
+        order by count desc;
+        """,
+}